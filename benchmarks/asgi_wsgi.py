@@ -0,0 +1,113 @@
+"""
+Compara el rendimiento de las sesiones de actividad (comienzo y final) con clientes concurrentes al desplegar con WSGI y
+con ASGI. Arranca localmente cada servidor en el mismo puerto, uno tras otro, y muestra para cada uno el número de
+peticiones y errores, las peticiones por segundo y las latencias p50/p95/p99 de cada endpoint.
+
+Por defecto, con WSGI se usa el servidor de desarrollo de Django, que atiende cada petición en un hilo, y con ASGI
+uvicorn, que debe estar instalado. Los comandos se pueden cambiar, por ejemplo para usar gunicorn; en ellos {python} y
+{puerto} se sustituyen por el intérprete y el puerto. Los usuarios simulados son los creados por el comando
+generate_dataset, como en la prueba de carga. Para obtener resultados representativos se debe usar PostgreSQL, ya que
+SQLite bloquea las escrituras concurrentes.
+
+Uso:
+    python manage.py generate_dataset --users 1000 --actividades 100000 --ofertas 20000 --seed 0
+    python benchmarks/asgi_wsgi.py --usuarios 50 --duracion 30 --salida asgi_wsgi.json
+"""
+import argparse
+import json
+import random
+import shlex
+import sys
+import threading
+import time
+from datetime import datetime
+
+from carga import UsuarioSimulado, Resultados, get_datos_usuario, arranca_servidor
+
+from django.contrib.auth.models import User
+
+from websecurityapp.models.perfil_models import Usuario
+
+# Comandos con los que se arranca por defecto cada servidor
+servidores = {
+    'wsgi': '{python} manage.py runserver --noreload 127.0.0.1:{puerto}',
+    'asgi': '{python} -m uvicorn websecurityserver.asgi:application --port {puerto} --log-level warning',
+}
+# Perfil de tráfico de la comparación: solo sesiones de actividad
+perfil_sesiones = [('sesion_actividad', 1)]
+
+
+# Ejecuta los usuarios simulados contra el servidor arrancado con el comando dado y devuelve los resultados y la duración
+def ejecuta(comando, puerto, url, datos_usuarios, prefijo, duracion, espera, semilla):
+    resultados = Resultados()
+    aleatorio = random.Random(semilla)
+    simulados = [UsuarioSimulado(url, username, prefijo, datos, resultados, random.Random(aleatorio.random()))
+        for (username, datos) in datos_usuarios]
+    servidor = arranca_servidor(puerto, shlex.split(comando.format(python=sys.executable, puerto=puerto)))
+    try:
+        inicio = time.perf_counter()
+        hilos = [threading.Thread(target=simulado.ejecuta, args=(inicio + duracion, espera, perfil_sesiones))
+            for simulado in simulados]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return resultados, time.perf_counter() - inicio
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--usuarios', type=int, default=20, help='Número de usuarios simulados concurrentes')
+    parser.add_argument('--duracion', type=float, default=30, help='Duración de la prueba con cada servidor en segundos')
+    parser.add_argument('--espera', type=float, default=0, help='Espera en milisegundos entre acciones de un usuario')
+    parser.add_argument('--prefijo', default='dataset', help='Prefijo de los usuarios creados con generate_dataset')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--wsgi', default=servidores['wsgi'], help='Comando con el que se arranca el servidor WSGI')
+    parser.add_argument('--asgi', default=servidores['asgi'], help='Comando con el que se arranca el servidor ASGI')
+    parser.add_argument('--salida', help='Fichero JSON en el que se guarda el resultado')
+    args = parser.parse_args()
+    url = 'http://127.0.0.1:{}'.format(args.puerto)
+    aleatorio = random.Random(args.semilla)
+    usernames = list(User.objects.filter(username__startswith=args.prefijo + '_').order_by('id')
+        .values_list('username', flat=True))
+    if len(usernames) < args.usuarios:
+        raise SystemExit('Solo hay {} usuarios con el prefijo {}'.format(len(usernames), args.prefijo))
+    # Los dos servidores se prueban con los mismos usuarios y actividades
+    datos_usuarios = [(username, get_datos_usuario(Usuario.objects.get(django_user__username=username), aleatorio))
+        for username in aleatorio.sample(usernames, args.usuarios)]
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'usuarios': args.usuarios,
+        'duracion': args.duracion,
+        'espera': args.espera,
+        'semilla': args.semilla,
+        'servidores': {},
+    }
+    print('{:<6} {:<26} {:>10} {:>8} {:>9} {:>9} {:>9} {:>9}'.format('', 'endpoint', 'peticiones', 'errores', 'rps',
+        'p50 ms', 'p95 ms', 'p99 ms'))
+    for nombre in ['wsgi', 'asgi']:
+        comando = getattr(args, nombre)
+        resultados, duracion = ejecuta(comando, args.puerto, url, datos_usuarios, args.prefijo, args.duracion,
+            args.espera, args.semilla)
+        resumenes = {endpoint: resultados.resumen(duracion, endpoint) for endpoint in sorted(resultados.latencias)
+            if endpoint != 'login'}
+        resumenes['total'] = {
+            'peticiones': sum(resumen['peticiones'] for resumen in resumenes.values()),
+            'errores': sum(resumen['errores'] for resumen in resumenes.values()),
+        }
+        resumenes['total']['rps'] = resumenes['total']['peticiones'] / duracion
+        resultado['servidores'][nombre] = {'comando': comando, 'duracion': duracion, 'endpoints': resumenes}
+        for (endpoint, resumen) in resumenes.items():
+            print('{:<6} {:<26} {:>10} {:>8} {:>9.1f} {:>9} {:>9} {:>9}'.format(nombre, endpoint, resumen['peticiones'],
+                resumen['errores'], resumen['rps'], *['{:.1f}'.format(resumen[p]) if p in resumen else '-'
+                for p in ['p50', 'p95', 'p99']]))
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(resultado, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
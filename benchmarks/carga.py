@@ -0,0 +1,282 @@
+"""
+Prueba de carga HTTP de extremo a extremo. Simula usuarios concurrentes que se loguean y generan una mezcla de tráfico
+realista: listados y detalles de actividades y ofertas, solicitud y retirada de ofertas, y sesiones de actividad
+(comienzo y final). Muestra por cada endpoint el número de peticiones y errores, las peticiones por segundo y las
+latencias p50/p95/p99, y guarda el resultado en JSON para poder comparar ejecuciones. Es un error cualquier respuesta
+con un código distinto del esperado en el endpoint, o una redirección al login. Los usuarios simulados que no consiguen
+loguearse no generan tráfico.
+
+Los usuarios simulados son los creados por el comando generate_dataset con el prefijo indicado, cuya contraseña es el
+propio prefijo. Los ids de los objetos se obtienen de la base de datos configurada, que debe ser la misma que usa el
+servidor.
+
+Uso:
+    python manage.py generate_dataset --users 1000 --actividades 100000 --ofertas 20000 --seed 0
+    python benchmarks/carga.py --servidor --usuarios 50 --duracion 60 --salida carga.json
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+from utils import RAIZ, inicializa_django, percentil
+
+inicializa_django()
+
+from django.contrib.auth.models import User
+
+from websecurityapp.models.actividad_models import Actividad
+from websecurityapp.models.oferta_models import Oferta
+from websecurityapp.models.perfil_models import Usuario
+from websecurityapp.views.utils import get_ids_elegibilidad_ofertas
+
+# Peso de cada acción en la mezcla de tráfico
+perfil_trafico = [
+    ('listado_actividades', 30),
+    ('listado_ofertas', 25),
+    ('detalles_oferta', 15),
+    ('detalles_actividad', 10),
+    ('solicitud_oferta', 10),
+    ('sesion_actividad', 10),
+]
+# Número de páginas de los listados entre las que se elige la página visitada
+paginas_listados = 10
+# Número de objetos entre los que elige cada usuario simulado
+objetos_por_usuario = 200
+# Ruta del login, a la que se redirigen las peticiones de un usuario sin sesión
+ruta_login = '/login/'
+
+
+# Opener que no sigue las redirecciones, para medir cada petición por separado
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+# Usuario simulado con su propia sesión, que registra la latencia de cada petición en los resultados compartidos
+class UsuarioSimulado:
+
+    def __init__(self, url, username, password, datos, resultados, aleatorio):
+        self.url = url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.datos = datos
+        self.resultados = resultados
+        self.aleatorio = aleatorio
+        self.logueado = False
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _SinRedirecciones)
+
+    def csrftoken(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    # Realiza una petición y registra su latencia en el endpoint dado, y si es un error: que no haya respuesta, que el
+    # código no sea uno de los esperados o que se redirija al login. Devuelve el código y el cuerpo de la respuesta
+    def peticion(self, endpoint, ruta, esperados=(200,), datos=None, json_datos=None):
+        cabeceras = {'X-CSRFToken': self.csrftoken()}
+        cuerpo = None
+        if json_datos is not None:
+            cuerpo = json.dumps(json_datos).encode()
+            cabeceras['Content-Type'] = 'application/json'
+        elif datos is not None:
+            cuerpo = urllib.parse.urlencode(datos).encode()
+        peticion = urllib.request.Request(self.url + ruta, data=cuerpo, headers=cabeceras)
+        inicio = time.perf_counter()
+        try:
+            with self.opener.open(peticion, timeout=60) as respuesta:
+                codigo, contenido, destino = respuesta.status, respuesta.read(), respuesta.headers.get('Location', '')
+        except urllib.error.HTTPError as e:
+            codigo, contenido, destino = e.code, e.read(), e.headers.get('Location', '')
+        except (urllib.error.URLError, OSError):
+            codigo, contenido, destino = None, b'', ''
+        error = codigo not in esperados or urllib.parse.urlparse(destino).path == ruta_login
+        self.resultados.registra(endpoint, (time.perf_counter() - inicio) * 1000, error)
+        return codigo, contenido
+
+    # Inicia la sesión del usuario. El login correcto redirige fuera del formulario, mientras que el incorrecto vuelve a
+    # mostrar el formulario
+    def login(self):
+        self.peticion('login', ruta_login)
+        codigo, contenido = self.peticion('login', ruta_login, esperados=(302,), datos={'username': self.username,
+            'password': self.password, 'csrfmiddlewaretoken': self.csrftoken()})
+        self.logueado = codigo == 302
+        return self.logueado
+
+    def listado_actividades(self):
+        self.peticion('actividad_listado', '/actividad/listado/?page={}'.format(
+            self.aleatorio.randint(1, paginas_listados)))
+
+    def listado_ofertas(self):
+        self.peticion('oferta_listado', '/oferta/listado/?page={}'.format(self.aleatorio.randint(1, paginas_listados)))
+
+    def detalles_oferta(self):
+        self.peticion('oferta_detalles', '/oferta/detalles/{}/'.format(self.aleatorio.choice(self.datos['ofertas'])))
+
+    def detalles_actividad(self):
+        (id, identificador) = self.aleatorio.choice(self.datos['actividades'])
+        self.peticion('actividad_detalles', '/actividad/detalles/{}/'.format(id))
+
+    # Solicita una oferta que el usuario puede solicitar y después retira la solicitud
+    def solicitud_oferta(self):
+        oferta_id = self.aleatorio.choice(self.datos['solicitables'] or self.datos['ofertas'])
+        self.peticion('oferta_solicitud', '/oferta/solicitud/{}/'.format(oferta_id), esperados=(302,))
+        self.peticion('oferta_retiro_solicitud', '/oferta/retiro_solicitud/{}/'.format(oferta_id), esperados=(302,))
+
+    # Comienza una sesión de una actividad y la termina con el token recibido
+    def sesion_actividad(self):
+        (id, identificador) = self.aleatorio.choice(self.datos['actividades'])
+        codigo, contenido = self.peticion('sesionactividad_comienzo', '/sesionactividad/comienzo/{}/'.format(
+            identificador))
+        if codigo == 200:
+            token = json.loads(contenido.decode())['token']
+            self.peticion('sesionactividad_final', '/sesionactividad/final/{}/'.format(identificador),
+                esperados=(201,), json_datos={'token': token})
+
+    # Realiza acciones elegidas según el perfil de tráfico hasta el instante final, si consigue loguearse
+    def ejecuta(self, final, espera, perfil=perfil_trafico):
+        if not self.login():
+            return
+        acciones = [accion for (accion, peso) in perfil]
+        pesos = [peso for (accion, peso) in perfil]
+        while time.perf_counter() < final:
+            getattr(self, self.aleatorio.choices(acciones, pesos)[0])()
+            if espera:
+                time.sleep(espera / 1000)
+
+
+# Latencias y errores de cada endpoint, compartidos entre los usuarios simulados
+class Resultados:
+
+    def __init__(self):
+        self.cerrojo = threading.Lock()
+        self.latencias = {}
+        self.errores = {}
+
+    def registra(self, endpoint, latencia, error):
+        with self.cerrojo:
+            self.latencias.setdefault(endpoint, []).append(latencia)
+            self.errores[endpoint] = self.errores.get(endpoint, 0) + (1 if error else 0)
+
+    # Resume las latencias de un endpoint, o de todos si no se indica
+    def resumen(self, duracion, endpoint=None):
+        if endpoint is None:
+            latencias = [latencia for lista in self.latencias.values() for latencia in lista]
+            errores = sum(self.errores.values())
+        else:
+            latencias = self.latencias[endpoint]
+            errores = self.errores[endpoint]
+        return {
+            'peticiones': len(latencias),
+            'errores': errores,
+            'rps': len(latencias) / duracion,
+            'p50': percentil(latencias, 50),
+            'p95': percentil(latencias, 95),
+            'p99': percentil(latencias, 99),
+            'media': sum(latencias) / len(latencias),
+        }
+
+
+# Obtiene de la base de datos los objetos con los que trabaja un usuario simulado: actividades publicadas, ofertas
+# visibles y ofertas que puede solicitar
+def get_datos_usuario(usuario, aleatorio):
+    actividades = list(Actividad.objects.filter(borrador=False, vetada=False).order_by('id')
+        .values_list('id', 'identificador')[:10 * objetos_por_usuario])
+    ofertas = list(Oferta.objects.filter(borrador=False, cerrada=False, vetada=False, tiene_actividades_vetadas=False)
+        .order_by('id').values_list('id', flat=True)[:10 * objetos_por_usuario])
+    actividades = aleatorio.sample(actividades, min(objetos_por_usuario, len(actividades)))
+    ofertas = aleatorio.sample(ofertas, min(objetos_por_usuario, len(ofertas)))
+    [ids_solicitables, ids_retirables, ids_actividades_vetadas] = get_ids_elegibilidad_ofertas(usuario,
+        Oferta.objects.filter(id__in=ofertas))
+    return {'actividades': actividades, 'ofertas': ofertas, 'solicitables': sorted(ids_solicitables)}
+
+# Arranca un servidor en el puerto dado, con las variables de entorno dadas además de las actuales, y espera a que acepte
+# conexiones. Por defecto se arranca el servidor de desarrollo de Django
+def arranca_servidor(puerto, comando=None, entorno=None):
+    comando = comando or [sys.executable, os.path.join(RAIZ, 'manage.py'), 'runserver', '--noreload',
+        '127.0.0.1:{}'.format(puerto)]
+    servidor = subprocess.Popen(comando, cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env=dict(os.environ, **(entorno or {})))
+    limite = time.time() + 30
+    while time.time() < limite:
+        try:
+            socket.create_connection(('127.0.0.1', puerto), timeout=1).close()
+            return servidor
+        except OSError:
+            time.sleep(0.2)
+    servidor.terminate()
+    raise RuntimeError('El servidor no ha arrancado en el puerto {}'.format(puerto))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=None, help='URL del servidor. Por defecto, el servidor arrancado localmente')
+    parser.add_argument('--servidor', action='store_true', help='Arranca localmente el servidor de desarrollo')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--usuarios', type=int, default=20, help='Número de usuarios simulados concurrentes')
+    parser.add_argument('--duracion', type=float, default=30, help='Duración de la prueba en segundos')
+    parser.add_argument('--espera', type=float, default=0, help='Espera en milisegundos entre acciones de un usuario')
+    parser.add_argument('--prefijo', default='dataset', help='Prefijo de los usuarios creados con generate_dataset')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help='Fichero JSON en el que se guarda el resultado')
+    args = parser.parse_args()
+    url = args.url or 'http://127.0.0.1:{}'.format(args.puerto)
+    aleatorio = random.Random(args.semilla)
+    usernames = list(User.objects.filter(username__startswith=args.prefijo + '_').order_by('id')
+        .values_list('username', flat=True))
+    if len(usernames) < args.usuarios:
+        raise SystemExit('Solo hay {} usuarios con el prefijo {}'.format(len(usernames), args.prefijo))
+    resultados = Resultados()
+    simulados = []
+    for username in aleatorio.sample(usernames, args.usuarios):
+        usuario = Usuario.objects.get(django_user__username=username)
+        simulados.append(UsuarioSimulado(url, username, args.prefijo, get_datos_usuario(usuario, aleatorio), resultados,
+            random.Random(aleatorio.random())))
+    servidor = arranca_servidor(args.puerto) if args.servidor else None
+    try:
+        inicio = time.perf_counter()
+        final = inicio + args.duracion
+        hilos = [threading.Thread(target=simulado.ejecuta, args=(final, args.espera)) for simulado in simulados]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+    finally:
+        if servidor:
+            servidor.terminate()
+            servidor.wait()
+    sin_login = [simulado.username for simulado in simulados if not simulado.logueado]
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'url': url,
+        'usuarios': args.usuarios,
+        'duracion': duracion,
+        'espera': args.espera,
+        'semilla': args.semilla,
+        'endpoints': {endpoint: resultados.resumen(duracion, endpoint) for endpoint in sorted(resultados.latencias)},
+        'total': resultados.resumen(duracion),
+        'sin_login': sin_login,
+    }
+    if sin_login:
+        print('No han podido loguearse {} usuarios: {}'.format(len(sin_login), ', '.join(sin_login)), file=sys.stderr)
+    print('{:<26} {:>9} {:>8} {:>9} {:>9} {:>9} {:>9}'.format('endpoint', 'peticiones', 'errores', 'rps', 'p50 ms',
+        'p95 ms', 'p99 ms'))
+    for (endpoint, resumen) in list(resultado['endpoints'].items()) + [('total', resultado['total'])]:
+        print('{:<26} {:>9} {:>8} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f}'.format(endpoint, resumen['peticiones'],
+            resumen['errores'], resumen['rps'], resumen['p50'], resumen['p95'], resumen['p99']))
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(resultado, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Mide cuánto afecta abrir una conexión nueva a la base de datos en cada petición a la latencia del listado de ofertas con
+clientes concurrentes. Primero mide el tiempo de abrir una conexión con la base de datos configurada, y después arranca
+el servidor con la configuración de benchmarks, que parte de la de producción, sin conexiones persistentes
+(DB_CONN_MAX_AGE=0) y con ellas, y muestra para cada caso el número de peticiones y errores, las peticiones por segundo y
+las latencias p50/p95/p99 de /oferta/listado/.
+
+Los usuarios simulados son los creados por el comando generate_dataset, como en la prueba de carga. Para obtener
+resultados representativos se debe usar PostgreSQL, ya que con SQLite abrir una conexión apenas tiene coste.
+
+Uso:
+    python manage.py generate_dataset --users 1000 --actividades 100000 --ofertas 20000 --seed 0
+    python benchmarks/conexiones.py --usuarios 50 --duracion 30 --salida conexiones.json
+"""
+import argparse
+import json
+import random
+import shlex
+import sys
+import threading
+import time
+from datetime import datetime
+
+from carga import UsuarioSimulado, Resultados, get_datos_usuario, arranca_servidor
+from utils import mide, resumen
+
+from django.contrib.auth.models import User
+from django.db import connection
+
+from websecurityapp.models.perfil_models import Usuario
+
+# Valores de DB_CONN_MAX_AGE con los que se compara: sin conexiones persistentes y con ellas
+tiempos_conexiones = ['0', '60']
+# Perfil de tráfico de la comparación: solo el listado de ofertas
+perfil_listado = [('listado_ofertas', 1)]
+
+
+# Mide el tiempo de abrir una conexión con la base de datos y cerrarla
+def mide_conexion(repeticiones):
+    connection.close()
+
+    def abre():
+        connection.ensure_connection()
+        connection.close()
+
+    return resumen(mide(abre, repeticiones))
+
+# Ejecuta los usuarios simulados contra el servidor arrancado con el tiempo de las conexiones dado y devuelve los
+# resultados y la duración
+def ejecuta(args, tiempo_conexiones, url, datos_usuarios):
+    resultados = Resultados()
+    aleatorio = random.Random(args.semilla)
+    simulados = [UsuarioSimulado(url, username, args.prefijo, datos, resultados, random.Random(aleatorio.random()))
+        for (username, datos) in datos_usuarios]
+    comando = shlex.split(args.comando.format(python=sys.executable, puerto=args.puerto)) if args.comando else None
+    servidor = arranca_servidor(args.puerto, comando, {'DJANGO_SETTINGS_MODULE': args.settings,
+        'DB_CONN_MAX_AGE': tiempo_conexiones})
+    try:
+        inicio = time.perf_counter()
+        hilos = [threading.Thread(target=simulado.ejecuta, args=(inicio + args.duracion, args.espera, perfil_listado))
+            for simulado in simulados]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return resultados, time.perf_counter() - inicio
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--usuarios', type=int, default=20, help='Número de usuarios simulados concurrentes')
+    parser.add_argument('--duracion', type=float, default=30, help='Duración de la prueba con cada configuración')
+    parser.add_argument('--espera', type=float, default=0, help='Espera en milisegundos entre acciones de un usuario')
+    parser.add_argument('--prefijo', default='dataset', help='Prefijo de los usuarios creados con generate_dataset')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--conexiones', type=int, default=200, help='Número de conexiones abiertas para medir su coste')
+    parser.add_argument('--settings', default='websecurityserver.settings.bench',
+        help='Módulo de configuración del servidor, que debe leer DB_CONN_MAX_AGE')
+    parser.add_argument('--comando', help='Comando con el que se arranca el servidor, en el que {python} y {puerto} se '
+        'sustituyen por el intérprete y el puerto. Por defecto, el servidor de desarrollo de Django')
+    parser.add_argument('--salida', help='Fichero JSON en el que se guarda el resultado')
+    args = parser.parse_args()
+    url = 'http://127.0.0.1:{}'.format(args.puerto)
+    aleatorio = random.Random(args.semilla)
+    usernames = list(User.objects.filter(username__startswith=args.prefijo + '_').order_by('id')
+        .values_list('username', flat=True))
+    if len(usernames) < args.usuarios:
+        raise SystemExit('Solo hay {} usuarios con el prefijo {}'.format(len(usernames), args.prefijo))
+    datos_usuarios = [(username, get_datos_usuario(Usuario.objects.get(django_user__username=username), aleatorio))
+        for username in aleatorio.sample(usernames, args.usuarios)]
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'usuarios': args.usuarios,
+        'duracion': args.duracion,
+        'espera': args.espera,
+        'semilla': args.semilla,
+        'conexion': mide_conexion(args.conexiones),
+        'configuraciones': {},
+    }
+    print('Abrir una conexión: mediana {mediana:.2f} ms, p95 {p95:.2f} ms'.format(**resultado['conexion']))
+    print('{:<16} {:>10} {:>8} {:>9} {:>9} {:>9} {:>9}'.format('CONN_MAX_AGE', 'peticiones', 'errores', 'rps', 'p50 ms',
+        'p95 ms', 'p99 ms'))
+    for tiempo_conexiones in tiempos_conexiones:
+        resultados, duracion = ejecuta(args, tiempo_conexiones, url, datos_usuarios)
+        listado = resultados.resumen(duracion, 'oferta_listado')
+        resultado['configuraciones'][tiempo_conexiones] = listado
+        print('{:<16} {:>10} {:>8} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f}'.format(tiempo_conexiones, listado['peticiones'],
+            listado['errores'], listado['rps'], listado['p50'], listado['p95'], listado['p99']))
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(resultado, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
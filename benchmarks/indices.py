@@ -0,0 +1,131 @@
+"""
+Ejecuta EXPLAIN ANALYZE sobre las consultas de los listados de actividades y de ofertas (recuento, primera página y
+página profunda por cursor) para cada tipo de usuario, con y sin los índices de los listados, sobre un conjunto de datos
+sintético, el mismo que genera el comando generate_dataset.
+
+Los datos se crean dentro de una transacción que se deshace al terminar, y los índices se eliminan dentro de la misma
+transacción, por lo que la base de datos configurada no se modifica. EXPLAIN ANALYZE solo está disponible en PostgreSQL;
+con otras bases de datos se muestra el plan sin ANALYZE y el tiempo medido desde Django.
+
+Uso:
+    python benchmarks/indices.py --actividades 1000000 --ofertas 200000 --usuarios 1000
+"""
+import argparse
+import re
+
+from utils import inicializa_django, mide, resumen
+
+inicializa_django()
+
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from websecurityapp.models.actividad_models import Actividad
+from websecurityapp.models.oferta_models import Oferta
+from websecurityapp.models.perfil_models import Usuario
+from websecurityapp.services.actividad_services import listado_actividades, listado_actividades_propias
+from websecurityapp.services.dataset_services import genera_dataset
+from websecurityapp.services.oferta_services import lista_ofertas, lista_ofertas_propias
+
+
+# Genera el conjunto de datos y devuelve un administrador y un usuario que no lo es
+def crea_datos(n_usuarios, n_actividades, n_ofertas, semilla):
+    genera_dataset(n_usuarios, n_actividades, n_ofertas, semilla, prefijo='benchmark_indices')
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    usuarios = Usuario.objects.filter(django_user__username__startswith='benchmark_indices_').order_by('id')
+    return usuarios.filter(es_admin=True).first(), usuarios.filter(es_admin=False).first()
+
+# Obtiene un listado tal y como lo obtiene su vista para el usuario dado
+def get_listado(servicio, usuario):
+    request = RequestFactory().get('/')
+    request.user = usuario.django_user
+    request._usuario = usuario
+    return servicio(request)
+
+# Devuelve las consultas de cada listado: el recuento, la primera página y una página a mitad del listado por cursor
+def get_consultas(admin, usuario, por_pagina):
+    consultas = []
+    for (nombre, servicio, usuario_listado) in [
+        ('actividades admin', listado_actividades, admin),
+        ('actividades usuario', listado_actividades, usuario),
+        ('actividades propias', listado_actividades_propias, usuario),
+        ('ofertas admin', lista_ofertas, admin),
+        ('ofertas usuario', lista_ofertas, usuario),
+        ('ofertas propias', lista_ofertas_propias, usuario),
+    ]:
+        listado = get_listado(servicio, usuario_listado)
+        ids = listado.values_list('id', flat=True)
+        n_objetos = ids.count()
+        cursor = ids[n_objetos // 2] if n_objetos else 0
+        consultas.append((nombre, 'recuento', listado.order_by().values('id')))
+        consultas.append((nombre, 'primera', listado[:por_pagina]))
+        consultas.append((nombre, 'cursor', listado.filter(id__gt=cursor)[:por_pagina]))
+    return consultas
+
+# Ejecuta el plan de una consulta y devuelve el plan y el tiempo de ejecución en milisegundos. Con PostgreSQL el tiempo
+# es el que indica EXPLAIN ANALYZE, y con otras bases de datos la mediana de ejecutar la consulta
+def analiza(consulta, tipo, repeticiones):
+    if tipo == 'recuento':
+        ejecuta = consulta.count
+    else:
+        ejecuta = lambda: list(consulta.all())
+    if connection.vendor == 'postgresql':
+        if tipo == 'recuento':
+            # Se analiza un recuento equivalente al que ejecuta count()
+            sql, parametros = consulta.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN ANALYZE SELECT COUNT(*) FROM ({}) subconsulta'.format(sql), parametros)
+                plan = '\n'.join(fila[0] for fila in cursor.fetchall())
+        else:
+            plan = consulta.explain(analyze=True)
+        tiempo = float(re.search(r'Execution Time: ([\d.]+) ms', plan).group(1))
+    else:
+        plan = consulta.explain()
+        tiempo = resumen(mide(ejecuta, repeticiones))['mediana']
+    return plan, tiempo
+
+# Elimina dentro de la transacción actual los índices de los listados
+def elimina_indices():
+    with connection.cursor() as cursor:
+        for modelo in [Actividad, Oferta]:
+            for indice in modelo._meta.indexes:
+                cursor.execute('DROP INDEX {}'.format(connection.ops.quote_name(indice.name)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--usuarios', type=int, default=1000)
+    parser.add_argument('--actividades', type=int, default=1000000)
+    parser.add_argument('--ofertas', type=int, default=200000)
+    parser.add_argument('--por-pagina', type=int, default=100)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--planes', action='store_true', help='Muestra el plan de cada consulta')
+    args = parser.parse_args()
+    resultados = {}
+    with transaction.atomic():
+        print('Creando {} actividades y {} ofertas...'.format(args.actividades, args.ofertas))
+        admin, usuario = crea_datos(args.usuarios, args.actividades, args.ofertas, args.semilla)
+        consultas = get_consultas(admin, usuario, args.por_pagina)
+        # Se mide primero con los índices y después se eliminan para medir sin ellos
+        for momento in ['con indices', 'sin indices']:
+            if momento == 'sin indices':
+                elimina_indices()
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute('ANALYZE')
+            for (nombre, tipo, consulta) in consultas:
+                plan, tiempo = analiza(consulta, tipo, args.repeticiones)
+                resultados[(nombre, tipo, momento)] = tiempo
+                if args.planes:
+                    print('-- {} / {} / {}\n{}\n'.format(nombre, tipo, momento, plan))
+        transaction.set_rollback(True)
+    print('{:<22} {:<10} {:>14} {:>14}'.format('listado', 'consulta', 'sin indices ms', 'con indices ms'))
+    for (nombre, tipo, consulta) in consultas:
+        print('{:<22} {:<10} {:>14.2f} {:>14.2f}'.format(nombre, tipo, resultados[(nombre, tipo, 'sin indices')],
+            resultados[(nombre, tipo, 'con indices')]))
+
+
+if __name__ == '__main__':
+    main()
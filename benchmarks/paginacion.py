@@ -0,0 +1,92 @@
+"""
+Compara el coste de obtener una página del listado de actividades con el paginador de Django (COUNT + OFFSET) y con el
+paginador por cursor (búsqueda por id), para la primera página y para una página profunda.
+
+Se crean las actividades dentro de una transacción que se deshace al terminar, por lo que la base de datos configurada
+no se modifica. Para obtener resultados representativos se debe usar PostgreSQL, como en producción.
+
+Uso:
+    python benchmarks/paginacion.py --filas 1000000 --por-pagina 100 --pagina 10000
+"""
+import argparse
+from datetime import date
+
+from utils import inicializa_django, mide, resumen
+
+inicializa_django()
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from websecurityapp.models.actividad_models import Actividad
+from websecurityapp.models.perfil_models import Usuario
+from websecurityapp.services.actividad_services import listado_actividades
+from websecurityapp.views.paginacion import PaginadorCursor
+
+
+# Crea un usuario y el número de actividades publicadas indicado, insertándolas por lotes
+def crea_actividades(n_filas, tamaño_lote=10000):
+    django_user = User.objects.create_user('benchmark_paginacion', 'benchmark@benchmark.com', 'benchmark')
+    usuario = Usuario.objects.create(django_user=django_user, vetado=False, es_admin=False)
+    for inicio in range(0, n_filas, tamaño_lote):
+        Actividad.objects.bulk_create([Actividad(
+            titulo='Actividad {}'.format(i),
+            autor=usuario,
+            enlace='http://localhost:8000/',
+            descripcion='Actividad de benchmark',
+            borrador=False,
+            vetada=False,
+            fecha_creacion=date.today(),
+            comentable=False,
+            identificador='BNCH-PAG-{}'.format(i),
+        ) for i in range(inicio, min(inicio + tamaño_lote, n_filas))])
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE websecurityapp_actividad')
+    return usuario
+
+# Obtiene el listado de actividades tal y como lo obtiene la vista del listado para el usuario dado
+def get_listado(usuario):
+    request = RequestFactory().get('/actividad/listado/')
+    request.user = usuario.django_user
+    request._usuario = usuario
+    return listado_actividades(request)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=1000000)
+    parser.add_argument('--por-pagina', type=int, default=100)
+    parser.add_argument('--pagina', type=int, default=10000)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+    with transaction.atomic():
+        print('Creando {} actividades...'.format(args.filas))
+        usuario = crea_actividades(args.filas)
+        actividades = get_listado(usuario)
+        cache.clear()
+        resultados = []
+        for pagina in [1, args.pagina]:
+            # El cursor de una página es el id del último objeto de la página anterior, que se obtiene sin medir
+            cursor = actividades.values_list('id', flat=True)[(pagina - 1) * args.por_pagina - 1] if pagina > 1 else 0
+
+            def pagina_offset():
+                page_obj = Paginator(actividades, args.por_pagina).get_page(pagina)
+                return list(page_obj), page_obj.paginator.num_pages
+
+            def pagina_cursor():
+                page_obj = PaginadorCursor(actividades, args.por_pagina).get_page_despues(pagina, cursor)
+                return list(page_obj), page_obj.paginator.num_pages
+
+            for (modo, funcion) in [('offset', pagina_offset), ('cursor', pagina_cursor)]:
+                resultados.append((modo, pagina, resumen(mide(funcion, args.repeticiones))))
+        transaction.set_rollback(True)
+    print('{:<8} {:>8} {:>12} {:>12}'.format('modo', 'pagina', 'mediana ms', 'p95 ms'))
+    for (modo, pagina, tiempos) in resultados:
+        print('{:<8} {:>8} {:>12.2f} {:>12.2f}'.format(modo, pagina, tiempos['mediana'], tiempos['p95']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Compara el tiempo de renderizado del listado de ofertas (oferta/listado_ofertas.html) con los cargadores de plantillas
+sin caché, que leen y compilan la plantilla y las plantillas que extiende e incluye en cada renderizado, y con el cargador
+con caché, con las plantillas compiladas al arrancar.
+
+Se crean las ofertas dentro de una transacción que se deshace al terminar, por lo que la base de datos configurada no se
+modifica. El contexto se obtiene una sola vez de la vista del listado, por lo que solo se mide el renderizado. La caché
+de fragmentos se vacía antes de cada renderizado, para que se renderice el listado completo.
+
+Uso:
+    python benchmarks/plantillas.py --filas 50 --repeticiones 200
+"""
+import argparse
+import time
+from datetime import date
+
+from utils import inicializa_django, resumen
+
+inicializa_django()
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.template.backends.django import DjangoTemplates
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+from websecurityapp.models.actividad_models import Actividad
+from websecurityapp.models.oferta_models import Oferta
+from websecurityapp.models.perfil_models import Usuario
+from websecurityapp.services.plantillas_services import get_plantillas_precompiladas
+from websecurityapp.views import paginacion
+from websecurityserver.settings.base import cargadores_plantillas, cargadores_plantillas_cacheados
+
+# Plantilla que se renderiza
+plantilla = 'oferta/listado_ofertas.html'
+
+
+# Crea un usuario que publica el número de ofertas abiertas indicado, cada una con una actividad requerida, y otro
+# usuario que ve el listado
+def crea_ofertas(n_filas):
+    usuarios = []
+    for nombre in ['benchmark_plantillas_autor', 'benchmark_plantillas']:
+        django_user = User.objects.create_user(nombre, 'benchmark@benchmark.com', 'benchmark')
+        usuarios.append(Usuario.objects.create(django_user=django_user, vetado=False, es_admin=False))
+    actividad = Actividad.objects.create(titulo='Actividad de benchmark', autor=usuarios[0],
+        enlace='http://localhost:8000/', descripcion='Actividad de benchmark', borrador=False, vetada=False,
+        fecha_creacion=date.today(), comentable=False, identificador='BNCH-PLT-A')
+    ofertas = Oferta.objects.bulk_create([Oferta(
+        titulo='Oferta {}'.format(i),
+        descripcion='Oferta de benchmark',
+        autor=usuarios[0],
+        borrador=False,
+        vetada=False,
+        cerrada=False,
+        fecha_creacion=date.today(),
+        tiene_actividades_vetadas=False,
+        identificador='BNCH-PLT-{}'.format(i),
+    ) for i in range(n_filas)])
+    ofertas = Oferta.objects.filter(identificador__startswith='BNCH-PLT-')
+    Oferta.actividades.through.objects.bulk_create([Oferta.actividades.through(oferta_id=oferta.id,
+        actividad_id=actividad.id) for oferta in ofertas])
+    return usuarios[1]
+
+# Obtiene el contexto y la petición con los que la vista del listado renderiza la plantilla, con todas las ofertas en
+# una página. El primer contexto de la respuesta es el de la plantilla del listado, el resto son los de las plantillas
+# que incluye
+def get_contexto(usuario, n_filas):
+    paginacion.numero_objetos_por_pagina = n_filas
+    client = Client()
+    client.force_login(usuario.django_user)
+    response = client.get('/oferta/listado/')
+    return response.context[0].flatten(), response.wsgi_request
+
+# Crea un motor de plantillas como el de la configuración, con los cargadores dados
+def crea_motor(cargadores):
+    configuracion = settings.TEMPLATES[0]
+    return DjangoTemplates({
+        'NAME': 'benchmark',
+        'DIRS': configuracion['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': dict(configuracion['OPTIONS'], loaders=cargadores),
+    })
+
+# Renderiza la plantilla con cada motor el número de repeticiones indicado, obteniéndola del motor como hace render() en
+# cada petición, y devuelve el tiempo de cada renderizado en milisegundos por motor. Los motores se alternan en cada
+# repetición, para que las variaciones de la carga de la máquina afecten a todos por igual
+def mide_renderizado(motores, contexto, request, repeticiones):
+    tiempos = {nombre: [] for nombre in motores}
+    for i in range(repeticiones):
+        for (nombre, motor) in motores.items():
+            cache.clear()
+            inicio = time.perf_counter()
+            motor.get_template(plantilla).render(contexto, request)
+            tiempos[nombre].append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=50)
+    parser.add_argument('--repeticiones', type=int, default=200)
+    args = parser.parse_args()
+    setup_test_environment()
+    with transaction.atomic():
+        usuario = crea_ofertas(args.filas)
+        (contexto, request) = get_contexto(usuario, args.filas)
+        print('Renderizando {} con {} ofertas...'.format(plantilla, len(contexto['page_obj_ofertas'].object_list)))
+        con_cache = crea_motor(cargadores_plantillas_cacheados)
+        for nombre in get_plantillas_precompiladas():
+            con_cache.get_template(nombre)
+        motores = {'sin caché': crea_motor(cargadores_plantillas), 'con caché': con_cache}
+        resultados = mide_renderizado(motores, contexto, request, args.repeticiones)
+        transaction.set_rollback(True)
+    print('{:<12} {:>12} {:>12} {:>12} {:>12}'.format('cargador', 'mediana ms', 'p95 ms', 'mínimo ms', 'máximo ms'))
+    for (modo, tiempos) in resultados.items():
+        tiempos = resumen(tiempos)
+        print('{:<12} {:>12.2f} {:>12.2f} {:>12.2f} {:>12.2f}'.format(modo, tiempos['mediana'], tiempos['p95'],
+            tiempos['minimo'], tiempos['maximo']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import os
+import statistics
+import sys
+import time
+
+# Directorio raíz del proyecto, necesario para poder importar la aplicación desde los benchmarks
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Configura Django para poder usar los modelos y servicios de la aplicación desde un script
+def inicializa_django():
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'websecurityserver.settings.bench')
+    import django
+    django.setup()
+
+# Ejecuta una función el número de repeticiones indicado y devuelve el tiempo de cada ejecución en milisegundos
+def mide(funcion, repeticiones):
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+# Calcula el percentil dado de una lista de tiempos
+def percentil(tiempos, p):
+    ordenados = sorted(tiempos)
+    indice = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+# Resume una lista de tiempos en milisegundos
+def resumen(tiempos):
+    return {
+        'mediana': statistics.median(tiempos),
+        'p95': percentil(tiempos, 95),
+        'minimo': min(tiempos),
+        'maximo': max(tiempos),
+    }
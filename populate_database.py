@@ -2,6 +2,7 @@ from django.contrib.auth.models import User
 from websecurityapp.models.actividad_models import Actividad, SesionActividad
 from websecurityapp.models.perfil_models import Usuario, Anexo
 from websecurityapp.models.oferta_models import Oferta, Solicitud
+from websecurityapp.services.oferta_services import actualiza_ofertas_actividades_vetadas
 from datetime import date
 
 # DJANGO USERS Y USUARIOS
@@ -444,6 +445,9 @@ for oferta in ofertas:
     oferta.full_clean()
     oferta.save()
 
+# Se marcan las ofertas que tienen actividades requeridas vetadas
+actualiza_ofertas_actividades_vetadas()
+
 
 
 # SOLICITUDES
@@ -1,3 +1,94 @@
 from django.contrib import admin
+from django.db.models import F
 
-# Register your models here.
+from websecurityapp.models.actividad_models import Actividad
+from websecurityapp.models.oferta_models import Oferta, Solicitud
+from websecurityapp.models.perfil_models import Usuario
+from websecurityapp.services.oferta_services import actualiza_ofertas_actividades_vetadas
+
+
+# Los listados del administrador muestran el autor o el usuario de cada fila, por lo que se obtienen con select_related en
+# la misma consulta que las filas. Las relaciones se editan por id, para no cargar todas las actividades y usuarios en los
+# formularios
+
+
+# Los cambios guardados desde el administrador incrementan la versión del objeto en la base de datos, como los servicios,
+# para que los listados no sigan usando los fragmentos cacheados con los datos anteriores. La versión no se edita a mano
+class VersionAdmin(admin.ModelAdmin):
+    readonly_fields = ['version']
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            obj.version = F('version') + 1
+        super().save_model(request, obj, form, change)
+        obj.refresh_from_db(fields=['version'])
+
+
+@admin.register(Usuario)
+class UsuarioAdmin(VersionAdmin):
+    list_display = ['id', 'django_user', 'es_admin', 'vetado']
+    list_filter = ['es_admin', 'vetado']
+    list_select_related = ['django_user']
+    search_fields = ['django_user__username']
+    raw_id_fields = ['django_user', 'actividades_realizadas']
+
+
+# Al vetar o levantar el veto sobre una actividad se recalcula si las ofertas que la requieren tienen actividades vetadas,
+# como en los servicios de moderación. Al levantar el veto se elimina el motivo de veto
+@admin.register(Actividad)
+class ActividadAdmin(VersionAdmin):
+    list_display = ['id', 'identificador', 'titulo', 'autor_username', 'fecha_creacion', 'borrador', 'vetada']
+    list_filter = ['borrador', 'vetada']
+    list_select_related = ['autor__django_user']
+    search_fields = ['identificador', 'titulo']
+    raw_id_fields = ['autor']
+
+    def autor_username(self, actividad):
+        return actividad.autor.django_user.username
+
+    def save_model(self, request, obj, form, change):
+        if not obj.vetada:
+            obj.motivo_veto = None
+        super().save_model(request, obj, form, change)
+        if 'vetada' in form.changed_data:
+            actualiza_ofertas_actividades_vetadas(Oferta.objects.filter(actividades=obj))
+
+
+# Si una oferta es nueva o cambian sus actividades requeridas, se recalcula si tiene actividades vetadas una vez guardadas
+# las actividades, por lo que la marca no se edita a mano
+@admin.register(Oferta)
+class OfertaAdmin(VersionAdmin):
+    list_display = ['id', 'identificador', 'titulo', 'autor_username', 'fecha_creacion', 'borrador', 'cerrada', 'vetada',
+        'tiene_actividades_vetadas']
+    list_filter = ['borrador', 'cerrada', 'vetada', 'tiene_actividades_vetadas']
+    list_select_related = ['autor__django_user']
+    search_fields = ['identificador', 'titulo']
+    raw_id_fields = ['autor', 'actividades']
+    readonly_fields = ['tiene_actividades_vetadas', 'version']
+
+    def autor_username(self, oferta):
+        return oferta.autor.django_user.username
+
+    def save_model(self, request, obj, form, change):
+        if not obj.vetada:
+            obj.motivo_veto = None
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if not change or 'actividades' in form.changed_data:
+            actualiza_ofertas_actividades_vetadas(Oferta.objects.filter(pk=form.instance.pk))
+            form.instance.refresh_from_db(fields=['tiene_actividades_vetadas', 'version'])
+
+
+@admin.register(Solicitud)
+class SolicitudAdmin(admin.ModelAdmin):
+    list_display = ['id', 'oferta_identificador', 'usuario_username']
+    list_select_related = ['oferta', 'usuario__django_user']
+    raw_id_fields = ['oferta', 'usuario']
+
+    def oferta_identificador(self, solicitud):
+        return solicitud.oferta.identificador
+
+    def usuario_username(self, solicitud):
+        return solicitud.usuario.django_user.username
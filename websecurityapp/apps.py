@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class Prueba1Config(AppConfig):
     name = 'websecurityapp'
+
+    # Al arrancar se compilan las plantillas de los listados si se usa el cargador de plantillas con caché
+    def ready(self):
+        from websecurityapp.services.plantillas_services import precompila_plantillas
+        precompila_plantillas()
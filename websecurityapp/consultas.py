@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import URLPattern
+
+from websecurityapp.models.actividad_models import Actividad
+from websecurityapp.models.oferta_models import Oferta
+from websecurityapp.models.perfil_models import Usuario, Anexo
+from websecurityapp.services.dataset_services import genera_dataset
+from websecurityapp.services.sesionactividad_services import get_almacen_sesionesactividad
+from websecurityserver.urls import urlpatterns
+
+# Fichero con el número de consultas de referencia de cada vista, que se comprueba también en los tests
+fichero_linea_base = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_unit', 'consultas_vistas.json')
+
+# Usuarios con los que se visita cada url: un usuario normal y un administrador
+usuarios_consultas = ['usuario1', 'usuario2']
+
+
+# Carga los datos con los que se miden las consultas: los datos de prueba y un conjunto de datos sintético pequeño, para
+# que los listados tengan varias páginas y se noten las consultas que dependen del número de objetos
+def carga_datos_consultas():
+    exec(open('populate_database.py').read(), {})
+    genera_dataset(20, 60, 30, 0, prefijo='consultas', realizadas_por_usuario=3, solicitudes_por_usuario=2)
+
+# Devuelve el primer objeto de una consulta, o el de la consulta alternativa si la primera no tiene resultados
+def _primero(consulta, alternativa):
+    return consulta.order_by('id').first() or alternativa.order_by('id').first()
+
+# Obtiene el valor de cada parámetro de las urls para el usuario dado. Se prefieren los objetos del usuario, para que las
+# vistas muestren también las partes reservadas al autor
+def _parametros(usuario):
+    return {
+        'actividad_id': _primero(Actividad.objects.filter(autor=usuario), Actividad.objects.filter(borrador=False)).id,
+        'oferta_id': _primero(Oferta.objects.filter(autor=usuario).exclude(solicitudes=None),
+            Oferta.objects.filter(borrador=False)).id,
+        'anexo_id': _primero(Anexo.objects.filter(usuario=usuario), Anexo.objects.all()).id,
+        'usuario_id': _primero(Usuario.objects.exclude(pk=usuario.pk), Usuario.objects.all()).id,
+        'identificador': _primero(Actividad.objects.filter(borrador=False, vetada=False), Actividad.objects.all())
+            .identificador,
+        'formato': 'csv',
+    }
+
+# Obtiene las urls de la aplicación, sin las que incluyen otras urls como las del administrador de Django
+def get_urls():
+    return [patron for patron in urlpatterns if isinstance(patron, URLPattern)]
+
+# Prepara una sesión de actividad del usuario en la actividad con el identificador de los parámetros, y devuelve su token
+def _token_sesion(usuario, parametros):
+    actividad = Actividad.objects.get(identificador=parametros['identificador'])
+    return get_almacen_sesionesactividad().crea(usuario, actividad)
+
+# Datos de la petición a la vista que termina una sesión de actividad
+def _post_sesionactividad_final(usuario, parametros):
+    return {'data': {'token': _token_sesion(usuario, parametros)}, 'content_type': 'application/json'}
+
+# Datos de la petición a la vista que termina varias sesiones de actividad
+def _post_sesionactividad_final_varias(usuario, parametros):
+    return {'data': {'sesiones': [{'identificador': parametros['identificador'],
+        'token': _token_sesion(usuario, parametros)}]}, 'content_type': 'application/json'}
+
+# Datos de la petición a las vistas de importación: un fichero con una fila válida tanto de actividad como de oferta
+def _post_importacion(usuario, parametros):
+    contenido = 'titulo,enlace,descripcion,actividades\nImportada,http://localhost:8000/,Descripción,{}\n'.format(
+        parametros['identificador'])
+    return {'data': {'fichero': SimpleUploadedFile('importacion.csv', contenido.encode())}}
+
+# Vistas que solo admiten POST, con la función que prepara los datos de su petición. Los datos se preparan dentro de la
+# transacción de la visita, antes de empezar a contar las consultas
+peticiones_post = {
+    'sesionactividad_final': _post_sesionactividad_final,
+    'sesionactividad_final_varias': _post_sesionactividad_final_varias,
+    'actividad_importacion': _post_importacion,
+    'oferta_importacion': _post_importacion,
+}
+
+# Construye la url a visitar a partir de la ruta de un patrón, sustituyendo sus parámetros
+def _url(patron, parametros):
+    ruta = str(patron.pattern)
+    for (nombre, valor) in parametros.items():
+        for conversor in ['int', 'str']:
+            ruta = ruta.replace('<{}:{}>'.format(conversor, nombre), str(valor))
+    return '/' + ruta
+
+# Ejecuta una consulta y añade su duración en segundos a la lista de tiempos
+def _mide_consulta(tiempos, execute, sql, params, many, context):
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        tiempos.append(time.perf_counter() - inicio)
+
+# Visita cada url con cada usuario y devuelve, por cada vista (su nombre, o su ruta si no tiene) y usuario, el número de
+# consultas y el tiempo total de las consultas en milisegundos. Las vistas que solo admiten POST se visitan con los datos
+# de peticiones_post, y si una vista rechaza el método con el que se visita se produce un error, para que no se mida su
+# respuesta de error. Cada visita se realiza en una transacción que se deshace, para que las vistas que modifican datos
+# no afecten a las siguientes, y con la caché vacía
+def mide_consultas_vistas():
+    resultados = {}
+    client = Client()
+    # No se muestran los avisos de las urls a las que el usuario no tiene acceso
+    logger = logging.getLogger('django.request')
+    nivel = logger.level
+    logger.setLevel(logging.ERROR)
+    try:
+        for username in usuarios_consultas:
+            usuario = Usuario.objects.get(django_user__username=username)
+            parametros = _parametros(usuario)
+            for patron in get_urls():
+                nombre = patron.name or str(patron.pattern)
+                url = _url(patron, parametros)
+                with transaction.atomic():
+                    client.force_login(User.objects.get(username=username))
+                    cache.clear()
+                    peticion_post = peticiones_post[nombre](usuario, parametros) if nombre in peticiones_post else None
+                    tiempos = []
+                    with connection.execute_wrapper(lambda *args: _mide_consulta(tiempos, *args)):
+                        response = client.post(url, **peticion_post) if peticion_post else client.get(url)
+                        # Las consultas de las respuestas en streaming se realizan al recorrer su contenido
+                        if response.streaming:
+                            b''.join(response.streaming_content)
+                    transaction.set_rollback(True)
+                if response.status_code == 405:
+                    raise ValueError('La vista {} no admite el método {}. Si solo admite POST, se deben añadir los '
+                        'datos de su petición a peticiones_post'.format(nombre, 'POST' if peticion_post else 'GET'))
+                resultados['{} {}'.format(nombre, username)] = {
+                    'consultas': len(tiempos),
+                    'tiempo': sum(tiempos) * 1000,
+                }
+    finally:
+        logger.setLevel(nivel)
+    return resultados
+
+# Lee la línea base de consultas
+def lee_linea_base(fichero=fichero_linea_base):
+    with open(fichero) as f:
+        return json.load(f)
+
+# Guarda como línea base el número de consultas de cada vista
+def guarda_linea_base(resultados, fichero=fichero_linea_base):
+    with open(fichero, 'w') as f:
+        json.dump({vista: resultado['consultas'] for (vista, resultado) in sorted(resultados.items())}, f, indent=4,
+            ensure_ascii=False)
+        f.write('\n')
+
+# Compara los resultados con la línea base y devuelve los mensajes de las vistas que hacen más consultas que en la línea
+# base o que no están en ella
+def compara_linea_base(resultados, linea_base):
+    regresiones = []
+    for (vista, resultado) in sorted(resultados.items()):
+        if vista not in linea_base:
+            regresiones.append('{}: {} consultas, no está en la línea base'.format(vista, resultado['consultas']))
+        elif resultado['consultas'] > linea_base[vista]:
+            regresiones.append('{}: {} consultas, {} en la línea base'.format(vista, resultado['consultas'],
+                linea_base[vista]))
+    return regresiones
+
+# Genera un informe con las vistas ordenadas por coste en la base de datos, de mayor a menor número de consultas y de
+# tiempo
+def informe_consultas(resultados, linea_base=None):
+    lineas = ['{:<60} {:>10} {:>10} {:>10}'.format('vista', 'consultas', 'base', 'tiempo ms')]
+    for (vista, resultado) in sorted(resultados.items(), key=lambda item: (-item[1]['consultas'], -item[1]['tiempo'])):
+        base = linea_base.get(vista, '-') if linea_base is not None else '-'
+        lineas.append('{:<60} {:>10} {:>10} {:>10.2f}'.format(vista, resultado['consultas'], base, resultado['tiempo']))
+    return '\n'.join(lineas)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from websecurityapp.services.oferta_services import actualiza_ofertas_actividades_vetadas, \
+    get_ofertas_inconsistentes_actividades_vetadas
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero si cada oferta tiene actividades requeridas vetadas, o comprueba que el valor ' \
+        'almacenado es consistente con el veto de las actividades'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comprueba', action='store_true',
+            help='Solo comprueba la consistencia, sin modificar las ofertas. Falla si hay ofertas inconsistentes')
+
+    def handle(self, *args, **options):
+        if options['comprueba']:
+            inconsistentes = list(get_ofertas_inconsistentes_actividades_vetadas().values_list(
+                'id', 'identificador', 'tiene_actividades_vetadas'))
+            for (id, identificador, tiene_actividades_vetadas) in inconsistentes:
+                self.stdout.write('Oferta {} ({}): tiene_actividades_vetadas={} no coincide con sus actividades'.format(
+                    id, identificador, tiene_actividades_vetadas))
+            if inconsistentes:
+                raise CommandError('Hay {} ofertas inconsistentes'.format(len(inconsistentes)))
+            self.stdout.write(self.style.SUCCESS('Todas las ofertas son consistentes'))
+        else:
+            with transaction.atomic():
+                n_ofertas = actualiza_ofertas_actividades_vetadas()
+            self.stdout.write(self.style.SUCCESS('Se han recalculado {} ofertas'.format(n_ofertas)))
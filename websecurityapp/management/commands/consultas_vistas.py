@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from websecurityapp.consultas import carga_datos_consultas, mide_consultas_vistas, lee_linea_base, \
+    guarda_linea_base, compara_linea_base, informe_consultas
+
+
+class Command(BaseCommand):
+    help = 'Visita todas las urls sobre una base de datos de prueba con datos generados y compara el número de ' \
+        'consultas de cada vista con la línea base. Falla si alguna vista hace más consultas que en la línea base'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--informe', action='store_true',
+            help='Muestra las vistas ordenadas por coste en la base de datos, sin comparar con la línea base')
+        parser.add_argument('--actualiza', action='store_true',
+            help='Guarda el número de consultas de cada vista como nueva línea base')
+
+    def handle(self, *args, **options):
+        # Se usa una base de datos de prueba, como en los tests, para no depender de los datos existentes
+        setup_test_environment()
+        nombre_base_datos = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            carga_datos_consultas()
+            resultados = mide_consultas_vistas()
+        finally:
+            connection.creation.destroy_test_db(nombre_base_datos, verbosity=0)
+            teardown_test_environment()
+        if options['actualiza']:
+            guarda_linea_base(resultados)
+            self.stdout.write(self.style.SUCCESS('Se ha actualizado la línea base de {} vistas'.format(len(resultados))))
+            return
+        linea_base = lee_linea_base()
+        if options['informe']:
+            self.stdout.write(informe_consultas(resultados, linea_base))
+            return
+        regresiones = compara_linea_base(resultados, linea_base)
+        for regresion in regresiones:
+            self.stdout.write(regresion)
+        if regresiones:
+            raise CommandError('Hay {} vistas que hacen más consultas que en la línea base'.format(len(regresiones)))
+        self.stdout.write(self.style.SUCCESS('Ninguna vista hace más consultas que en la línea base'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from websecurityapp.services.sesionactividad_services import elimina_sesionesactividad_expiradas, \
+    get_distribucion_edad_sesionesactividad, tamaño_lote_sesionesactividad
+from websecurityserver.settings import tiempo_sesionactividad
+
+
+# Muestra una duración en segundos en la mayor unidad exacta
+def formatea_segundos(segundos):
+    for (unidad, duracion) in [('d', 24 * 3600), ('h', 3600), ('min', 60)]:
+        if segundos and segundos % duracion == 0:
+            return '{} {}'.format(segundos // duracion, unidad)
+    return '{} s'.format(segundos)
+
+
+class Command(BaseCommand):
+    help = 'Elimina en lotes las sesiones de actividad expiradas, comenzadas y nunca terminadas, y muestra cuántas ' \
+        'se han eliminado y la distribución por edad de las que quedan. Pensado para ejecutarse periódicamente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tiempo', type=int, default=tiempo_sesionactividad,
+            help='Tiempo de vida de las sesiones en segundos. Por defecto, el de la configuración')
+        parser.add_argument('--lote', type=int, default=tamaño_lote_sesionesactividad,
+            help='Número de sesiones eliminadas en cada transacción')
+        parser.add_argument('--pausa', type=float, default=0, help='Pausa en segundos entre lotes')
+
+    def handle(self, *args, **options):
+        if options['tiempo'] < 0 or options['lote'] <= 0:
+            raise CommandError('El tiempo de vida no puede ser negativo y el tamaño del lote debe ser positivo')
+        eliminadas = elimina_sesionesactividad_expiradas(options['tiempo'], options['lote'], options['pausa'])
+        self.stdout.write(self.style.SUCCESS('Se han eliminado {} sesiones expiradas (comenzadas hace más de {})'.format(
+            eliminadas, formatea_segundos(options['tiempo']))))
+        distribucion = get_distribucion_edad_sesionesactividad()
+        self.stdout.write('Quedan {} sesiones:'.format(sum(numero for (inicio, final, numero) in distribucion)))
+        for (inicio, final, numero) in distribucion:
+            tramo = '{} - {}'.format(formatea_segundos(inicio), formatea_segundos(final)) if final is not None \
+                else 'más de {}'.format(formatea_segundos(inicio))
+            self.stdout.write('{:<20} {:>10}'.format(tramo, numero))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from websecurityapp.models.perfil_models import Usuario
+from websecurityapp.services.exportacion_services import exportaciones, formatos_exportacion, formatea_exportacion
+
+
+class Command(BaseCommand):
+    help = 'Exporta las actividades, las ofertas o las solicitudes visibles para un usuario en CSV o JSONL, leyendo ' \
+        'las filas por bloques'
+
+    def add_arguments(self, parser):
+        parser.add_argument('entidad', choices=sorted(exportaciones))
+        parser.add_argument('--usuario', required=True, help='Nombre del usuario para el que se exportan los datos')
+        parser.add_argument('--formato', choices=sorted(formatos_exportacion), default='csv')
+        parser.add_argument('--salida', help='Fichero en el que se escriben los datos. Por defecto, la salida estándar')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = Usuario.objects.select_related('django_user').get(django_user__username=options['usuario'])
+        except Usuario.DoesNotExist:
+            raise CommandError('No existe el usuario {}'.format(options['usuario']))
+        nombres, filas = exportaciones[options['entidad']](usuario)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8', newline='') as salida:
+                salida.writelines(formatea_exportacion(options['formato'], nombres, filas))
+        else:
+            for linea in formatea_exportacion(options['formato'], nombres, filas):
+                self.stdout.write(linea, ending='')
@@ -0,0 +1,42 @@
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from websecurityapp.services.dataset_services import genera_dataset, fecha_base_dataset
+
+
+class Command(BaseCommand):
+    help = 'Genera un conjunto de datos sintético para pruebas de carga, insertándolo por lotes. Para la misma semilla ' \
+        'y la misma fecha base se genera siempre el mismo conjunto de datos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Número de usuarios')
+        parser.add_argument('--actividades', type=int, default=100000, help='Número de actividades')
+        parser.add_argument('--ofertas', type=int, default=20000, help='Número de ofertas')
+        parser.add_argument('--seed', type=int, default=0, help='Semilla de las decisiones aleatorias')
+        parser.add_argument('--prefijo', default='dataset',
+            help='Prefijo de los nombres de usuario y de los identificadores. La contraseña de los usuarios es el prefijo')
+        parser.add_argument('--realizadas-por-usuario', type=int, default=10,
+            help='Número medio de actividades realizadas por cada usuario')
+        parser.add_argument('--solicitudes-por-usuario', type=int, default=2,
+            help='Número medio de ofertas solicitadas por cada usuario')
+        parser.add_argument('--fecha-base', type=date.fromisoformat, default=fecha_base_dataset,
+            help='Fecha (AAAA-MM-DD) anterior a las fechas de creación generadas')
+        parser.add_argument('--lote', type=int, default=5000, help='Número de filas insertadas en cada consulta')
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=options['prefijo'] + '_').exists():
+            raise CommandError('Ya existen usuarios con el prefijo {}'.format(options['prefijo']))
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            filas = genera_dataset(options['users'], options['actividades'], options['ofertas'], options['seed'],
+                prefijo=options['prefijo'], realizadas_por_usuario=options['realizadas_por_usuario'],
+                solicitudes_por_usuario=options['solicitudes_por_usuario'], tamaño_lote=options['lote'],
+                fecha_base=options['fecha_base'])
+        for (tabla, n_filas) in filas.items():
+            self.stdout.write('{}: {}'.format(tabla, n_filas))
+        self.stdout.write(self.style.SUCCESS('Se han generado {} filas en {:.1f} s'.format(sum(filas.values()),
+            time.perf_counter() - inicio)))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from websecurityapp.models.perfil_models import Usuario
+from websecurityapp.services.importacion_services import importaciones, formatos_importacion, lee_filas, \
+    tamaño_bloque_importacion
+
+
+class Command(BaseCommand):
+    help = 'Importa actividades u ofertas desde un fichero CSV o JSONL, validándolas e insertándolas por bloques. Las ' \
+        'filas no válidas se indican con su número y no impiden importar el resto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('entidad', choices=sorted(importaciones))
+        parser.add_argument('fichero')
+        parser.add_argument('--usuario', required=True, help='Nombre del usuario autor de los objetos importados')
+        parser.add_argument('--formato', choices=formatos_importacion,
+            help='Formato del fichero. Por defecto, el de su extensión')
+        parser.add_argument('--bloque', type=int, default=tamaño_bloque_importacion,
+            help='Número de filas que se validan e insertan en cada transacción')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = Usuario.objects.select_related('django_user').get(django_user__username=options['usuario'])
+        except Usuario.DoesNotExist:
+            raise CommandError('No existe el usuario {}'.format(options['usuario']))
+        formato = options['formato'] or options['fichero'].rsplit('.', 1)[-1].lower()
+        if formato not in formatos_importacion:
+            raise CommandError('No se reconoce el formato del fichero {}'.format(options['fichero']))
+        with open(options['fichero'], encoding='utf-8', newline='') as fichero:
+            resultado = importaciones[options['entidad']](usuario, lee_filas(fichero, formato), options['bloque'])
+        for (numero, mensaje) in resultado['errores']:
+            self.stdout.write('Fila {}: {}'.format(numero, mensaje))
+        self.stdout.write(self.style.SUCCESS('Se han importado {} {}, {} filas con errores'.format(
+            resultado['importados'], options['entidad'], len(resultado['errores']))))
@@ -0,0 +1,16 @@
+from django.db import connections
+
+# Comprueba al comenzar cada petición que las conexiones persistentes a la base de datos siguen siendo válidas, y cierra
+# las que no lo son para que se abra una nueva en la siguiente consulta. Sin esta comprobación, una conexión cerrada por
+# la base de datos o por un pool externo mientras estaba inactiva hace fallar la primera consulta de la petición
+class ComprobacionConexionesMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        for conexion in connections.all():
+            if conexion.connection is not None and conexion.settings_dict['CONN_MAX_AGE'] != 0 \
+                    and not conexion.is_usable():
+                conexion.close()
+        return self.get_response(request)
@@ -0,0 +1,26 @@
+# Generated by Django 3.0.2 on 2026-10-18 10:12
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def calcula_tiene_actividades_vetadas(apps, schema_editor):
+    Oferta = apps.get_model('websecurityapp', 'Oferta')
+    Oferta.objects.update(tiene_actividades_vetadas=Exists(
+        Oferta.actividades.through.objects.filter(oferta=OuterRef('pk'), actividad__vetada=True)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('websecurityapp', '0014_solicitud'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='oferta',
+            name='tiene_actividades_vetadas',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(calcula_tiene_actividades_vetadas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.0.2 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('websecurityapp', '0015_oferta_tiene_actividades_vetadas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actividad',
+            index=models.Index(condition=models.Q(borrador=False), fields=['id'], name='actividad_publicada_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actividad',
+            index=models.Index(condition=models.Q(('borrador', False), ('vetada', False)), fields=['id'], name='actividad_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='oferta',
+            index=models.Index(condition=models.Q(('borrador', False), ('cerrada', False)), fields=['id'], name='oferta_publicada_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='oferta',
+            index=models.Index(condition=models.Q(('borrador', False), ('cerrada', False), ('tiene_actividades_vetadas', False), ('vetada', False)), fields=['id'], name='oferta_visible_idx'),
+        ),
+    ]
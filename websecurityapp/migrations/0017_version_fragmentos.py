@@ -0,0 +1,28 @@
+# Generated by Django 3.0.2 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('websecurityapp', '0016_indices_listados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actividad',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='oferta',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
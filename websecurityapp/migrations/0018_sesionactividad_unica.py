@@ -0,0 +1,33 @@
+# Generated by Django 3.0.2 on 2026-10-18 17:40
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+# Elimina las sesiones repetidas de un usuario en una actividad, conservando la más reciente, para poder añadir la
+# restricción de unicidad
+def elimina_sesiones_repetidas(apps, schema_editor):
+    SesionActividad = apps.get_model('websecurityapp', 'SesionActividad')
+    ids_conservadas = SesionActividad.objects.values('usuario', 'actividad').annotate(ultima=Max('id')) \
+        .values_list('ultima', flat=True)
+    SesionActividad.objects.exclude(id__in=list(ids_conservadas)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('websecurityapp', '0017_version_fragmentos'),
+    ]
+
+    operations = [
+        migrations.RunPython(elimina_sesiones_repetidas, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='sesionactividad',
+            name='token',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='sesionactividad',
+            constraint=models.UniqueConstraint(fields=('usuario', 'actividad'), name='sesionactividad_usuario_actividad_unica'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.0.2 on 2026-10-18 18:25
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('websecurityapp', '0018_sesionactividad_unica'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sesionactividad',
+            name='fecha_creacion',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
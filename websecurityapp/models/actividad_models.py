@@ -1,7 +1,9 @@
 from django.db import models
+from django.db.models import Q
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 from websecurityapp.models.perfil_models import Usuario
 from websecurityapp.validators import past_validator
@@ -17,6 +19,18 @@ class Actividad(models.Model):
     fecha_creacion = models.DateField(validators = [past_validator])
     comentable = models.BooleanField()
     identificador = models.CharField(max_length = 30, unique = True)
+    # Contador de versión que se incrementa desde los servicios al modificar la actividad. Forma parte de la clave de los
+    # fragmentos cacheados de los listados, para que no se usen los fragmentos generados con los datos anteriores
+    version = models.PositiveIntegerField(default = 0)
+
+    class Meta:
+        # Índices parciales para los listados de actividades, que filtran por las actividades publicadas (y no vetadas
+        # para los usuarios que no son administradores) o por autor, y se ordenan por id. La condición por autor usa el
+        # índice de la clave ajena, y la base de datos combina ambos índices en un BitmapOr
+        indexes = [
+            models.Index(fields = ['id'], name = 'actividad_publicada_idx', condition = Q(borrador = False)),
+            models.Index(fields = ['id'], name = 'actividad_visible_idx', condition = Q(borrador = False, vetada = False)),
+        ]
 
     def clean(self):
         super().clean()
@@ -27,5 +41,16 @@ class Actividad(models.Model):
 class SesionActividad(models.Model):
     usuario = models.ForeignKey(Usuario, on_delete = models.CASCADE)
     actividad = models.ForeignKey(Actividad, on_delete = models.CASCADE)
-    token = models.CharField(max_length = 100)
+    # Token aleatorio con el que el ejercicio termina la sesión. Se indexa porque la sesión se busca por su token
+    token = models.CharField(max_length = 100, db_index = True)
+    # Momento en el que se comenzó la sesión, o se renovó su token. Las sesiones expiran pasado su tiempo de vida, y se
+    # indexa para eliminar por lotes las sesiones expiradas
+    fecha_creacion = models.DateTimeField(default = timezone.now, db_index = True)
+
+    class Meta:
+        # Cada usuario tiene como mucho una sesión abierta en cada actividad. Al comenzar de nuevo la actividad se
+        # sustituye el token de la sesión, en lugar de crear otra fila
+        constraints = [
+            models.UniqueConstraint(fields = ['usuario', 'actividad'], name = 'sesionactividad_usuario_actividad_unica'),
+        ]
     
\ No newline at end of file
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
@@ -18,6 +19,22 @@ class Oferta(models.Model):
     identificador = models.CharField(max_length = 30, unique = True)
     autor = models.ForeignKey(Usuario, on_delete=models.CASCADE)
     actividades = models.ManyToManyField(Actividad)
+    # Indica si alguna de las actividades requeridas está vetada. Se mantiene actualizado desde los servicios que
+    # modifican las actividades requeridas o el veto de las actividades, para no tener que consultarlo en cada listado
+    tiene_actividades_vetadas = models.BooleanField(default = False)
+    # Contador de versión que se incrementa desde los servicios al modificar la oferta, con el mismo uso que el de las
+    # actividades
+    version = models.PositiveIntegerField(default = 0)
+
+    class Meta:
+        # Índices parciales para los listados de ofertas, que filtran por las ofertas publicadas y abiertas (y sin vetos
+        # para los usuarios que no son administradores) o por autor, y se ordenan por id. La condición por autor usa el
+        # índice de la clave ajena, como en las actividades
+        indexes = [
+            models.Index(fields = ['id'], name = 'oferta_publicada_idx', condition = Q(borrador = False, cerrada = False)),
+            models.Index(fields = ['id'], name = 'oferta_visible_idx', condition = Q(borrador = False, cerrada = False,
+                vetada = False, tiene_actividades_vetadas = False)),
+        ]
 
     def clean(self):
         super().clean()
@@ -40,9 +57,11 @@ class Solicitud(models.Model):
         if self.oferta.borrador:
             raise ValidationError('No puede haber una oferta en modo borrador en una solicitud')
         actividades_requeridas = self.oferta.actividades.all()
-        actividades_realizadas = self.usuario.actividades_realizadas.all()
+        # Se obtienen de una vez los ids de las actividades requeridas que ha realizado el usuario
+        ids_actividades_realizadas = frozenset(self.usuario.actividades_realizadas.filter(
+            pk__in=[actividad.id for actividad in actividades_requeridas]).values_list('id', flat=True))
         for actividad in actividades_requeridas:
-            if not actividad in actividades_realizadas:
+            if not actividad.id in ids_actividades_realizadas:
                 raise ValidationError("El usuario debe haber resuelto todas las actividades para poder solicitar la oferta")
         if self.usuario == self.oferta.autor:
             raise ValidationError("El autor de la oferta no puede ser un solicitante de la misma")
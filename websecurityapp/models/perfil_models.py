@@ -13,6 +13,9 @@ class Usuario(models.Model):
     es_admin = models.BooleanField()
     # Para evitar errores de importación circular de clases, se referencia la clase usando <nombre_app>.<clase_entidad>
     actividades_realizadas = models.ManyToManyField('websecurityapp.Actividad')
+    # Contador de versión que se incrementa al editar el perfil. Los fragmentos cacheados de los listados muestran el
+    # nombre del autor, por lo que su clave incluye también la versión del autor
+    version = models.PositiveIntegerField(default = 0)
 
 class Anexo(models.Model):
     usuario = models.ForeignKey(Usuario, on_delete = models.CASCADE)
@@ -5,4 +5,9 @@ class SesionActividadSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = SesionActividad
-        fields = ['token']
\ No newline at end of file
+        fields = ['token']
+
+# Datos de cada sesión terminada en una petición que termina varias sesiones a la vez
+class SesionActividadTerminadaSerializer(serializers.Serializer):
+    identificador = serializers.CharField(max_length = 30)
+    token = serializers.CharField(max_length = 100)
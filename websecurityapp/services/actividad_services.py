@@ -7,26 +7,63 @@ from django.db.models import Q
 
 from websecurityapp.models.actividad_models import Actividad
 from websecurityapp.models.perfil_models import Usuario
+from websecurityapp.models.oferta_models import Oferta
 from websecurityapp.forms.actividad_forms import ActividadEdicionForm
 from websecurityapp.exceptions import UnallowedUserException
-from websecurityapp.services.util_services import genera_identificador
+from websecurityapp.services.util_services import guarda_con_identificador, guarda_incrementando_version, \
+    aplica_plan_carga
+from websecurityapp.services.perfil_services import get_usuario
+from websecurityapp.services.oferta_services import actualiza_ofertas_actividades_vetadas
+
+# Plan de carga de los listados de actividades. Cada fila muestra el nombre del autor y su clave en la caché incluye la
+# versión del autor, por lo que el autor y su usuario de Django se obtienen en la misma consulta. Solo se cargan las
+# columnas que usan las plantillas de los listados
+plan_listado_actividades = {
+    'select_related': ['autor__django_user'],
+    'prefetch_related': [],
+    'only': ['id', 'titulo', 'descripcion', 'fecha_creacion', 'borrador', 'vetada', 'version', 'autor', 'autor__version',
+        'autor__django_user', 'autor__django_user__first_name', 'autor__django_user__last_name'],
+}
+
+# Obtiene las actividades que puede ver el usuario dado, ordenadas por id. La primera rama del OR tiene la misma forma que la
+# condición del índice parcial de las actividades y la segunda usa el índice del autor, para que la base de datos pueda
+# combinar ambos índices
+def get_actividades_visibles(usuario):
+    if usuario.es_admin:
+        return Actividad.objects.filter(Q(borrador=False) | Q(autor=usuario)).order_by('id')
+    else:
+        return Actividad.objects.filter(Q(borrador=False, vetada=False) | Q(autor=usuario)).order_by('id')
+
+# Obtiene el conjunto de ids de las actividades realizadas por el usuario, de entre las actividades dadas o de todas si no
+# se indican, con una única consulta sobre la tabla intermedia. Con el conjunto se comprueba en tiempo constante si el
+# usuario ha realizado cada actividad, en lugar de recorrer sus actividades realizadas
+def get_ids_actividades_realizadas(usuario, actividades=None):
+    realizadas = Usuario.actividades_realizadas.through.objects.filter(usuario=usuario)
+    if actividades is not None:
+        realizadas = realizadas.filter(actividad_id__in=[actividad.id for actividad in actividades])
+    return frozenset(realizadas.values_list('actividad_id', flat=True))
+
+# Marca cada una de las actividades dadas, normalmente las de una página de un listado, con el atributo realizada, que
+# indica si el usuario la ha realizado. Devuelve el conjunto de ids de las actividades realizadas
+def marca_actividades_realizadas(usuario, actividades):
+    ids_realizadas = get_ids_actividades_realizadas(usuario, actividades)
+    for actividad in actividades:
+        actividad.realizada = actividad.id in ids_realizadas
+    return ids_realizadas
 
 @transaction.atomic
 def listado_actividades(request):
     if not request.user.is_authenticated:
         raise Exception('Se debe estar autenticado para listar las actividades')
-    usuario = Usuario.objects.get(django_user__id=request.user.id)
-    if usuario.es_admin:
-        return Actividad.objects.exclude(Q(borrador=True) & ~Q(autor=usuario)).order_by('id')
-    else:
-        return Actividad.objects.exclude((Q(borrador=True) | Q(vetada=True)) & ~Q(autor=usuario)).order_by('id')
+    usuario = get_usuario(request)
+    return aplica_plan_carga(get_actividades_visibles(usuario), plan_listado_actividades)
 
 @transaction.atomic
 def listado_actividades_propias(request):
     if not request.user.is_authenticated:
         raise Exception('Se debe estar autenticado para listar las actividades')
-    usuario = Usuario.objects.get(django_user__id=request.user.id)
-    return Actividad.objects.filter(autor=usuario).order_by('id')
+    usuario = get_usuario(request)
+    return aplica_plan_carga(Actividad.objects.filter(autor=usuario).order_by('id'), plan_listado_actividades)
 
 @transaction.atomic
 def crea_actividad(actividad_dict, request):
@@ -41,10 +78,10 @@ def crea_actividad(actividad_dict, request):
         borrador = True,
         vetada = False,
         fecha_creacion = date.today(),
-        identificador = 'ACT-' + genera_identificador(),
     )
-    actividad.full_clean()
-    actividad.save()
+    # El identificador se genera al guardar, y su unicidad la comprueba la base de datos
+    actividad.full_clean(exclude = ['identificador'])
+    guarda_con_identificador(actividad, 'ACT-')
     return actividad
 
 def actividad_formulario(actividad):
@@ -70,7 +107,7 @@ def edita_actividad(request, form_data, actividad):
     actividad.comentable = form_data['comentable']
     actividad.borrador = form_data['borrador']
     actividad.full_clean()
-    actividad.save(update_fields = ['titulo', 'enlace', 'descripcion', 'comentable', 'borrador'])
+    guarda_incrementando_version(actividad, ['titulo', 'enlace', 'descripcion', 'comentable', 'borrador'])
     return actividad
 
 @transaction.atomic
@@ -83,7 +120,7 @@ def elimina_actividad(request, actividad):
 
 @transaction.atomic
 def veta_actividad(request, form_data, actividad):
-    usuario = Usuario.objects.get(django_user_id = request.user.id)
+    usuario = get_usuario(request)
     if not usuario.es_admin:
         raise Exception('Se requieren permisos de administrador para realizar esta accion')
     if actividad.vetada:
@@ -91,11 +128,13 @@ def veta_actividad(request, form_data, actividad):
     actividad.motivo_veto = form_data['motivo_veto']
     actividad.vetada = True
     actividad.full_clean()
-    actividad.save(update_fields = ['motivo_veto', 'vetada'])
+    guarda_incrementando_version(actividad, ['motivo_veto', 'vetada'])
+    # Se marcan las ofertas que requieren la actividad como ofertas con actividades vetadas
+    actualiza_ofertas_actividades_vetadas(Oferta.objects.filter(actividades=actividad))
 
 @transaction.atomic
 def levanta_veto_actividad(request, actividad):
-    usuario = Usuario.objects.get(django_user_id = request.user.id)
+    usuario = get_usuario(request)
     if not usuario.es_admin:
         raise Exception('Se requieren permisos de administrador para realizar esta accion')
     if not actividad.vetada:
@@ -103,4 +142,6 @@ def levanta_veto_actividad(request, actividad):
     actividad.motivo_veto = None
     actividad.vetada = False
     actividad.full_clean()
-    actividad.save(update_fields = ['motivo_veto', 'vetada'])
+    guarda_incrementando_version(actividad, ['motivo_veto', 'vetada'])
+    # Se recalcula si las ofertas que requieren la actividad siguen teniendo otras actividades vetadas
+    actualiza_ofertas_actividades_vetadas(Oferta.objects.filter(actividades=actividad))
@@ -0,0 +1,35 @@
+import threading
+
+# Número de aciertos y de fallos de la caché de fragmentos de plantilla por nombre de fragmento, desde que se arrancó el
+# proceso o desde que se reiniciaron las métricas
+_metricas_fragmentos = {}
+_cerrojo_metricas = threading.Lock()
+
+
+# Registra un acceso a la caché de un fragmento, que es un acierto si el fragmento estaba en la caché
+def registra_acceso_fragmento(nombre, acierto):
+    with _cerrojo_metricas:
+        metricas = _metricas_fragmentos.setdefault(nombre, [0, 0])
+        metricas[0 if acierto else 1] += 1
+
+# Resume las métricas de unos aciertos y fallos con su tasa de aciertos
+def _resumen(aciertos, fallos):
+    return {
+        'aciertos': aciertos,
+        'fallos': fallos,
+        'tasa_aciertos': aciertos / (aciertos + fallos) if aciertos + fallos else None,
+    }
+
+# Obtiene los aciertos, los fallos y la tasa de aciertos de cada fragmento y del total de fragmentos
+def get_metricas_fragmentos():
+    with _cerrojo_metricas:
+        metricas = {nombre: list(valores) for (nombre, valores) in _metricas_fragmentos.items()}
+    return {
+        'fragmentos': {nombre: _resumen(aciertos, fallos) for (nombre, (aciertos, fallos)) in sorted(metricas.items())},
+        'total': _resumen(sum(aciertos for (aciertos, fallos) in metricas.values()),
+            sum(fallos for (aciertos, fallos) in metricas.values())),
+    }
+
+def reinicia_metricas_fragmentos():
+    with _cerrojo_metricas:
+        _metricas_fragmentos.clear()
@@ -0,0 +1,175 @@
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from websecurityapp.models.actividad_models import Actividad
+from websecurityapp.models.oferta_models import Oferta, Solicitud
+from websecurityapp.models.perfil_models import Usuario
+
+# Proporciones de los distintos estados de los objetos generados
+proporcion_admins = 0.02
+proporcion_usuarios_vetados = 0.03
+proporcion_actividades_borrador = 0.1
+proporcion_actividades_vetadas = 0.03
+proporcion_ofertas_borrador = 0.1
+proporcion_ofertas_cerradas = 0.2
+proporcion_ofertas_vetadas = 0.02
+# Número máximo de actividades requeridas por una oferta
+max_actividades_requeridas = 3
+# Antigüedad máxima en días de los objetos generados
+max_antiguedad = 3 * 365
+# Fecha a partir de la cual se calcula por defecto la antigüedad de los objetos generados. Es fija para que la misma
+# semilla genere el mismo conjunto de datos cualquier día
+fecha_base_dataset = date(2026, 1, 1)
+
+
+# Genera un número aleatorio de elementos alrededor de una media dada, entre 0 y el doble de la media
+def _cantidad(aleatorio, media):
+    return aleatorio.randint(0, 2 * media) if media > 0 else 0
+
+# Inserta en la base de datos por lotes los objetos que devuelve un generador, sin tener todos los objetos en memoria.
+# Cada lote se divide a su vez según el número máximo de parámetros por consulta de la base de datos
+def _inserta_por_lotes(modelo, objetos, tamaño_lote):
+    lote = []
+    n_objetos = 0
+    for objeto in objetos:
+        lote.append(objeto)
+        if len(lote) >= tamaño_lote:
+            modelo.objects.bulk_create(lote)
+            n_objetos += len(lote)
+            lote = []
+    modelo.objects.bulk_create(lote)
+    return n_objetos + len(lote)
+
+# Genera un conjunto de datos sintético con el número de usuarios, actividades y ofertas indicado, insertándolo por
+# lotes. Las decisiones aleatorias se toman sobre la posición de cada objeto en el orden de creación, por lo que para la
+# misma semilla y la misma fecha base se genera siempre el mismo conjunto de datos. Las fechas de creación son anteriores
+# a la fecha base. Los nombres de usuario y los identificadores empiezan por el prefijo dado. Devuelve el número de filas
+# insertadas en cada tabla
+def genera_dataset(n_usuarios, n_actividades, n_ofertas, semilla, prefijo='dataset', realizadas_por_usuario=10,
+        solicitudes_por_usuario=2, tamaño_lote=5000, fecha_base=None):
+    aleatorio = random.Random(semilla)
+    if fecha_base is None:
+        fecha_base = fecha_base_dataset
+    fecha = lambda: fecha_base - timedelta(days=aleatorio.randint(1, max_antiguedad))
+    # Todos los usuarios tienen la misma contraseña, que es su prefijo, para no calcular un hash por usuario
+    password = make_password(prefijo)
+    _inserta_por_lotes(User, (User(
+        username='{}_{}'.format(prefijo, i),
+        email='{}_{}@{}.com'.format(prefijo, i, prefijo),
+        password=password,
+    ) for i in range(n_usuarios)), tamaño_lote)
+    django_users = User.objects.filter(username__startswith=prefijo + '_').order_by('id').values_list('id', flat=True)
+    _inserta_por_lotes(Usuario, (Usuario(
+        django_user_id=django_user_id,
+        telefono=str(aleatorio.randint(600000000, 699999999)) if aleatorio.random() < 0.5 else None,
+        vetado=aleatorio.random() < proporcion_usuarios_vetados,
+        es_admin=aleatorio.random() < proporcion_admins,
+    ) for django_user_id in django_users.iterator()), tamaño_lote)
+    ids_usuarios = list(Usuario.objects.filter(django_user__username__startswith=prefijo + '_').order_by('id')
+        .values_list('id', flat=True))
+
+    # Se guarda qué actividades están publicadas y cuáles vetadas para decidir las actividades requeridas por las ofertas
+    actividades_publicadas = []
+    actividades_vetadas = set()
+
+    def genera_actividades():
+        for i in range(n_actividades):
+            borrador = aleatorio.random() < proporcion_actividades_borrador
+            vetada = not borrador and aleatorio.random() < proporcion_actividades_vetadas
+            if not borrador:
+                actividades_publicadas.append(i)
+            if vetada:
+                actividades_vetadas.add(i)
+            yield Actividad(
+                titulo='Actividad {}'.format(i),
+                autor_id=aleatorio.choice(ids_usuarios),
+                enlace='http://localhost:8000/actividad/{}'.format(i),
+                descripcion='Descripción de la actividad {}'.format(i),
+                borrador=borrador,
+                vetada=vetada,
+                motivo_veto='Motivo del veto de la actividad {}'.format(i) if vetada else None,
+                fecha_creacion=fecha(),
+                comentable=aleatorio.random() < 0.5,
+                identificador='{}-A{}'.format(prefijo, i),
+            )
+
+    _inserta_por_lotes(Actividad, genera_actividades(), tamaño_lote)
+    ids_actividades = list(Actividad.objects.filter(identificador__startswith=prefijo + '-A').order_by('id')
+        .values_list('id', flat=True))
+
+    # Se guardan las actividades requeridas y el autor de cada oferta, y las ofertas que se pueden solicitar
+    requeridas_por_oferta = []
+    autores_ofertas = []
+    ofertas_abiertas = []
+
+    def genera_ofertas():
+        for i in range(n_ofertas):
+            borrador = aleatorio.random() < proporcion_ofertas_borrador
+            cerrada = not borrador and aleatorio.random() < proporcion_ofertas_cerradas
+            vetada = not borrador and aleatorio.random() < proporcion_ofertas_vetadas
+            n_requeridas = min(aleatorio.randint(0, max_actividades_requeridas), len(actividades_publicadas))
+            requeridas = [actividades_publicadas[j] for j in aleatorio.sample(range(len(actividades_publicadas)),
+                n_requeridas)]
+            tiene_actividades_vetadas = any(j in actividades_vetadas for j in requeridas)
+            autor_id = aleatorio.choice(ids_usuarios)
+            requeridas_por_oferta.append(requeridas)
+            autores_ofertas.append(autor_id)
+            if not (borrador or cerrada or vetada or tiene_actividades_vetadas):
+                ofertas_abiertas.append(i)
+            yield Oferta(
+                titulo='Oferta {}'.format(i),
+                descripcion='Descripción de la oferta {}'.format(i),
+                autor_id=autor_id,
+                borrador=borrador,
+                cerrada=cerrada,
+                vetada=vetada,
+                motivo_veto='Motivo del veto de la oferta {}'.format(i) if vetada else None,
+                fecha_creacion=fecha(),
+                identificador='{}-O{}'.format(prefijo, i),
+                tiene_actividades_vetadas=tiene_actividades_vetadas,
+            )
+
+    _inserta_por_lotes(Oferta, genera_ofertas(), tamaño_lote)
+    ids_ofertas = list(Oferta.objects.filter(identificador__startswith=prefijo + '-O').order_by('id')
+        .values_list('id', flat=True))
+    n_requeridas = _inserta_por_lotes(Oferta.actividades.through, (Oferta.actividades.through(
+        oferta_id=ids_ofertas[i],
+        actividad_id=ids_actividades[j],
+    ) for (i, requeridas) in enumerate(requeridas_por_oferta) for j in requeridas), tamaño_lote)
+
+    # Cada usuario realiza algunas actividades publicadas y solicita algunas ofertas abiertas de otros usuarios, tras
+    # haber realizado las actividades que requieren
+    realizadas_por_usuario_generadas = []
+    solicitudes_generadas = []
+    for id_usuario in ids_usuarios:
+        n_solicitudes = min(_cantidad(aleatorio, solicitudes_por_usuario), len(ofertas_abiertas))
+        solicitadas = [ofertas_abiertas[j] for j in aleatorio.sample(range(len(ofertas_abiertas)), n_solicitudes)
+            if autores_ofertas[ofertas_abiertas[j]] != id_usuario]
+        n_realizadas = min(_cantidad(aleatorio, realizadas_por_usuario), len(actividades_publicadas))
+        realizadas = set(actividades_publicadas[j] for j in aleatorio.sample(range(len(actividades_publicadas)),
+            n_realizadas))
+        for j in solicitadas:
+            realizadas.update(requeridas_por_oferta[j])
+        realizadas_por_usuario_generadas.append(sorted(realizadas))
+        solicitudes_generadas.append(solicitadas)
+    n_realizadas = _inserta_por_lotes(Usuario.actividades_realizadas.through, (Usuario.actividades_realizadas.through(
+        usuario_id=id_usuario,
+        actividad_id=ids_actividades[j],
+    ) for (id_usuario, realizadas) in zip(ids_usuarios, realizadas_por_usuario_generadas) for j in realizadas),
+        tamaño_lote)
+    n_solicitudes = _inserta_por_lotes(Solicitud, (Solicitud(
+        usuario_id=id_usuario,
+        oferta_id=ids_ofertas[j],
+    ) for (id_usuario, solicitadas) in zip(ids_usuarios, solicitudes_generadas) for j in solicitadas), tamaño_lote)
+
+    return {
+        'usuarios': len(ids_usuarios),
+        'actividades': len(ids_actividades),
+        'ofertas': len(ids_ofertas),
+        'actividades requeridas': n_requeridas,
+        'actividades realizadas': n_realizadas,
+        'solicitudes': n_solicitudes,
+    }
@@ -0,0 +1,109 @@
+import csv
+import json
+from datetime import date
+
+from websecurityapp.models.oferta_models import Oferta, Solicitud
+from websecurityapp.services.actividad_services import get_actividades_visibles
+from websecurityapp.services.oferta_services import get_ofertas_visibles
+
+# Número de filas que se obtienen de la base de datos en cada bloque al exportar
+tamaño_bloque_exportacion = 2000
+
+# Formatos de exportación disponibles, con su tipo de contenido
+formatos_exportacion = {
+    'csv': 'text/csv',
+    'jsonl': 'application/jsonl',
+}
+
+# Columnas exportadas de cada entidad. Las columnas de una relación se obtienen con la sintaxis de las consultas. De los
+# usuarios se exporta el id y el nombre, pero no el nombre de usuario con el que se loguean
+campos_actividad = ['id', 'identificador', 'titulo', 'autor', 'autor__django_user__first_name',
+    'autor__django_user__last_name', 'enlace', 'descripcion', 'borrador', 'vetada', 'motivo_veto', 'fecha_creacion',
+    'comentable']
+campos_oferta = ['id', 'identificador', 'titulo', 'autor', 'autor__django_user__first_name',
+    'autor__django_user__last_name', 'descripcion', 'borrador', 'cerrada', 'vetada', 'motivo_veto', 'fecha_creacion']
+campos_solicitud = ['id', 'oferta__identificador', 'oferta__titulo', 'usuario', 'usuario__django_user__first_name',
+    'usuario__django_user__last_name']
+
+
+# Nombre de una columna en el fichero exportado, en el que las relaciones se separan por puntos
+def _nombre_columna(campo):
+    return campo.replace('__django_user__', '.').replace('__', '.')
+
+# Recorre en bloques las filas de una consulta, sin cargar todos los resultados en memoria
+def _filas(consulta, campos, tamaño_bloque):
+    return consulta.values_list(*campos).iterator(chunk_size=tamaño_bloque)
+
+# Exporta las actividades visibles para el usuario
+def exporta_actividades(usuario, tamaño_bloque=tamaño_bloque_exportacion):
+    nombres = [_nombre_columna(campo) for campo in campos_actividad]
+    return nombres, _filas(get_actividades_visibles(usuario), campos_actividad, tamaño_bloque)
+
+# Exporta las ofertas visibles para el usuario, con los identificadores de sus actividades requeridas. Las actividades
+# requeridas se obtienen en una consulta por cada bloque de ofertas
+def exporta_ofertas(usuario, tamaño_bloque=tamaño_bloque_exportacion):
+    nombres = [_nombre_columna(campo) for campo in campos_oferta] + ['actividades']
+
+    def filas():
+        bloque = []
+        for fila in _filas(get_ofertas_visibles(usuario), campos_oferta, tamaño_bloque):
+            bloque.append(fila)
+            if len(bloque) >= tamaño_bloque:
+                yield from _añade_actividades_requeridas(bloque)
+                bloque = []
+        yield from _añade_actividades_requeridas(bloque)
+
+    return nombres, filas()
+
+# Añade a cada fila de un bloque de ofertas la lista de identificadores de sus actividades requeridas
+def _añade_actividades_requeridas(bloque):
+    requeridas = {}
+    for (oferta_id, identificador) in Oferta.actividades.through.objects.filter(
+            oferta_id__in=[fila[0] for fila in bloque]).order_by('oferta_id', 'actividad_id').values_list(
+            'oferta_id', 'actividad__identificador'):
+        requeridas.setdefault(oferta_id, []).append(identificador)
+    for fila in bloque:
+        yield fila + (requeridas.get(fila[0], []),)
+
+# Exporta las solicitudes realizadas por el usuario
+def exporta_solicitudes(usuario, tamaño_bloque=tamaño_bloque_exportacion):
+    nombres = [_nombre_columna(campo) for campo in campos_solicitud]
+    return nombres, _filas(Solicitud.objects.filter(usuario=usuario).order_by('id'), campos_solicitud, tamaño_bloque)
+
+# Convierte un valor a un tipo que se puede escribir en JSON
+def _valor_json(valor):
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+# Convierte un valor a texto para escribirlo en CSV. Las listas se separan por espacios
+def _valor_csv(valor):
+    if isinstance(valor, list):
+        return ' '.join(valor)
+    return valor
+
+# Objeto con la interfaz de un fichero que devuelve lo que se escribe en él, para generar el CSV línea a línea
+class _Eco:
+    def write(self, valor):
+        return valor
+
+# Genera línea a línea el contenido del fichero exportado en el formato dado, a partir de los nombres de las columnas y
+# de las filas
+def formatea_exportacion(formato, nombres, filas):
+    if formato == 'csv':
+        escritor = csv.writer(_Eco())
+        yield escritor.writerow(nombres)
+        for fila in filas:
+            yield escritor.writerow([_valor_csv(valor) for valor in fila])
+    elif formato == 'jsonl':
+        for fila in filas:
+            yield json.dumps(dict(zip(nombres, [_valor_json(valor) for valor in fila])), ensure_ascii=False) + '\n'
+    else:
+        raise ValueError('Formato de exportación no válido: {}'.format(formato))
+
+# Funciones de exportación de cada entidad
+exportaciones = {
+    'actividades': exporta_actividades,
+    'ofertas': exporta_ofertas,
+    'solicitudes': exporta_solicitudes,
+}
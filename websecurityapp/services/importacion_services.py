@@ -0,0 +1,231 @@
+import csv
+import io
+import json
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, IntegrityError, transaction
+
+from websecurityapp.models.actividad_models import Actividad
+from websecurityapp.models.oferta_models import Oferta
+from websecurityapp.services.util_services import genera_identificadores, intentos_identificador
+
+# Número de filas que se validan e insertan juntas, cada bloque en su propia transacción
+tamaño_bloque_importacion = 1000
+
+# Formatos de importación disponibles, los mismos que los de exportación
+formatos_importacion = ['csv', 'jsonl']
+
+
+# Recorre las filas que devuelve un lector, convirtiendo los errores de formato y de codificación en errores de fila. Tras
+# un error de codificación no se puede seguir decodificando el fichero, por lo que se termina la lectura
+def _filas_leidas(lector):
+    while True:
+        try:
+            fila = next(lector)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield ValueError('CSV no válido: {}'.format(e))
+        except UnicodeDecodeError:
+            yield ValueError('El fichero no está codificado en UTF-8')
+            return
+        else:
+            yield fila
+
+# Lee las filas de un fichero JSONL, ignorando las líneas vacías
+def _filas_jsonl(fichero):
+    for linea in fichero:
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError as e:
+            yield ValueError('JSON no válido: {}'.format(e))
+            continue
+        yield fila if isinstance(fila, dict) else ValueError('Cada línea debe ser un objeto JSON')
+
+# Lee las filas de un fichero de texto en el formato dado. Cada fila es un diccionario, o el error producido al leerla
+def lee_filas(fichero, formato):
+    if formato == 'csv':
+        yield from _filas_leidas(csv.DictReader(fichero))
+    elif formato == 'jsonl':
+        yield from _filas_leidas(_filas_jsonl(fichero))
+    else:
+        raise ValueError('Formato de importación no válido: {}'.format(formato))
+
+# Lee las filas de un fichero subido en una petición, que se decodifica como UTF-8
+def lee_filas_fichero_subido(fichero, formato):
+    return lee_filas(io.TextIOWrapper(fichero, encoding='utf-8', newline=''), formato)
+
+# Convierte un valor booleano de una fila, que en CSV llega como texto
+def _booleano(valor, por_defecto):
+    if valor is None or valor == '':
+        return por_defecto
+    if isinstance(valor, bool):
+        return valor
+    if str(valor).strip().lower() in ['true', '1', 'si', 'sí']:
+        return True
+    if str(valor).strip().lower() in ['false', '0', 'no']:
+        return False
+    raise ValidationError('Valor booleano no válido: {}'.format(valor))
+
+# Obtiene la lista de identificadores de las actividades requeridas de una fila de oferta. En CSV los identificadores se
+# separan por espacios, como al exportar
+def _identificadores(valor):
+    if valor is None:
+        return []
+    if isinstance(valor, str):
+        return valor.split()
+    if isinstance(valor, list) and all(isinstance(identificador, str) for identificador in valor):
+        return valor
+    raise ValidationError('Lista de actividades no válida')
+
+# Obtiene los mensajes de error de una excepción de validación
+def _mensaje(error):
+    if isinstance(error, ValidationError):
+        if hasattr(error, 'error_dict'):
+            return '; '.join('{}: {}'.format(campo, ' '.join(mensajes))
+                for (campo, mensajes) in error.message_dict.items())
+        return ' '.join(error.messages)
+    return str(error)
+
+# Construye y valida una actividad a partir de una fila. Las actividades se importan siempre en modo borrador, como al
+# crearlas, para que se revisen antes de publicarlas
+def _actividad(fila, usuario):
+    actividad = Actividad(
+        titulo=fila.get('titulo'),
+        enlace=fila.get('enlace'),
+        descripcion=fila.get('descripcion'),
+        comentable=_booleano(fila.get('comentable'), False),
+        autor=usuario,
+        borrador=True,
+        vetada=False,
+        fecha_creacion=date.today(),
+    )
+    # El autor y el identificador no se validan en cada fila, porque requerirían una consulta por fila. Los
+    # identificadores se generan después para todo el bloque
+    actividad.full_clean(exclude=['autor', 'identificador'])
+    return actividad
+
+# Construye y valida una oferta a partir de una fila, resolviendo sus actividades requeridas con las actividades del
+# bloque ya obtenidas de la base de datos. Las ofertas se importan siempre en modo borrador, como las actividades
+def _oferta(fila, usuario, actividades_por_identificador):
+    identificadores = _identificadores(fila.get('actividades'))
+    if not identificadores:
+        raise ValidationError('La oferta debe requerir al menos una actividad')
+    inexistentes = [identificador for identificador in identificadores
+        if identificador not in actividades_por_identificador]
+    if inexistentes:
+        raise ValidationError('No existen las actividades {}'.format(', '.join(inexistentes)))
+    no_validas = [identificador for identificador in identificadores
+        if actividades_por_identificador[identificador].vetada or actividades_por_identificador[identificador].borrador]
+    if no_validas:
+        raise ValidationError('Las actividades {} están vetadas o en modo borrador'.format(', '.join(no_validas)))
+    oferta = Oferta(
+        titulo=fila.get('titulo'),
+        descripcion=fila.get('descripcion'),
+        autor=usuario,
+        borrador=True,
+        vetada=False,
+        cerrada=False,
+        fecha_creacion=date.today(),
+        tiene_actividades_vetadas=False,
+    )
+    oferta.full_clean(exclude=['autor', 'identificador'])
+    oferta.actividades_importadas = [actividades_por_identificador[identificador].id
+        for identificador in dict.fromkeys(identificadores)]
+    return oferta
+
+# Inserta un bloque de objetos válidos en una transacción, junto con las filas de otras tablas que dependen de ellos,
+# generando antes los identificadores de todos los objetos. Si la inserción viola una restricción, como la de unicidad
+# de los identificadores, se vuelve a intentar con otros identificadores. Si falla, se deshace el bloque completo y se
+# devuelve el error
+def _inserta_bloque(modelo, prefijo, objetos, relaciones=None):
+    for intento in range(intentos_identificador):
+        for (objeto, identificador) in zip(objetos, genera_identificadores(len(objetos), prefijo)):
+            objeto.identificador = identificador
+        try:
+            with transaction.atomic():
+                modelo.objects.bulk_create(objetos)
+                if relaciones:
+                    # Algunas bases de datos no devuelven los ids de los objetos insertados, por lo que se obtienen con
+                    # una consulta a partir de sus identificadores
+                    if any(objeto.pk is None for objeto in objetos):
+                        ids = dict(modelo.objects.filter(identificador__in=[objeto.identificador for objeto in objetos])
+                            .values_list('identificador', 'id'))
+                        for objeto in objetos:
+                            objeto.pk = ids[objeto.identificador]
+                    relaciones(objetos)
+            return None
+        except DatabaseError as e:
+            for objeto in objetos:
+                objeto.pk = None
+            if not isinstance(e, IntegrityError) or intento == intentos_identificador - 1:
+                return 'Error al insertar el bloque: {}'.format(e)
+
+# Agrupa en bloques las filas numeradas, empezando por 1
+def _bloques(filas, tamaño_bloque):
+    bloque = []
+    for (numero, fila) in enumerate(filas, start=1):
+        bloque.append((numero, fila))
+        if len(bloque) >= tamaño_bloque:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+# Valida e inserta por bloques las filas dadas con la función de construcción del objeto de cada fila. Devuelve el número
+# de objetos importados y la lista de errores, cada uno con el número de fila y el mensaje
+def _importa(modelo, prefijo, filas, construye, tamaño_bloque, prepara_bloque=None, relaciones=None):
+    importados = 0
+    errores = []
+    for bloque in _bloques(filas, tamaño_bloque):
+        contexto = prepara_bloque([fila for (numero, fila) in bloque if isinstance(fila, dict)]) \
+            if prepara_bloque else None
+        validos = []
+        for (numero, fila) in bloque:
+            try:
+                if not isinstance(fila, dict):
+                    raise fila
+                validos.append((numero, construye(fila, contexto) if prepara_bloque else construye(fila)))
+            except (ValidationError, ValueError) as e:
+                errores.append((numero, _mensaje(e)))
+        error = _inserta_bloque(modelo, prefijo, [objeto for (numero, objeto) in validos], relaciones)
+        if error:
+            errores.extend((numero, error) for (numero, objeto) in validos)
+        else:
+            importados += len(validos)
+    errores.sort()
+    return {'importados': importados, 'errores': errores}
+
+# Importa las actividades de las filas dadas, con el usuario como autor
+def importa_actividades(usuario, filas, tamaño_bloque=tamaño_bloque_importacion):
+    return _importa(Actividad, 'ACT-', filas, lambda fila: _actividad(fila, usuario), tamaño_bloque)
+
+# Importa las ofertas de las filas dadas, con el usuario como autor. Las actividades requeridas por todas las ofertas de
+# un bloque se obtienen en una única consulta, y sus relaciones con las ofertas se insertan en otra
+def importa_ofertas(usuario, filas, tamaño_bloque=tamaño_bloque_importacion):
+
+    def prepara_bloque(filas_bloque):
+        identificadores = set()
+        for fila in filas_bloque:
+            try:
+                identificadores.update(_identificadores(fila.get('actividades')))
+            except ValidationError:
+                pass
+        return {actividad.identificador: actividad for actividad in Actividad.objects.filter(
+            identificador__in=identificadores).only('id', 'identificador', 'borrador', 'vetada')}
+
+    def relaciones(ofertas):
+        Oferta.actividades.through.objects.bulk_create([Oferta.actividades.through(oferta_id=oferta.id,
+            actividad_id=actividad_id) for oferta in ofertas for actividad_id in oferta.actividades_importadas])
+
+    return _importa(Oferta, 'OFR-', filas, lambda fila, actividades: _oferta(fila, usuario, actividades), tamaño_bloque,
+        prepara_bloque, relaciones)
+
+# Funciones de importación de cada entidad
+importaciones = {
+    'actividades': importa_actividades,
+    'ofertas': importa_ofertas,
+}
@@ -0,0 +1,157 @@
+from datetime import date, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, F
+
+from websecurityapp.models.actividad_models import Actividad
+from websecurityapp.models.oferta_models import Oferta
+from websecurityapp.services.actividad_services import plan_listado_actividades
+from websecurityapp.services.oferta_services import actualiza_ofertas_actividades_vetadas, plan_listado_ofertas
+from websecurityapp.services.perfil_services import get_usuario
+from websecurityapp.services.util_services import aplica_plan_carga
+from websecurityserver.settings import dias_cola_moderacion
+
+# Número máximo de objetos que se pueden moderar en una misma operación
+numero_maximo_objetos_moderados = 1000
+# Número de ofertas más solicitadas que se muestran en la cola de moderación
+numero_ofertas_mas_solicitadas = 10
+
+
+# Comprueba que el usuario de la petición es un administrador
+def _comprueba_admin(request):
+    if not get_usuario(request).es_admin:
+        raise Exception('Se requieren permisos de administrador para realizar esta accion')
+
+# Convierte los ids recibidos en una lista de enteros sin repetidos, en el orden recibido
+def _ids(ids):
+    try:
+        ids = list(dict.fromkeys(int(id) for id in ids))
+    except (TypeError, ValueError):
+        raise ValidationError('Los ids deben ser números enteros')
+    if len(ids) > numero_maximo_objetos_moderados:
+        raise ValidationError('No se pueden moderar más de {} objetos a la vez'.format(numero_maximo_objetos_moderados))
+    return ids
+
+# Comprueba el motivo de veto, con las mismas restricciones que el formulario de veto
+def _motivo_veto(motivo_veto):
+    motivo_veto = (motivo_veto or '').strip()
+    if not motivo_veto:
+        raise ValidationError('No se puede vetar sin motivo de veto')
+    if len(motivo_veto) > Actividad._meta.get_field('motivo_veto').max_length:
+        raise ValidationError('El motivo de veto es demasiado largo')
+    return motivo_veto
+
+# Bloquea y obtiene en una consulta los objetos del modelo con los ids dados que cumplen las condiciones de la acción,
+# las mismas que comprueban las vistas de cada objeto. Devuelve los ids de los objetos que se van a moderar y los de los
+# que no cumplen las condiciones
+def _bloquea(modelo, ids, condiciones):
+    moderados = list(modelo.objects.select_for_update().filter(pk__in=ids, **condiciones).order_by('id')
+        .values_list('id', flat=True))
+    ids_moderados = set(moderados)
+    return moderados, [id for id in ids if id not in ids_moderados]
+
+# Aplica los cambios dados a los objetos moderados en un único UPDATE, que incrementa también su versión
+def _modera(modelo, moderados, cambios):
+    modelo.objects.filter(pk__in=moderados).update(version=F('version') + 1, **cambios)
+
+# Obtiene en una única consulta las ofertas dadas, con el número de solicitudes de cada una. Las solicitudes pendientes
+# son las de las ofertas que siguen abiertas. Se calcula antes de moderar, para que al cerrar ofertas se informe de las
+# solicitudes que quedan sin resolver
+def _impacto(ofertas):
+    ofertas_afectadas = []
+    solicitudes_pendientes = 0
+    for (oferta_id, cerrada, solicitudes) in ofertas.annotate(n_solicitudes=Count('solicitudes')).order_by('id') \
+            .values_list('id', 'cerrada', 'n_solicitudes'):
+        ofertas_afectadas.append(oferta_id)
+        if not cerrada:
+            solicitudes_pendientes += solicitudes
+    return ofertas_afectadas, solicitudes_pendientes
+
+# Informe del resultado de una operación de moderación
+def _informe(moderados, omitidos, ofertas_afectadas, solicitudes_pendientes):
+    return {
+        'moderados': moderados,
+        'omitidos': omitidos,
+        'ofertas_afectadas': ofertas_afectadas,
+        'solicitudes_pendientes': solicitudes_pendientes,
+    }
+
+# Aplica una acción de moderación sobre las actividades con los ids dados. Las ofertas afectadas son las que requieren
+# alguna de las actividades moderadas, y se recalcula si tienen actividades vetadas
+def _modera_actividades(request, ids, condiciones, cambios):
+    _comprueba_admin(request)
+    ids = _ids(ids)
+    with transaction.atomic():
+        moderados, omitidos = _bloquea(Actividad, ids, condiciones)
+        if not moderados:
+            return _informe(moderados, omitidos, [], 0)
+        ofertas_afectadas, solicitudes_pendientes = _impacto(Oferta.objects.filter(
+            pk__in=Oferta.actividades.through.objects.filter(actividad_id__in=moderados).values('oferta_id')))
+        _modera(Actividad, moderados, cambios)
+        if ofertas_afectadas:
+            actualiza_ofertas_actividades_vetadas(Oferta.objects.filter(pk__in=ofertas_afectadas))
+    return _informe(moderados, omitidos, ofertas_afectadas, solicitudes_pendientes)
+
+# Aplica una acción de moderación sobre las ofertas con los ids dados. Las ofertas afectadas son las ofertas moderadas
+def _modera_ofertas(request, ids, condiciones, cambios):
+    _comprueba_admin(request)
+    ids = _ids(ids)
+    with transaction.atomic():
+        moderados, omitidos = _bloquea(Oferta, ids, condiciones)
+        if not moderados:
+            return _informe(moderados, omitidos, [], 0)
+        ofertas_afectadas, solicitudes_pendientes = _impacto(Oferta.objects.filter(pk__in=moderados))
+        _modera(Oferta, moderados, cambios)
+    return _informe(moderados, omitidos, ofertas_afectadas, solicitudes_pendientes)
+
+# Veta las actividades publicadas y no vetadas con los ids dados, y marca las ofertas que las requieren como ofertas con
+# actividades vetadas
+def veta_actividades(request, ids, motivo_veto):
+    motivo_veto = _motivo_veto(motivo_veto)
+    return _modera_actividades(request, ids, {'vetada': False, 'borrador': False},
+        {'vetada': True, 'motivo_veto': motivo_veto})
+
+# Levanta el veto sobre las actividades vetadas con los ids dados, y recalcula si las ofertas que las requieren siguen
+# teniendo otras actividades vetadas
+def levanta_veto_actividades(request, ids):
+    return _modera_actividades(request, ids, {'vetada': True}, {'vetada': False, 'motivo_veto': None})
+
+# Veta las ofertas publicadas, abiertas y no vetadas con los ids dados
+def veta_ofertas(request, ids, motivo_veto):
+    motivo_veto = _motivo_veto(motivo_veto)
+    return _modera_ofertas(request, ids, {'vetada': False, 'borrador': False, 'cerrada': False},
+        {'vetada': True, 'motivo_veto': motivo_veto})
+
+# Levanta el veto sobre las ofertas vetadas con los ids dados que siguen publicadas y abiertas
+def levanta_veto_ofertas(request, ids):
+    return _modera_ofertas(request, ids, {'vetada': True, 'borrador': False, 'cerrada': False},
+        {'vetada': False, 'motivo_veto': None})
+
+# Cierra las ofertas publicadas, abiertas y no vetadas con los ids dados, e informa de las solicitudes que quedan sin
+# resolver
+def cierra_ofertas(request, ids):
+    return _modera_ofertas(request, ids, {'vetada': False, 'borrador': False, 'cerrada': False}, {'cerrada': True})
+
+# Fecha a partir de la cual los objetos publicados se consideran recientes y aparecen en la cola de moderación
+def get_fecha_cola_moderacion():
+    return date.today() - timedelta(days=dias_cola_moderacion)
+
+# Obtiene las actividades publicadas recientemente, vetadas o no, ordenadas por id para poder paginarlas por cursor
+def get_actividades_pendientes():
+    return aplica_plan_carga(Actividad.objects.filter(borrador=False, fecha_creacion__gte=get_fecha_cola_moderacion())
+        .order_by('id'), plan_listado_actividades)
+
+# Obtiene las ofertas publicadas recientemente que siguen abiertas, vetadas o no, ordenadas por id para poder paginarlas
+# por cursor
+def get_ofertas_pendientes():
+    return aplica_plan_carga(Oferta.objects.filter(borrador=False, cerrada=False,
+        fecha_creacion__gte=get_fecha_cola_moderacion()).order_by('id'), plan_listado_ofertas)
+
+# Obtiene las ofertas abiertas con más solicitudes, con el número de solicitudes de cada una
+def get_ofertas_mas_solicitadas(numero=None):
+    if numero is None:
+        numero = numero_ofertas_mas_solicitadas
+    return list(aplica_plan_carga(Oferta.objects.filter(borrador=False, cerrada=False), plan_listado_ofertas)
+        .annotate(n_solicitudes=Count('solicitudes')).filter(n_solicitudes__gt=0)
+        .order_by('-n_solicitudes', 'id')[:numero])
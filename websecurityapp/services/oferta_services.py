@@ -4,38 +4,52 @@ from datetime import date
 from random import choice
 from django.contrib.auth.hashers import make_password
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Q, Exists, OuterRef
+from django.db.models import Q, Exists, F, OuterRef
 
 from websecurityapp.models.actividad_models import Actividad
 from websecurityapp.models.oferta_models import Oferta, Solicitud
-from websecurityapp.models.perfil_models import Usuario
 from websecurityapp.forms.oferta_forms import OfertaEdicionForm
 from websecurityapp.exceptions import UnallowedUserException
-from websecurityapp.services.util_services import genera_identificador
+from websecurityapp.services.util_services import guarda_con_identificador, guarda_incrementando_version, \
+    aplica_plan_carga
+from websecurityapp.services.perfil_services import get_usuario
+
+# Plan de carga de los listados de ofertas, con el mismo criterio que el de los listados de actividades
+plan_listado_ofertas = {
+    'select_related': ['autor__django_user'],
+    'prefetch_related': [],
+    'only': ['id', 'titulo', 'descripcion', 'fecha_creacion', 'borrador', 'cerrada', 'vetada', 'tiene_actividades_vetadas',
+        'version', 'autor', 'autor__version', 'autor__django_user', 'autor__django_user__first_name',
+        'autor__django_user__last_name'],
+}
+
+# Obtiene las ofertas que puede ver el usuario dado, ordenadas por id. La primera rama del OR tiene la misma forma que la
+# condición del índice parcial de las ofertas y la segunda usa el índice del autor, para que la base de datos pueda
+# combinar ambos índices
+def get_ofertas_visibles(usuario):
+    if usuario.es_admin:
+        return Oferta.objects.filter(Q(cerrada=False, borrador=False) | Q(autor=usuario)).order_by('id')
+    else:
+        # La columna tiene_actividades_vetadas indica si la oferta tiene alguna actividad requerida vetada, y se mantiene
+        # actualizada al modificar las actividades requeridas o al vetar las actividades
+        return Oferta.objects.filter(
+            Q(cerrada=False, borrador=False, vetada=False, tiene_actividades_vetadas=False) | Q(autor=usuario)
+            ).order_by('id')
 
 @transaction.atomic
 def lista_ofertas(request):
     if not request.user.is_authenticated:
         raise Exception('Se debe estar autenticado para listar las ofertas')
-    usuario = Usuario.objects.get(django_user__id=request.user.id)
-    if usuario.es_admin:
-        return Oferta.objects.exclude((Q(cerrada=True) | Q(borrador=True)) & ~Q(autor=usuario)).order_by('id')
-    else:
-        # annotate crea un nuevo valor dentro de las entidades, como si crease una nueva columna
-        # En este caso, se crea una nueva columna actividades_vetadas, que indica si la oferta tiene una actividad
-        # vetada o no
-        return Oferta.objects.annotate(actividades_vetadas=Exists(
-                Oferta.objects.filter(id=OuterRef('id'), actividades__vetada=True))
-            ).exclude((Q(cerrada=True) | Q(borrador=True) | Q(vetada=True) | Q(actividades_vetadas=True)) & ~Q(autor=usuario)
-            ).order_by('id')
+    usuario = get_usuario(request)
+    return aplica_plan_carga(get_ofertas_visibles(usuario), plan_listado_ofertas)
 
 
 @transaction.atomic
 def lista_ofertas_propias(request):
     if not request.user.is_authenticated:
         raise Exception('Se debe estar autenticado para listar las ofertas')
-    usuario = Usuario.objects.get(django_user__id=request.user.id)
-    return Oferta.objects.filter(autor=usuario).order_by('id')
+    usuario = get_usuario(request)
+    return aplica_plan_carga(Oferta.objects.filter(autor=usuario).order_by('id'), plan_listado_ofertas)
 
 @transaction.atomic
 def crea_oferta(oferta_dict, request):
@@ -52,11 +66,13 @@ def crea_oferta(oferta_dict, request):
         vetada = False,
         cerrada = False,
         fecha_creacion = date.today(),
-        identificador = 'OFR-' + genera_identificador(),
     )
-    oferta.full_clean()
-    oferta.save()
+    # El identificador se genera al guardar, y su unicidad la comprueba la base de datos
+    oferta.full_clean(exclude = ['identificador'])
+    guarda_con_identificador(oferta, 'OFR-')
     oferta.actividades.set(oferta_dict['actividades'])
+    actualiza_ofertas_actividades_vetadas(Oferta.objects.filter(pk=oferta.pk))
+    oferta.refresh_from_db(fields=['tiene_actividades_vetadas'])
     oferta.full_clean()
     oferta.save()
     return oferta
@@ -83,9 +99,11 @@ def edita_oferta(request, form_data, oferta):
     oferta.titulo = form_data['titulo']
     oferta.descripcion = form_data['descripcion']
     oferta.actividades.set(form_data['actividades'])
+    actualiza_ofertas_actividades_vetadas(Oferta.objects.filter(pk=oferta.pk))
+    oferta.refresh_from_db(fields=['tiene_actividades_vetadas'])
     oferta.borrador = form_data['borrador']
     oferta.full_clean()
-    oferta.save(update_fields = ['titulo', 'descripcion', 'borrador'])
+    guarda_incrementando_version(oferta, ['titulo', 'descripcion', 'borrador'])
     return oferta
 
 @transaction.atomic
@@ -94,7 +112,7 @@ def cierra_oferta(request, oferta):
         raise UnallowedUserException()
     oferta.cerrada = True
     oferta.full_clean()
-    oferta.save(update_fields = ['cerrada'])
+    guarda_incrementando_version(oferta, ['cerrada'])
     return oferta
 
 @transaction.atomic
@@ -107,7 +125,7 @@ def elimina_oferta(request, oferta):
 
 @transaction.atomic
 def veta_oferta(request, form_data, oferta):
-    usuario = Usuario.objects.get(django_user_id = request.user.id)
+    usuario = get_usuario(request)
     if not usuario.es_admin:
         raise Exception('Se requieren permisos de administrador para realizar esta accion')
     if oferta.vetada:
@@ -115,11 +133,11 @@ def veta_oferta(request, form_data, oferta):
     oferta.motivo_veto = form_data['motivo_veto']
     oferta.vetada = True
     oferta.full_clean()
-    oferta.save(update_fields = ['motivo_veto', 'vetada'])
+    guarda_incrementando_version(oferta, ['motivo_veto', 'vetada'])
 
 @transaction.atomic
 def levanta_veto_oferta(request, oferta):
-    usuario = Usuario.objects.get(django_user_id = request.user.id)
+    usuario = get_usuario(request)
     if not usuario.es_admin:
         raise Exception('Se requieren permisos de administrador para realizar esta accion')
     if not oferta.vetada:
@@ -127,21 +145,20 @@ def levanta_veto_oferta(request, oferta):
     oferta.motivo_veto = None
     oferta.vetada = False
     oferta.full_clean()
-    oferta.save(update_fields = ['motivo_veto', 'vetada'])
+    guarda_incrementando_version(oferta, ['motivo_veto', 'vetada'])
 
 @transaction.atomic
 def lista_solicitudes_propias(request):
     if not request.user.is_authenticated:
         raise Exception('Se debe estar autenticado para listar las ofertas solicitadas')
-    usuario = Usuario.objects.get(django_user__id=request.user.id)
-    ofertas = []
-    for solicitud in list(Solicitud.objects.filter(usuario=usuario).order_by('id')):
-        ofertas.append(solicitud.oferta)
-    return ofertas
+    usuario = get_usuario(request)
+    # Las ofertas se ordenan por la fecha de su solicitud, es decir, por el id de la solicitud
+    return aplica_plan_carga(Oferta.objects.filter(solicitudes__usuario=usuario).order_by('solicitudes__id'),
+        plan_listado_ofertas)
 
 @transaction.atomic
 def solicita_oferta(request, oferta):
-    usuario = Usuario.objects.get(django_user_id=request.user.id)
+    usuario = get_usuario(request)
     solicitud = Solicitud(
         usuario=usuario,
         oferta=oferta,
@@ -153,3 +170,21 @@ def retira_solicitud_oferta(request, solicitud):
     if not solicitud.usuario.django_user.id == request.user.id:
         raise UnallowedUserException()
     solicitud.delete()
+
+# Recalcula si las ofertas dadas tienen alguna actividad requerida vetada, en una única consulta. Si no se indican las
+# ofertas, se recalcula para todas. Se incrementa la versión de las ofertas, porque sus filas en los listados se marcan
+# según sus actividades vetadas
+def actualiza_ofertas_actividades_vetadas(ofertas=None):
+    if ofertas is None:
+        ofertas = Oferta.objects.all()
+    return ofertas.update(tiene_actividades_vetadas=Exists(
+        Oferta.actividades.through.objects.filter(oferta=OuterRef('pk'), actividad__vetada=True)),
+        version=F('version') + 1)
+
+# Obtiene las ofertas cuya columna tiene_actividades_vetadas no coincide con el veto de sus actividades requeridas
+def get_ofertas_inconsistentes_actividades_vetadas():
+    return Oferta.objects.annotate(actividades_vetadas=Exists(
+            Oferta.actividades.through.objects.filter(oferta=OuterRef('pk'), actividad__vetada=True))
+        ).filter((Q(tiene_actividades_vetadas=True) & Q(actividades_vetadas=False)) |
+            (Q(tiene_actividades_vetadas=False) & Q(actividades_vetadas=True))
+        ).order_by('id')
@@ -7,6 +7,19 @@ from django.contrib.auth.hashers import make_password
 from websecurityapp.models.perfil_models import Usuario, Anexo
 from websecurityapp.forms.perfil_forms import UsuarioForm, AnexoForm
 from websecurityapp.exceptions import UnallowedUserException
+from websecurityapp.services.util_services import guarda_incrementando_version
+
+# Obtiene el usuario asociado al usuario de Django autenticado en la petición. Se consulta una única vez por petición,
+# junto con su usuario de Django, y se reutiliza en el resto de llamadas de la misma petición
+def get_usuario(request):
+    try:
+        return request._usuario
+    except AttributeError:
+        if not request.user.is_authenticated:
+            raise Usuario.DoesNotExist('Se debe estar autenticado para obtener el usuario')
+        usuario = Usuario.objects.select_related('django_user').get(django_user_id=request.user.id)
+        request._usuario = usuario
+        return usuario
 
 @transaction.atomic
 def registra_usuario(usuario_dict):
@@ -53,7 +66,8 @@ def edita_perfil(form_data, usuario):
     django_user.save()
     usuario.telefono = form_data['telefono']
     usuario.empresa_u_equipo = form_data['empresa_u_equipo']
-    usuario.save()
+    # El nombre del usuario se muestra en los fragmentos cacheados de los listados de sus actividades y ofertas
+    guarda_incrementando_version(usuario, ['telefono', 'empresa_u_equipo'])
 
 def anexo_formulario(anexo):
     data = {
@@ -0,0 +1,44 @@
+import glob
+import os
+
+from django.apps import apps
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CargadorCacheado
+
+# Plantillas que se compilan al arrancar, relativas al directorio de plantillas de la aplicación: la página maestra y los
+# bloques, que se usan en todas las páginas, y los listados, que son las páginas más visitadas
+plantillas_precompiladas = [
+    'master_page/*.html',
+    'blocks/*.html',
+    'actividad/listado_actividades.html',
+    'oferta/listado_ofertas.html',
+]
+
+
+# Obtiene los motores de plantillas de Django que guardan en memoria las plantillas compiladas
+def get_motores_plantillas_cacheados():
+    return [motor for motor in engines.all() if isinstance(motor, DjangoTemplates)
+        and any(isinstance(cargador, CargadorCacheado) for cargador in motor.engine.template_loaders)]
+
+# Obtiene los nombres de las plantillas que se compilan al arrancar
+def get_plantillas_precompiladas():
+    directorio = os.path.join(apps.get_app_config('websecurityapp').path, 'templates')
+    nombres = []
+    for patron in plantillas_precompiladas:
+        for ruta in sorted(glob.glob(os.path.join(directorio, patron))):
+            nombres.append(os.path.relpath(ruta, directorio).replace(os.sep, '/'))
+    return nombres
+
+# Carga las plantillas que se compilan al arrancar en los motores de plantillas que las guardan en memoria, para que la
+# primera petición de cada proceso no tenga que compilarlas. Con los motores sin caché no se hace nada, porque las
+# plantillas se compilarían de nuevo en cada renderizado. Devuelve los nombres de las plantillas compiladas
+def precompila_plantillas():
+    motores = get_motores_plantillas_cacheados()
+    if not motores:
+        return []
+    nombres = get_plantillas_precompiladas()
+    for motor in motores:
+        for nombre in nombres:
+            motor.get_template(nombre)
+    return nombres
@@ -1,30 +1,205 @@
-from django.db import transaction
-from django.core.exceptions import ObjectDoesNotExist
-from datetime import datetime
+from django.db import transaction, IntegrityError
+from django.db.models import Count, Q
+from django.core.cache import caches
+from django.utils import timezone
+from datetime import timedelta
+import hashlib
+import secrets
+import time
 
 from websecurityapp.models.actividad_models import SesionActividad, Actividad
 from websecurityapp.models.perfil_models import Usuario
+from websecurityapp.services.perfil_services import get_usuario
+from websecurityserver.settings import almacen_sesionesactividad, cache_sesionesactividad, tiempo_sesionactividad
 
+# Número de bytes aleatorios de los tokens de sesión, que se codifican en base64 con unos 43 caracteres
+bytes_token_sesionactividad = 32
+# Número de sesiones expiradas que se eliminan en cada lote, cada uno en su propia transacción
+tamaño_lote_sesionesactividad = 1000
+# Límites en segundos de los tramos de edad en los que se agrupan las sesiones en el informe de sesiones
+tramos_edad_sesionesactividad = [300, 900, 3600, 6 * 3600, 24 * 3600]
+# Número máximo de sesiones que se pueden terminar en una misma petición
+numero_maximo_sesiones_terminadas = 1000
+
+
+# Genera un token de sesión aleatorio, que no se puede predecir a partir del usuario ni del momento de creación
+def genera_token_sesionactividad():
+    return secrets.token_urlsafe(bytes_token_sesionactividad)
+
+# Almacén de las sesiones de actividad en la tabla de sesiones. La restricción de unicidad del usuario y la actividad
+# hace que comenzar de nuevo una actividad sustituya el token de la sesión abierta en lugar de añadir otra fila
+class AlmacenSesionesBaseDatos:
+
+    def crea(self, usuario, actividad):
+        token = genera_token_sesionactividad()
+        fecha_creacion = timezone.now()
+        sesiones = SesionActividad.objects.filter(usuario = usuario, actividad = actividad)
+        # Se actualiza el token de la sesión abierta y, si no la hay, se inserta la sesión. Si otra petición la inserta a
+        # la vez, la restricción de unicidad impide la segunda fila y se actualiza la sesión insertada por la otra
+        if not sesiones.update(token = token, fecha_creacion = fecha_creacion):
+            try:
+                with transaction.atomic():
+                    SesionActividad.objects.create(usuario = usuario, actividad = actividad, token = token,
+                        fecha_creacion = fecha_creacion)
+            except IntegrityError:
+                sesiones.update(token = token, fecha_creacion = fecha_creacion)
+        return token
+
+    # Elimina la sesión con una única consulta. Si no existe la sesión del usuario con el token, o ha expirado, se lanza
+    # una excepción
+    def elimina(self, usuario, actividad, token):
+        (eliminadas, _) = SesionActividad.objects.filter(usuario = usuario, actividad = actividad, token = token,
+            fecha_creacion__gte = get_fecha_expiracion_sesionactividad()).delete()
+        if not eliminadas:
+            raise SesionActividad.DoesNotExist('No existe la sesión de la actividad')
+
+    # Elimina las sesiones no expiradas de los pares de actividad y token dados, sean del usuario que sean, con una
+    # consulta que obtiene y bloquea las sesiones y otra que las elimina. El bloqueo impide que dos peticiones terminen a
+    # la vez la misma sesión. Devuelve el id del usuario de la sesión de cada par de ids de actividad y token encontrado
+    def elimina_varias(self, pares):
+        sesiones = {(actividad_id, token): (id, usuario_id) for (id, usuario_id, actividad_id, token)
+            in SesionActividad.objects.select_for_update().filter(token__in = {token for (actividad, token) in pares},
+            fecha_creacion__gte = get_fecha_expiracion_sesionactividad()).values_list('id', 'usuario_id', 'actividad_id',
+            'token')}
+        encontradas = {(actividad.id, token): sesiones[(actividad.id, token)] for (actividad, token) in pares
+            if (actividad.id, token) in sesiones}
+        if encontradas:
+            SesionActividad.objects.filter(id__in = [id for (id, usuario_id) in encontradas.values()]).delete()
+        return {par: usuario_id for (par, (id, usuario_id)) in encontradas.items()}
+
+# Almacén de las sesiones de actividad en la caché. Cada sesión se guarda con una clave por actividad y token cuyo valor
+# es el usuario, y otra por usuario y actividad cuyo valor es el token, para invalidar el token anterior al comenzar de
+# nuevo la actividad. Las sesiones que no se terminan expiran con el tiempo de vida de las claves, por lo que no se
+# acumulan filas en la base de datos. Funciona con cualquier caché de Django, en memoria o compartida como Redis
+class AlmacenSesionesCache:
+
+    def cache(self):
+        return caches[cache_sesionesactividad]
+
+    # El token se incluye resumido en la clave, para que cualquier valor recibido sea una clave válida en la caché
+    def clave_token(self, actividad_id, token):
+        return 'sesionactividad:{}:{}'.format(actividad_id, hashlib.sha256(str(token).encode()).hexdigest())
+
+    def clave_usuario(self, usuario_id, actividad_id):
+        return 'sesionactividad_usuario:{}:{}'.format(usuario_id, actividad_id)
+
+    def crea(self, usuario, actividad):
+        token = genera_token_sesionactividad()
+        clave_usuario = self.clave_usuario(usuario.id, actividad.id)
+        token_anterior = self.cache().get(clave_usuario)
+        if token_anterior is not None:
+            self.cache().delete(self.clave_token(actividad.id, token_anterior))
+        self.cache().set_many({clave_usuario: token, self.clave_token(actividad.id, token): usuario.id},
+            tiempo_sesionactividad)
+        return token
+
+    def elimina(self, usuario, actividad, token):
+        if self.cache().get(self.clave_token(actividad.id, token)) != usuario.id:
+            raise SesionActividad.DoesNotExist('No existe la sesión de la actividad')
+        self.cache().delete_many([self.clave_token(actividad.id, token), self.clave_usuario(usuario.id, actividad.id)])
+
+    # Obtiene y elimina las sesiones de los pares de actividad y token dados con una lectura y un borrado múltiples
+    def elimina_varias(self, pares):
+        claves = {self.clave_token(actividad.id, token): (actividad.id, token) for (actividad, token) in pares}
+        usuarios = self.cache().get_many(list(claves))
+        if usuarios:
+            self.cache().delete_many(list(usuarios) + [self.clave_usuario(usuario_id, claves[clave][0])
+                for (clave, usuario_id) in usuarios.items()])
+        return {claves[clave]: usuario_id for (clave, usuario_id) in usuarios.items()}
+
+# Fecha de creación a partir de la cual las sesiones no han expirado, para el tiempo de vida dado en segundos o el de la
+# configuración
+def get_fecha_expiracion_sesionactividad(tiempo = None):
+    return timezone.now() - timedelta(seconds = tiempo_sesionactividad if tiempo is None else tiempo)
+
+# Elimina de la base de datos las sesiones expiradas en lotes, cada uno en una transacción corta que solo bloquea las filas
+# del lote, con una pausa opcional en segundos entre lotes. Devuelve el número de sesiones eliminadas
+def elimina_sesionesactividad_expiradas(tiempo = None, tamaño_lote = tamaño_lote_sesionesactividad, pausa = 0):
+    expiracion = get_fecha_expiracion_sesionactividad(tiempo)
+    eliminadas = 0
+    while True:
+        ids = list(SesionActividad.objects.filter(fecha_creacion__lt = expiracion).order_by('fecha_creacion')
+            .values_list('id', flat = True)[:tamaño_lote])
+        if not ids:
+            break
+        # Se vuelve a comprobar la fecha por si se ha renovado alguna sesión del lote desde que se obtuvo
+        with transaction.atomic():
+            (eliminadas_lote, _) = SesionActividad.objects.filter(id__in = ids, fecha_creacion__lt = expiracion).delete()
+        eliminadas += eliminadas_lote
+        if len(ids) < tamaño_lote:
+            break
+        if pausa:
+            time.sleep(pausa)
+    return eliminadas
+
+# Cuenta en una única consulta las sesiones de cada tramo de edad. Devuelve una lista con el inicio y el final en
+# segundos de cada tramo, el último sin final, y su número de sesiones
+def get_distribucion_edad_sesionesactividad(tramos = tramos_edad_sesionesactividad):
+    ahora = timezone.now()
+    limites = list(zip([0] + tramos, tramos + [None]))
+    conteos = {}
+    for (i, (inicio, final)) in enumerate(limites):
+        condicion = Q(fecha_creacion__lte = ahora - timedelta(seconds = inicio)) if inicio else Q()
+        if final is not None:
+            condicion &= Q(fecha_creacion__gt = ahora - timedelta(seconds = final))
+        conteos['tramo_{}'.format(i)] = Count('id', filter = condicion)
+    resultado = SesionActividad.objects.aggregate(**conteos)
+    return [(inicio, final, resultado['tramo_{}'.format(i)]) for (i, (inicio, final)) in enumerate(limites)]
+
+# Almacenes de sesiones disponibles, según el valor de almacen_sesionesactividad de la configuración
+almacenes_sesionesactividad = {
+    'base_datos': AlmacenSesionesBaseDatos(),
+    'cache': AlmacenSesionesCache(),
+}
+
+def get_almacen_sesionesactividad():
+    return almacenes_sesionesactividad[almacen_sesionesactividad]
+
+# Comienza una sesión del usuario en la actividad y devuelve su token
 @transaction.atomic
 def crea_sesionactividad(request, actividad):
-    usuario = Usuario.objects.get(django_user_id = request.user.id)
-    try:
-        sesionactividad = SesionActividad.objects.get(usuario = usuario, actividad = actividad)
-        sesionactividad.token = usuario.django_user.username + str(datetime.now())
-    except ObjectDoesNotExist as e:
-        sesionactividad = SesionActividad(
-            usuario = usuario,
-            actividad = actividad,
-            token = usuario.django_user.username + str(datetime.now())
-        )
-    sesionactividad.save()
-    return sesionactividad
+    usuario = get_usuario(request)
+    return get_almacen_sesionesactividad().crea(usuario, actividad)
 
+# Termina la sesión del usuario en la actividad con el token de la petición
 @transaction.atomic
 def elimina_sesionactividad(request, actividad):
+    usuario = get_usuario(request)
     token = request.data['token']
-    sesionactividad = SesionActividad.objects.get(token = token, actividad = actividad)
-    sesionactividad.delete()
+    get_almacen_sesionesactividad().elimina(usuario, actividad, token)
+
+# Termina a la vez las sesiones de los pares de identificador de actividad y token dados, que pueden ser de distintos
+# usuarios, ya que el token identifica al usuario de la sesión. Las actividades se obtienen en una consulta, las sesiones
+# se eliminan a la vez en el almacén y las actividades realizadas se registran con una única inserción. Devuelve el estado
+# de cada par, en el mismo orden: 'realizada', 'actividad_no_encontrada' o 'sesion_no_encontrada'
+@transaction.atomic
+def termina_sesionesactividad(request, pares):
+    if not request.user.is_authenticated:
+        raise Exception('Se debe estar autenticado para terminar sesiones de actividad')
+    actividades = {actividad.identificador: actividad for actividad in Actividad.objects.filter(
+        identificador__in = {identificador for (identificador, token) in pares}).only('id', 'identificador', 'borrador')}
+    usuarios = get_almacen_sesionesactividad().elimina_varias([(actividades[identificador], token)
+        for (identificador, token) in pares if identificador in actividades])
+    estados = []
+    terminadas = set()
+    realizadas = set()
+    for (identificador, token) in pares:
+        actividad = actividades.get(identificador)
+        if actividad is None:
+            estados.append('actividad_no_encontrada')
+        # Cada sesión solo se puede terminar una vez, aunque se repita en la petición
+        elif (actividad.id, token) not in usuarios or (actividad.id, token) in terminadas:
+            estados.append('sesion_no_encontrada')
+        else:
+            terminadas.add((actividad.id, token))
+            # Como al terminar una única sesión, solo se registran las actividades que no están en modo borrador
+            if not actividad.borrador:
+                realizadas.add((usuarios[(actividad.id, token)], actividad.id))
+            estados.append('realizada')
+    Usuario.actividades_realizadas.through.objects.bulk_create([Usuario.actividades_realizadas.through(
+        usuario_id = usuario_id, actividad_id = actividad_id) for (usuario_id, actividad_id) in sorted(realizadas)],
+        ignore_conflicts = True)
+    return estados
 
 @transaction.atomic
 def añade_actividad_realizada(request, actividad):
@@ -32,9 +207,9 @@ def añade_actividad_realizada(request, actividad):
         raise Exception('Se debe estar autenticado para realizar una actividad')
     # No se puede considerar realizada una actividad si no está en modo borrador
     if not actividad.borrador:
-        usuario = Usuario.objects.get(django_user = request.user)
-        actividades_realizadas = list(usuario.actividades_realizadas.all())
-        actividades_realizadas.append(actividad)
-        usuario.actividades_realizadas.set(actividades_realizadas)
-        usuario.save()
+        usuario = get_usuario(request)
+        # Se inserta únicamente la fila de la actividad en la tabla intermedia, sin cargar el resto de actividades
+        # realizadas. La inserción ignora la fila si ya existe, por lo que realizar de nuevo una actividad, incluso
+        # desde varias peticiones a la vez, no produce errores ni filas duplicadas
+        usuario.actividades_realizadas.add(actividad)
 
@@ -1,14 +1,73 @@
 from django.contrib.auth.models import User
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from datetime import date
-from random import choice
+import secrets
 from django.contrib.auth.hashers import make_password
 
-def genera_identificador():
-    random_string = 'QWERTYUIOPASDFGHJKLZXCVBNMqwertyuiopasdfghjklzxcvbnm1234567890'
-    res = ''
-    while(len(res) < 10):
-        res = res + choice(random_string)
-    return res
-    
+# Caracteres y longitud de la parte aleatoria de los identificadores
+caracteres_identificador = 'QWERTYUIOPASDFGHJKLZXCVBNMqwertyuiopasdfghjklzxcvbnm1234567890'
+longitud_identificador = 10
+# Número máximo de veces que se intenta guardar un objeto con un identificador nuevo
+intentos_identificador = 3
 
+# Tabla para convertir cada byte aleatorio en un carácter del identificador. Se descartan los bytes más altos, para que
+# todos los caracteres tengan la misma probabilidad
+_limite_bytes = 256 - 256 % len(caracteres_identificador)
+_tabla_identificador = bytes(ord(caracteres_identificador[b % len(caracteres_identificador)]) if b < _limite_bytes else 0
+    for b in range(256))
+_bytes_descartados = bytes(range(_limite_bytes, 256))
+
+
+# Genera el número dado de cadenas aleatorias a partir de bytes obtenidos con secrets, convirtiéndolas de una vez
+def _genera_aleatorios(n):
+    texto = ''
+    while len(texto) < n * longitud_identificador:
+        # Se piden algunos bytes de más para compensar los descartados
+        n_bytes = (n * longitud_identificador - len(texto)) * 256 // _limite_bytes + 16
+        texto += secrets.token_bytes(n_bytes).translate(_tabla_identificador, _bytes_descartados).decode('ascii')
+    return [texto[i * longitud_identificador:(i + 1) * longitud_identificador] for i in range(n)]
+
+# Genera n identificadores distintos con el prefijo dado. No se comprueba si ya existen en la base de datos: la unicidad
+# la garantiza la restricción del modelo, y quien guarda los objetos genera otros si se viola
+def genera_identificadores(n, prefijo=''):
+    identificadores = set()
+    pendientes = n
+    while pendientes > 0:
+        identificadores.update(prefijo + aleatorio for aleatorio in _genera_aleatorios(pendientes))
+        pendientes = n - len(identificadores)
+    return list(identificadores)
+
+# Guarda un objeto nuevo con un identificador aleatorio con el prefijo dado. Si el identificador ya existe, la base de
+# datos rechaza el objeto y se vuelve a intentar con otro. Cada intento se hace en un savepoint, para no invalidar la
+# transacción en curso
+def guarda_con_identificador(objeto, prefijo):
+    for intento in range(intentos_identificador):
+        objeto.identificador = genera_identificadores(1, prefijo)[0]
+        try:
+            with transaction.atomic():
+                objeto.save()
+            return objeto
+        except IntegrityError:
+            objeto.pk = None
+            if intento == intentos_identificador - 1:
+                raise
+
+# Guarda los campos dados de un objeto e incrementa su contador de versión. El incremento se realiza en la base de datos,
+# por lo que no se pierde ningún incremento aunque se modifique el objeto a la vez desde varias peticiones. Después se
+# lee la versión guardada, para que el objeto no conserve la expresión del incremento y al volver a guardarlo o al usar
+# su versión en las claves de la caché se use el valor real. Se llama después de validar el objeto
+def guarda_incrementando_version(objeto, campos):
+    objeto.version = F('version') + 1
+    objeto.save(update_fields=campos + ['version'])
+    objeto.refresh_from_db(fields=['version'])
+
+# Aplica a una consulta un plan de carga, que indica las relaciones que se obtienen en la misma consulta
+# (select_related), las relaciones que se obtienen en una consulta adicional para todos los objetos (prefetch_related) y
+# las únicas columnas que se cargan (only)
+def aplica_plan_carga(consulta, plan):
+    if plan['select_related']:
+        consulta = consulta.select_related(*plan['select_related'])
+    if plan['prefetch_related']:
+        consulta = consulta.prefetch_related(*plan['prefetch_related'])
+    return consulta.only(*plan['only'])
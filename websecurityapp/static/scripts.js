@@ -6,10 +6,11 @@ function alerta_redireccion(mensaje, url) {
 }
 
 // La funcion usada para poder seleccionar la pagina a seleccionar en la paginacion
-// Se activa al pulsar el boton asociado a esta funcionalidad
-function selecciona_pagina(n_pagina, pagina_param) {
+// Se activa al pulsar el boton asociado a esta funcionalidad. Los parametros de los demas listados de la pagina, ya
+// codificados, se conservan
+function selecciona_pagina(n_pagina, pagina_param, otros_parametros = '') {
     if (n_pagina != null) {
-        uri = encodeURI('?' + pagina_param + '=' + n_pagina);
+        uri = '?' + otros_parametros + encodeURI(pagina_param + '=' + n_pagina);
         window.location.href = uri;
     } else {
         window.location.href = '';
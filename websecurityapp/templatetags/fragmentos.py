@@ -0,0 +1,76 @@
+from django import template
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from websecurityapp.services.cache_services import registra_acceso_fragmento
+from websecurityserver.settings import tiempo_cache_fragmentos
+
+register = template.Library()
+
+
+# Resuelve un valor de la clave de un fragmento. Los valores que usan variables que no están en el contexto, como las
+# colecciones que solo se incluyen en algunos listados, se resuelven como None
+def _resuelve(valor, context):
+    try:
+        return valor.resolve(context)
+    except template.VariableDoesNotExist:
+        return None
+
+# Fragmento de plantilla que se guarda en la caché con una clave formada por su nombre y los valores dados, y que
+# registra los aciertos y fallos de la caché
+class FragmentoNode(template.Node):
+
+    def __init__(self, nodelist, nombre, valores):
+        self.nodelist = nodelist
+        self.nombre = nombre
+        self.valores = valores
+
+    def render(self, context):
+        clave = make_template_fragment_key(self.nombre, [_resuelve(valor, context) for valor in self.valores])
+        contenido = cache.get(clave)
+        registra_acceso_fragmento(self.nombre, contenido is not None)
+        if contenido is None:
+            contenido = self.nodelist.render(context)
+            cache.set(clave, contenido, tiempo_cache_fragmentos)
+        return contenido
+
+# Uso: {% fragmento 'nombre' valor1 valor2 ... %} ... {% endfragmento %}. Los valores deben incluir todo lo que cambia el
+# contenido del fragmento, normalmente el id y la versión de los objetos mostrados y el rol del usuario que lo ve
+@register.tag
+def fragmento(parser, token):
+    partes = token.split_contents()
+    if len(partes) < 2:
+        raise template.TemplateSyntaxError("'fragmento' requiere el nombre del fragmento")
+    nodelist = parser.parse(('endfragmento',))
+    parser.delete_first_token()
+    return FragmentoNode(nodelist, partes[1].strip('\'"'), [parser.compile_filter(parte) for parte in partes[2:]])
+
+# Rol del usuario respecto a un objeto con autor: administrador, autor, ambos u otro usuario
+@register.filter
+def rol(objeto, usuario):
+    roles = []
+    if usuario and usuario.es_admin:
+        roles.append('admin')
+    if usuario and objeto.autor_id == usuario.id:
+        roles.append('autor')
+    return '_'.join(roles) or 'otro'
+
+# Indica si el objeto está en la colección dada. Si la colección no está en el contexto, el objeto no está en ella
+@register.filter
+def en(objeto, coleccion):
+    return bool(coleccion) and objeto in coleccion
+
+# Ids de los objetos dados que están en la colección
+@register.filter
+def ids_en(objetos, coleccion):
+    return [objeto.id for objeto in objetos if en(objeto, coleccion)]
+
+# Ids de los objetos dados cuyo atributo indicado es verdadero
+@register.filter
+def ids_con(objetos, atributo):
+    return [objeto.id for objeto in objetos if getattr(objeto, atributo, False)]
+
+# Ids y versiones de los objetos dados y de sus autores, para formar la clave de un fragmento con varios objetos
+@register.filter
+def versiones(objetos):
+    return [(objeto.id, objeto.version, objeto.autor.version) for objeto in objetos]
@@ -0,0 +1,14 @@
+from django import template
+
+register = template.Library()
+
+
+# Parámetros de la petición que no pertenecen al listado paginado con el parámetro dado, listos para anteponerlos a los
+# del listado en los enlaces de la paginación. Así, en las páginas con varios listados paginados, al cambiar de página en
+# uno se conserva la página y el cursor de los demás
+@register.simple_tag(takes_context=True)
+def otros_parametros(context, page_param):
+    parametros = context['request'].GET.copy()
+    for sufijo in ['', '_despues', '_antes', '_ultima']:
+        parametros.pop(page_param + sufijo, None)
+    return parametros.urlencode() + '&' if parametros else ''
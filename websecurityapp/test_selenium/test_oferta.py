@@ -1602,7 +1602,7 @@ class OfertaTestCase(StaticLiveServerTestCase):
         ofertas_posibles = []
         for oferta_for in list(Oferta.objects.filter(borrador=False, vetada=False, cerrada=False)):
             ofertas_posibles.append(oferta_for)
-        actividades_realizadas = Usuario.objects.get(pk=usuario.id).actividades_realizadas.all()
+        actividades_realizadas = frozenset(Usuario.objects.get(pk=usuario.id).actividades_realizadas.all())
         # Se comprueba que no se ha solicitado antes la oferta y que se han realizado las actividades necesarias
         oferta = None
         for oferta_posible in ofertas_posibles:
@@ -1649,7 +1649,7 @@ class OfertaTestCase(StaticLiveServerTestCase):
         ofertas_posibles = []
         for oferta_for in list(Oferta.objects.filter(borrador=True, vetada=False, cerrada=False)):
             ofertas_posibles.append(oferta_for)
-        actividades_realizadas = Usuario.objects.get(pk=usuario.id).actividades_realizadas.all()
+        actividades_realizadas = frozenset(Usuario.objects.get(pk=usuario.id).actividades_realizadas.all())
         # Se comprueba que no se ha solicitado antes la oferta y que se han realizado las actividades necesarias
         oferta = None
         for oferta_posible in ofertas_posibles:
@@ -1701,7 +1701,7 @@ class OfertaTestCase(StaticLiveServerTestCase):
         ofertas_posibles = []
         for oferta_for in list(Oferta.objects.filter(borrador=False, vetada=False, cerrada=True)):
             ofertas_posibles.append(oferta_for)
-        actividades_realizadas = Usuario.objects.get(pk=usuario.id).actividades_realizadas.all()
+        actividades_realizadas = frozenset(Usuario.objects.get(pk=usuario.id).actividades_realizadas.all())
         # Se comprueba que no se ha solicitado antes la oferta y que se han realizado las actividades necesarias
         oferta = None
         for oferta_posible in ofertas_posibles:
@@ -1749,7 +1749,7 @@ class OfertaTestCase(StaticLiveServerTestCase):
         ofertas_posibles = []
         for oferta_for in list(Oferta.objects.filter(borrador=False, vetada=True, cerrada=False)):
             ofertas_posibles.append(oferta_for)
-        actividades_realizadas = Usuario.objects.get(pk=usuario.id).actividades_realizadas.all()
+        actividades_realizadas = frozenset(Usuario.objects.get(pk=usuario.id).actividades_realizadas.all())
         # Se comprueba que no se ha solicitado antes la oferta y que se han realizado las actividades necesarias
         oferta = None
         for oferta_posible in ofertas_posibles:
@@ -1798,7 +1798,7 @@ class OfertaTestCase(StaticLiveServerTestCase):
         ofertas_posibles = []
         for oferta_for in list(Oferta.objects.filter(borrador=False, vetada=False, cerrada=False, autor=usuario)):
             ofertas_posibles.append(oferta_for)
-        actividades_realizadas = Usuario.objects.get(pk=usuario.id).actividades_realizadas.all()
+        actividades_realizadas = frozenset(Usuario.objects.get(pk=usuario.id).actividades_realizadas.all())
         # Se comprueba que no se ha solicitado antes la oferta y que se han realizado las actividades necesarias
         oferta = None
         for oferta_posible in ofertas_posibles:
@@ -1876,7 +1876,7 @@ class OfertaTestCase(StaticLiveServerTestCase):
         ofertas_posibles = []
         for oferta_for in list(Oferta.objects.filter(borrador=False, vetada=False, cerrada=False)):
             ofertas_posibles.append(oferta_for)
-        actividades_realizadas = Usuario.objects.get(pk=usuario.id).actividades_realizadas.all()
+        actividades_realizadas = frozenset(Usuario.objects.get(pk=usuario.id).actividades_realizadas.all())
         # Se comprueba que no se ha solicitado antes la oferta y que se han realizado las actividades necesarias
         oferta = None
         for oferta_posible in ofertas_posibles:
@@ -14,6 +14,8 @@ def evaluar_columnas_listado_actividades(test_case, actividades_esperadas, usuar
         parent_element = test_case.selenium
     # Organizar las actividades esperadas por paginas
     dict_actividades_paginadas = paginar_lista(actividades_esperadas)
+    # Se obtienen una vez las actividades realizadas por el usuario, para comprobar cada fila en tiempo constante
+    actividades_realizadas = frozenset(usuario.actividades_realizadas.all())
     # Por cada pagina se evaluan las actividades que deben aparecer en la pagina
     for index_dict_actividades in dict_actividades_paginadas.keys():
         i = 2
@@ -25,7 +27,7 @@ def evaluar_columnas_listado_actividades(test_case, actividades_esperadas, usuar
                 test_case.assertEqual(fila.value_of_css_property('background-color'), 'rgba(255, 0, 0, 0.4)')
             # Si la actividad está resuelta y no vetada, entonces el background es verdoso
             # Esto solo se aplica cuando no se estan listando las propias ofertas
-            elif actividad in usuario.actividades_realizadas.all() and resalta_resueltas:
+            elif actividad in actividades_realizadas and resalta_resueltas:
                 test_case.assertEqual(fila.value_of_css_property('background-color'), 'rgba(0, 255, 0, 0.4)')
             # Se comprueba el título
             titulo = parent_element.find_element_by_xpath('//tbody/child::tr[{}]/child::td[1]'.format(i)).text
@@ -350,7 +352,7 @@ def buscar_boton_listado(test_case, id_listado, id_boton, page_param, **kwargs):
             parent_element = test_case.selenium
         # Busca el listado y la sección de paginación
         listado = parent_element.find_element_by_id(id_listado)
-        pagination = listado.find_element_by_id('id_pagination')
+        pagination = listado.find_element_by_id('id_pagination_{}'.format(page_param))
         # Busca el botón para pasar paǵina
         try:
             boton_siguiente = pagination.find_element_by_id('id_{}_siguiente'.format(page_param))
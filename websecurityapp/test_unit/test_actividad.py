@@ -1,16 +1,32 @@
 from django.test import TestCase, RequestFactory, Client
+from django.contrib.auth.models import User
 from django.urls import reverse
 from django.db.models import Q
 from django.core.exceptions import ObjectDoesNotExist
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.files.uploadedfile import SimpleUploadedFile
 
 from datetime import date
+from unittest import mock
+import csv
+import io
+import json
 import re
 
 from websecurityapp.models.perfil_models import Usuario
 from websecurityapp.models.actividad_models import Actividad
+from websecurityapp.models.oferta_models import Oferta
+from websecurityapp.services.actividad_services import get_actividades_visibles, crea_actividad
+from websecurityapp.services.cache_services import get_metricas_fragmentos, reinicia_metricas_fragmentos
+from websecurityapp.services.importacion_services import importa_actividades
+from websecurityapp.services.util_services import genera_identificadores, caracteres_identificador, \
+    longitud_identificador
+from websecurityapp.services.oferta_services import get_ofertas_inconsistentes_actividades_vetadas
 from websecurityapp.views.actividad_views import CreacionActividadesView
 
-from websecurityapp.test_unit.utils import test_listado
+from websecurityapp.test_unit.utils import test_listado, paginar_lista
 
 from websecurityserver.settings import numero_objetos_por_pagina
 
@@ -20,6 +36,7 @@ class ActividadTestCase(TestCase):
         self.factory = RequestFactory()
         self.client = Client()
         exec(open('populate_database.py').read())
+        cache.clear()
 
     # Método que simula un login
     def login(self, username, password):
@@ -46,7 +63,10 @@ class ActividadTestCase(TestCase):
             Q(autor__django_user__username=username) | Q(borrador=False) & Q(vetada=False)).order_by('id')
         datos_esperados = dict()
         datos_esperados['usuario'] = usuario
-        datos_esperados['actividades_realizadas'] = usuario.actividades_realizadas.all()
+        # Por cada página, los ids de las actividades realizadas por el usuario
+        ids_realizadas = frozenset(usuario.actividades_realizadas.values_list('id', flat = True))
+        datos_esperados['ids_actividades_realizadas'] = {n_pagina: frozenset(actividad.id for actividad in pagina
+            if actividad.id in ids_realizadas) for (n_pagina, pagina) in paginar_lista(list(actividades_esperadas)).items()}
         datos_esperados['titulo_pagina']: 'Listado de actividades'
         # Se realizan los tests
         test_listado(self,
@@ -59,6 +79,21 @@ class ActividadTestCase(TestCase):
         # El usuario se desloguea
         self.logout()
 
+    # Las actividades realizadas de la página se resaltan consultando una sola vez las actividades realizadas del usuario
+    def test_lista_actividades_realizadas(self):
+        usuario = self.login('usuario1', 'usuario1')
+        ids_realizadas = frozenset(usuario.actividades_realizadas.values_list('id', flat = True))
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.get(reverse('actividad_listado'))
+        tabla_realizadas = Usuario.actividades_realizadas.through._meta.db_table
+        self.assertEqual(len([consulta for consulta in contexto.captured_queries
+            if tabla_realizadas in consulta['sql']]), 1)
+        for actividad in response.context['page_obj_actividades']:
+            self.assertEqual(actividad.realizada, actividad.id in ids_realizadas)
+        if any(actividad.realizada and not actividad.vetada for actividad in response.context['page_obj_actividades']):
+            self.assertContains(response, 'rgba(0, 255, 0, 0.4)')
+        self.logout()
+
     # Un administrador accede al listado de actividades correctamente
     def test_lista_actividades_admin(self):
         # Se inicializan variables y el usuario se loguea
@@ -70,7 +105,10 @@ class ActividadTestCase(TestCase):
             Q(autor__django_user__username=username) | Q(borrador=False)).order_by('id')
         datos_esperados = dict()
         datos_esperados['usuario'] = usuario
-        datos_esperados['actividades_realizadas'] = usuario.actividades_realizadas.all()
+        # Por cada página, los ids de las actividades realizadas por el usuario
+        ids_realizadas = frozenset(usuario.actividades_realizadas.values_list('id', flat = True))
+        datos_esperados['ids_actividades_realizadas'] = {n_pagina: frozenset(actividad.id for actividad in pagina
+            if actividad.id in ids_realizadas) for (n_pagina, pagina) in paginar_lista(list(actividades_esperadas)).items()}
         datos_esperados['titulo_pagina']: 'Listado de actividades'
         # Se realizan los tests
         test_listado(self,
@@ -105,6 +143,52 @@ class ActividadTestCase(TestCase):
         # El usuario se desloguea
         self.logout()
 
+    # Un usuario recorre el listado de actividades usando los cursores de la paginación
+    def test_lista_actividades_cursor(self):
+        # Se inicializan variables y el usuario se loguea
+        username = 'usuario2'
+        password = 'usuario2'
+        self.login(username, password)
+        cache.clear()
+        actividades_esperadas = list(Actividad.objects.filter(
+            Q(autor__django_user__username=username) | Q(borrador=False)).order_by('id'))
+        paginas_esperadas = [actividades_esperadas[i:i + numero_objetos_por_pagina]
+            for i in range(0, len(actividades_esperadas), numero_objetos_por_pagina)]
+        url = reverse('actividad_listado')
+        # Se recorre el listado hacia delante, usando el cursor de la página siguiente
+        page_obj = self.client.get(url).context['page_obj_actividades']
+        paginas_recibidas = [list(page_obj)]
+        while page_obj.has_next():
+            response = self.client.get('{}?page={}&page_despues={}'.format(url, page_obj.next_page_number(),
+                page_obj.cursor_siguiente))
+            self.assertEqual(response.status_code, 200)
+            page_obj = response.context['page_obj_actividades']
+            paginas_recibidas.append(list(page_obj))
+        self.assertListEqual(paginas_recibidas, paginas_esperadas)
+        self.assertEqual(page_obj.number, len(paginas_esperadas))
+        self.assertEqual(page_obj.paginator.num_pages, len(paginas_esperadas))
+        # Se recorre el listado hacia atrás desde la última página, usando el cursor de la página anterior
+        page_obj = self.client.get('{}?page_ultima=1'.format(url)).context['page_obj_actividades']
+        paginas_recibidas = [list(page_obj)]
+        while page_obj.has_previous():
+            response = self.client.get('{}?page={}&page_antes={}'.format(url, page_obj.previous_page_number(),
+                page_obj.cursor_anterior))
+            self.assertEqual(response.status_code, 200)
+            page_obj = response.context['page_obj_actividades']
+            paginas_recibidas.insert(0, list(page_obj))
+        self.assertListEqual(paginas_recibidas, paginas_esperadas)
+        self.assertEqual(page_obj.number, 1)
+        # La primera página también se obtiene por cursor, sin OFFSET, y el número de actividades se reutiliza de la
+        # caché, por lo que al volver a la primera página no se cuentan de nuevo
+        with CaptureQueriesContext(connection) as contexto:
+            page_obj = self.client.get(url).context['page_obj_actividades']
+        self.assertTrue(page_obj.por_cursor)
+        self.assertListEqual(list(page_obj), paginas_esperadas[0])
+        self.assertFalse(any('COUNT(' in consulta['sql'] or 'OFFSET' in consulta['sql']
+            for consulta in contexto.captured_queries))
+        # El usuario se desloguea
+        self.logout()
+
 
 
     # DETALLES
@@ -714,6 +798,25 @@ class ActividadTestCase(TestCase):
         # El usuario se desloguea
         self.logout()
 
+    # Al vetar una actividad y levantar su veto se actualizan las ofertas que la requieren
+    def test_veta_y_levanta_veto_actividad_ofertas(self):
+        # Se inicializan variables y se loguea el usuario
+        username = 'usuario2'
+        password = 'usuario2'
+        actividad = Actividad.objects.filter(Q(vetada = False) & Q(borrador = False) & Q(oferta__isnull = False)).first()
+        self.login(username, password)
+        # Se veta la actividad y se comprueba que las ofertas que la requieren tienen actividades vetadas
+        self.client.post('/actividad/veto/{}/'.format(actividad.id), {'motivo_veto': 'Testing'})
+        ofertas = Oferta.objects.filter(actividades = actividad)
+        self.assertTrue(ofertas.exists())
+        self.assertFalse(ofertas.filter(tiene_actividades_vetadas = False).exists())
+        self.assertFalse(get_ofertas_inconsistentes_actividades_vetadas().exists())
+        # Se levanta el veto sobre la actividad y se comprueba que las ofertas vuelven a ser consistentes
+        self.client.get('/actividad/levantamiento_veto/{}/'.format(actividad.id))
+        self.assertFalse(get_ofertas_inconsistentes_actividades_vetadas().exists())
+        # El usuario se desloguea
+        self.logout()
+
     # Un usuario levanta el veto sobre una actividad sin estar logueado
     def test_levanta_veto_actividad_sin_loguear(self):
         # Se inicializan variables y se loguea el usuario        
@@ -786,3 +889,190 @@ class ActividadTestCase(TestCase):
         # El usuario se desloguea
         self.logout()
 
+
+
+    # EXPORTACIÓN
+
+    # Los usuarios exportan en JSONL y en CSV las mismas actividades que pueden ver en el listado
+    def test_exporta_actividades(self):
+        for username in ['usuario1', 'usuario2']:
+            usuario = self.login(username, username)
+            ids_esperados = list(get_actividades_visibles(usuario).values_list('id', flat = True))
+            # Se exportan las actividades en JSONL
+            response = self.client.get('/actividad/exportacion/jsonl/')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.streaming)
+            filas = [json.loads(linea) for linea in b''.join(response.streaming_content).decode().splitlines()]
+            self.assertEqual([fila['id'] for fila in filas], ids_esperados)
+            actividad = Actividad.objects.get(pk = filas[0]['id'])
+            self.assertEqual(filas[0]['identificador'], actividad.identificador)
+            self.assertEqual(filas[0]['autor'], actividad.autor.id)
+            self.assertEqual(filas[0]['autor.first_name'], actividad.autor.django_user.first_name)
+            self.assertEqual(filas[0]['autor.last_name'], actividad.autor.django_user.last_name)
+            # No se exportan los nombres de usuario con los que se loguean los autores
+            self.assertFalse(any('username' in columna for columna in filas[0]))
+            self.assertEqual(filas[0]['fecha_creacion'], actividad.fecha_creacion.isoformat())
+            # Se exportan las actividades en CSV
+            response = self.client.get('/actividad/exportacion/csv/')
+            self.assertEqual(response['Content-Type'], 'text/csv')
+            filas = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+            self.assertEqual([int(fila['id']) for fila in filas], ids_esperados)
+            self.logout()
+
+    # Un usuario exporta las actividades en un formato no válido, o sin estar logueado
+    def test_exporta_actividades_no_valido(self):
+        response = self.client.get('/actividad/exportacion/csv/')
+        self.assertEqual(response.status_code, 302)
+        self.login('usuario1', 'usuario1')
+        response = self.client.get('/actividad/exportacion/xml/')
+        self.assertEqual(response.status_code, 404)
+        self.logout()
+
+
+
+    # IMPORTACIÓN
+
+    # Un usuario importa actividades desde un fichero CSV, que contiene una fila no válida
+    def test_importa_actividades(self):
+        usuario = self.login('usuario1', 'usuario1')
+        n_actividades = Actividad.objects.filter(autor = usuario).count()
+        lineas = ['titulo,enlace,descripcion,comentable,borrador']
+        for i in range(10):
+            lineas.append('Importada {},http://localhost:8000/{},Descripción {},true,false'.format(i, i, i))
+        lineas.append('Sin enlace,no es un enlace,Descripción,false,')
+        fichero = SimpleUploadedFile('actividades.csv', '\n'.join(lineas).encode())
+        response = self.client.post('/actividad/importacion/csv/', {'fichero': fichero})
+        # Se importan las filas válidas y se indica el número de la fila no válida
+        self.assertEqual(response.status_code, 200)
+        resultado = response.json()
+        self.assertEqual(resultado['importados'], 10)
+        self.assertEqual([error['fila'] for error in resultado['errores']], [11])
+        actividades = Actividad.objects.filter(autor = usuario, titulo__startswith = 'Importada ').order_by('id')
+        self.assertEqual(Actividad.objects.filter(autor = usuario).count(), n_actividades + 10)
+        # Las actividades se importan en modo borrador aunque la fila indique lo contrario
+        self.assertTrue(all(actividad.comentable and actividad.borrador for actividad in actividades))
+        self.assertEqual(len(set(actividad.identificador for actividad in actividades)), 10)
+        self.logout()
+
+    # Las filas que no se pueden leer como CSV se indican como filas no válidas, sin impedir importar las demás
+    def test_importa_actividades_csv_no_valido(self):
+        self.login('usuario1', 'usuario1')
+        lineas = ['titulo,enlace,descripcion', 'Importada 1,http://localhost:8000/,Descripción',
+            'x' * 200000 + ',http://localhost:8000/,Descripción', 'Importada 2,http://localhost:8000/,Descripción']
+        fichero = SimpleUploadedFile('actividades.csv', '\n'.join(lineas).encode())
+        response = self.client.post('/actividad/importacion/csv/', {'fichero': fichero})
+        self.assertEqual(response.status_code, 200)
+        resultado = response.json()
+        self.assertEqual(resultado['importados'], 2)
+        self.assertEqual([error['fila'] for error in resultado['errores']], [2])
+        self.logout()
+
+    # Un fichero que no está codificado en UTF-8 se indica como fila no válida, y se importan las filas leídas antes
+    def test_importa_actividades_codificacion_no_valida(self):
+        usuario = self.login('usuario1', 'usuario1')
+        n_actividades = Actividad.objects.filter(autor = usuario).count()
+        for formato in ['csv', 'jsonl']:
+            fichero = SimpleUploadedFile('actividades.' + formato, b'\xff\xfe' + b'\x00' * 10)
+            response = self.client.post('/actividad/importacion/{}/'.format(formato), {'fichero': fichero})
+            self.assertEqual(response.status_code, 200)
+            resultado = response.json()
+            self.assertEqual(resultado['importados'], 0)
+            self.assertEqual(len(resultado['errores']), 1)
+            self.assertIn('UTF-8', resultado['errores'][0]['error'])
+        self.assertEqual(Actividad.objects.filter(autor = usuario).count(), n_actividades)
+        self.logout()
+
+    # El número de consultas al importar actividades no depende del número de filas de cada bloque: se insertan las
+    # actividades en una transacción, sin comprobar antes si existen sus identificadores
+    def test_importa_actividades_consultas(self):
+        usuario = Usuario.objects.get(django_user__username = 'usuario1')
+        filas = lambda n: [{'titulo': 'Importada {}'.format(i), 'enlace': 'http://localhost:8000/',
+            'descripcion': 'Descripción'} for i in range(n)]
+        with self.assertNumQueries(3):
+            importa_actividades(usuario, filas(5))
+        with self.assertNumQueries(3):
+            importa_actividades(usuario, filas(50))
+
+
+
+    # CACHÉ DE FRAGMENTOS
+
+    # Al volver a mostrar una página del listado sin cambios, la tabla se obtiene de la caché
+    def test_lista_actividades_fragmentos(self):
+        self.login('usuario1', 'usuario1')
+        reinicia_metricas_fragmentos()
+        response = self.client.get(reverse('actividad_listado'))
+        filas = len(response.context['page_obj_actividades'])
+        response_cacheada = self.client.get(reverse('actividad_listado'))
+        self.assertEqual(response_cacheada.content, response.content)
+        metricas = get_metricas_fragmentos()['fragmentos']
+        self.assertEqual(metricas['pagina_actividades'], {'aciertos': 1, 'fallos': 1, 'tasa_aciertos': 0.5})
+        # Las filas solo se generan al mostrar la página por primera vez
+        self.assertEqual(metricas['fila_actividad']['fallos'], filas)
+        self.assertEqual(metricas['fila_actividad']['aciertos'], 0)
+        self.logout()
+
+    # Al vetar una actividad se incrementa su versión, por lo que el listado deja de mostrar su fila cacheada
+    def test_lista_actividades_fragmentos_veto(self):
+        self.login('usuario2', 'usuario2')
+        url = reverse('actividad_listado')
+        actividad = next(actividad for actividad in self.client.get(url).context['page_obj_actividades']
+            if not actividad.vetada and not actividad.borrador)
+        self.assertContains(self.client.get(url), 'id="button_vetar_{}"'.format(actividad.id))
+        self.client.post('/actividad/veto/{}/'.format(actividad.id), {'motivo_veto': 'Testing'})
+        self.assertEqual(Actividad.objects.get(pk = actividad.id).version, actividad.version + 1)
+        response = self.client.get(url)
+        self.assertNotContains(response, 'id="button_vetar_{}"'.format(actividad.id))
+        self.assertContains(response, 'id="button_levantar_veto_{}"'.format(actividad.id))
+        self.logout()
+
+    # Solo los administradores pueden consultar las métricas de la caché de fragmentos
+    def test_metricas_cache(self):
+        self.login('usuario2', 'usuario2')
+        reinicia_metricas_fragmentos()
+        self.client.get(reverse('actividad_listado'))
+        self.client.get(reverse('actividad_listado'))
+        response = self.client.get(reverse('cache_metricas'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['fragmentos']['pagina_actividades']['tasa_aciertos'], 0.5)
+        self.logout()
+        self.login('usuario1', 'usuario1')
+        self.assertEqual(self.client.get(reverse('cache_metricas')).status_code, 403)
+        self.logout()
+
+
+
+    # IDENTIFICADORES
+
+    # Se generan identificadores distintos con el prefijo dado y la parte aleatoria con los caracteres permitidos
+    def test_genera_identificadores(self):
+        identificadores = genera_identificadores(5000, prefijo = 'ACT-')
+        self.assertEqual(len(set(identificadores)), 5000)
+        for identificador in identificadores:
+            self.assertTrue(identificador.startswith('ACT-'))
+            self.assertEqual(len(identificador), len('ACT-') + longitud_identificador)
+            self.assertTrue(all(caracter in caracteres_identificador for caracter in identificador[len('ACT-'):]))
+
+    # Si un identificador generado ya existe, la base de datos rechaza la actividad y se guarda con otro
+    def test_crea_actividad_identificador_existente(self):
+        existente = Actividad.objects.first().identificador
+        request = self.factory.get('/')
+        request.user = User.objects.get(username = 'usuario1')
+        actividad_dict = {'titulo': 'Título', 'enlace': 'http://localhost:8000/', 'descripcion': 'Descripción',
+            'comentable': False, 'autor': Usuario.objects.get(django_user = request.user)}
+        with mock.patch('websecurityapp.services.util_services._genera_aleatorios',
+                side_effect = [[existente[len('ACT-'):]], ['nuevo12345']]):
+            actividad = crea_actividad(actividad_dict, request)
+        self.assertEqual(actividad.identificador, 'ACT-nuevo12345')
+        self.assertEqual(Actividad.objects.get(pk = actividad.pk).identificador, 'ACT-nuevo12345')
+
+    # Si el identificador de una actividad importada ya existe, se vuelve a insertar el bloque con otros identificadores
+    def test_importa_actividades_identificador_existente(self):
+        existente = Actividad.objects.first().identificador
+        usuario = Usuario.objects.get(django_user__username = 'usuario1')
+        filas = [{'titulo': 'Importada', 'enlace': 'http://localhost:8000/', 'descripcion': 'Descripción'}]
+        with mock.patch('websecurityapp.services.util_services._genera_aleatorios',
+                side_effect = [[existente[len('ACT-'):]], ['nuevo12345']]):
+            resultado = importa_actividades(usuario, filas)
+        self.assertEqual(resultado, {'importados': 1, 'errores': []})
+        self.assertEqual(Actividad.objects.get(identificador = 'ACT-nuevo12345').titulo, 'Importada')
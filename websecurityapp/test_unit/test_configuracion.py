@@ -0,0 +1,78 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from unittest import mock
+from copy import deepcopy
+import importlib
+import os
+import sys
+
+from websecurityserver.settings import base
+
+# Variables de entorno mínimas de un despliegue en producción
+entorno_produccion = {'SECRET_KEY': 'clave-de-produccion', 'ALLOWED_HOSTS': 'ejemplo.com,www.ejemplo.com'}
+
+class ConfiguracionTestCase(SimpleTestCase):
+
+    # Carga de nuevo la configuración de producción con las variables de entorno dadas, quitando las de entorno_produccion
+    # que no se indiquen, y devuelve una copia de sus valores. La configuración de producción modifica algunos
+    # diccionarios de la configuración común, que se restauran al terminar
+    def carga_prod(self, **variables):
+        modulo = sys.modules.pop('websecurityserver.settings.prod', None)
+        try:
+            with mock.patch.dict(os.environ, variables), mock.patch.dict(base.DATABASES['default']), \
+                    mock.patch.dict(base.TEMPLATES[0]['OPTIONS']):
+                for nombre in entorno_produccion:
+                    if nombre not in variables:
+                        os.environ.pop(nombre, None)
+                prod = importlib.import_module('websecurityserver.settings.prod')
+                return {nombre: deepcopy(valor) for (nombre, valor) in vars(prod).items() if nombre.isupper()}
+        finally:
+            sys.modules.pop('websecurityserver.settings.prod', None)
+            if modulo is not None:
+                sys.modules['websecurityserver.settings.prod'] = modulo
+
+
+
+    # PRODUCCIÓN
+
+    # En producción se usan la clave secreta y los hosts indicados, y no los de desarrollo
+    def test_prod(self):
+        prod = self.carga_prod(**entorno_produccion)
+        self.assertEqual(prod['SECRET_KEY'], 'clave-de-produccion')
+        self.assertEqual(prod['ALLOWED_HOSTS'], ['ejemplo.com', 'www.ejemplo.com'])
+        self.assertFalse(prod['DEBUG'])
+
+    # En producción no se puede arrancar sin clave secreta o sin hosts
+    def test_prod_sin_configurar(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.carga_prod(ALLOWED_HOSTS = entorno_produccion['ALLOWED_HOSTS'])
+        with self.assertRaises(ImproperlyConfigured):
+            self.carga_prod(SECRET_KEY = entorno_produccion['SECRET_KEY'])
+
+    # Las conexiones persistentes duran 60 segundos por defecto, el tiempo indicado, o no se cierran nunca si la variable
+    # está vacía
+    def test_prod_conexiones_persistentes(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('DB_CONN_MAX_AGE', None)
+            self.assertEqual(self.carga_prod(**entorno_produccion)['DATABASES']['default']['CONN_MAX_AGE'], 60)
+        prod = self.carga_prod(DB_CONN_MAX_AGE = '5', **entorno_produccion)
+        self.assertEqual(prod['DATABASES']['default']['CONN_MAX_AGE'], 5)
+        prod = self.carga_prod(DB_CONN_MAX_AGE = '', **entorno_produccion)
+        self.assertIsNone(prod['DATABASES']['default']['CONN_MAX_AGE'])
+
+
+
+    # ELECCIÓN DEL ENTORNO
+
+    # Si DJANGO_SETTINGS_MODULE apunta a un módulo del paquete que no es un entorno, como la configuración común, se usa
+    # la configuración de desarrollo
+    def test_entorno_modulo_no_entorno(self):
+        import websecurityserver.settings as configuracion
+        try:
+            for modulo in ['websecurityserver.settings.base', 'websecurityserver.settings.dev']:
+                with mock.patch.dict(os.environ, {'DJANGO_SETTINGS_MODULE': modulo}):
+                    os.environ.pop('DJANGO_ENTORNO', None)
+                    self.assertEqual(importlib.reload(configuracion).entorno_configuracion, 'dev')
+        finally:
+            importlib.reload(configuracion)
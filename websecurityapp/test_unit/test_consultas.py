@@ -0,0 +1,58 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from unittest import mock
+
+from websecurityapp.consultas import carga_datos_consultas, mide_consultas_vistas, lee_linea_base, \
+    compara_linea_base, usuarios_consultas
+
+class ConsultasTestCase(TestCase):
+
+    def setUp(self):
+        carga_datos_consultas()
+
+
+
+    # CONSULTAS
+
+    # Ninguna vista hace más consultas que las indicadas en la línea base. Si una vista mejora o se añade una vista
+    # nueva, se debe actualizar la línea base con "python manage.py consultas_vistas --actualiza"
+    def test_consultas_vistas(self):
+        regresiones = compara_linea_base(mide_consultas_vistas(), lee_linea_base())
+        self.assertEqual(regresiones, [])
+
+
+
+    # LISTADOS
+
+    # El número de consultas de los listados no depende del número de objetos por página, porque los datos que muestra
+    # cada fila se obtienen en la consulta de la página
+    def test_consultas_listados_tamaño_pagina(self):
+        listados = {
+            'actividad_listado': 'page_obj_actividades',
+            'actividad_listado_propio': 'page_obj_actividades',
+            'oferta_listado': 'page_obj_ofertas',
+            'oferta_listado_propio': 'page_obj_ofertas',
+            'oferta_listado_solicitud_propio': 'page_obj_ofertas',
+            'perfil_detalles': 'page_obj_actividades_realizadas',
+        }
+        for username in usuarios_consultas + ['consultas_0']:
+            self.client.force_login(User.objects.get(username = username))
+            for (nombre, dato_lista) in listados.items():
+                consultas = {}
+                for tamaño in [3, 10, 30]:
+                    # Se vacía la caché para que se generen todas las filas
+                    cache.clear()
+                    with mock.patch('websecurityapp.views.paginacion.numero_objetos_por_pagina', tamaño):
+                        with CaptureQueriesContext(connection) as contexto:
+                            response = self.client.get(reverse(nombre))
+                    self.assertEqual(response.status_code, 200)
+                    consultas[len(response.context[dato_lista])] = len(contexto)
+                self.assertEqual(len(set(consultas.values())), 1, '{} {}: {}'.format(nombre, username, consultas))
+                # El listado de actividades tiene objetos suficientes para mostrar más filas en cada tamaño de página
+                if nombre == 'actividad_listado':
+                    self.assertEqual(len(consultas), 3)
@@ -0,0 +1,83 @@
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from datetime import date, timedelta
+from io import StringIO
+
+from websecurityapp.models.actividad_models import Actividad
+from websecurityapp.models.oferta_models import Oferta, Solicitud
+from websecurityapp.models.perfil_models import Usuario
+from websecurityapp.services.dataset_services import max_antiguedad
+from websecurityapp.services.oferta_services import get_ofertas_inconsistentes_actividades_vetadas
+
+class DatasetTestCase(TestCase):
+
+    # Genera un conjunto de datos con el comando y el prefijo dado
+    def genera(self, prefijo, semilla = 7, *args):
+        call_command('generate_dataset', '--users', 20, '--actividades', 200, '--ofertas', 80, '--seed', semilla,
+            '--prefijo', prefijo, '--lote', 50, *args, stdout = StringIO())
+
+    # Describe un conjunto de datos según la posición de cada objeto en el orden de creación, sin depender de los ids
+    def describe(self, prefijo):
+        posicion_usuario = lambda usuario: usuario.django_user.username[len(prefijo) + 1:]
+        posicion_actividad = lambda actividad: actividad.identificador[len(prefijo) + 2:]
+        usuarios = [(posicion_usuario(usuario), usuario.vetado, usuario.es_admin,
+            sorted(posicion_actividad(actividad) for actividad in usuario.actividades_realizadas.all()),
+            sorted(solicitud.oferta.identificador[len(prefijo):] for solicitud in usuario.solicitudes.all()))
+            for usuario in Usuario.objects.filter(django_user__username__startswith = prefijo + '_').order_by('id')]
+        actividades = [(posicion_actividad(actividad), posicion_usuario(actividad.autor), actividad.borrador,
+            actividad.vetada, actividad.fecha_creacion)
+            for actividad in Actividad.objects.filter(identificador__startswith = prefijo + '-A').order_by('id')]
+        ofertas = [(oferta.identificador[len(prefijo):], posicion_usuario(oferta.autor), oferta.borrador, oferta.cerrada,
+            oferta.vetada, sorted(posicion_actividad(actividad) for actividad in oferta.actividades.all()))
+            for oferta in Oferta.objects.filter(identificador__startswith = prefijo + '-O').order_by('id')]
+        return [usuarios, actividades, ofertas]
+
+
+
+    # GENERACIÓN
+
+    # Se genera un conjunto de datos consistente con las reglas de la aplicación
+    def test_genera_dataset(self):
+        self.genera('carga')
+        self.assertEqual(Usuario.objects.filter(django_user__username__startswith = 'carga_').count(), 20)
+        self.assertEqual(Actividad.objects.filter(identificador__startswith = 'carga-A').count(), 200)
+        self.assertEqual(Oferta.objects.filter(identificador__startswith = 'carga-O').count(), 80)
+        self.assertTrue(Solicitud.objects.exists())
+        # El valor almacenado de las ofertas con actividades vetadas es consistente
+        self.assertFalse(get_ofertas_inconsistentes_actividades_vetadas().exists())
+        # Solo hay motivo de veto en los objetos vetados
+        self.assertFalse(Actividad.objects.filter(vetada = False, motivo_veto__isnull = False).exists())
+        self.assertFalse(Oferta.objects.filter(vetada = True, motivo_veto__isnull = True).exists())
+        # Las solicitudes son de ofertas abiertas de otros usuarios, cuyas actividades requeridas ha realizado el usuario
+        for solicitud in Solicitud.objects.all():
+            oferta = solicitud.oferta
+            self.assertFalse(oferta.borrador or oferta.cerrada or oferta.vetada or oferta.tiene_actividades_vetadas)
+            self.assertNotEqual(oferta.autor, solicitud.usuario)
+            realizadas = set(solicitud.usuario.actividades_realizadas.all())
+            self.assertTrue(set(oferta.actividades.all()) <= realizadas)
+        # Los usuarios pueden loguearse con el prefijo como contraseña
+        self.assertTrue(self.client.login(username = 'carga_0', password = 'carga'))
+        # No se puede generar otro conjunto de datos con el mismo prefijo
+        with self.assertRaises(CommandError):
+            self.genera('carga')
+
+    # Para la misma semilla se genera el mismo conjunto de datos, y para otra semilla uno distinto
+    def test_genera_dataset_determinista(self):
+        self.genera('uno')
+        self.genera('dos')
+        self.genera('tres', semilla = 8)
+        self.assertEqual(self.describe('uno'), self.describe('dos'))
+        self.assertNotEqual(self.describe('uno'), self.describe('tres'))
+
+    # Las fechas de creación son anteriores a la fecha base dada, y con la misma fecha base se generan las mismas fechas
+    def test_genera_dataset_fecha_base(self):
+        fecha_base = date(2024, 6, 1)
+        self.genera('uno', 7, '--fecha-base', '2024-06-01')
+        self.genera('dos', 7, '--fecha-base', '2024-06-01')
+        self.assertEqual(self.describe('uno'), self.describe('dos'))
+        for modelo in [Actividad, Oferta]:
+            fechas = modelo.objects.filter(identificador__startswith = 'uno-').values_list('fecha_creacion', flat = True)
+            for fecha in fechas:
+                self.assertTrue(fecha_base - timedelta(days = max_antiguedad) <= fecha < fecha_base)
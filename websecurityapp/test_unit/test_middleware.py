@@ -0,0 +1,25 @@
+from django.test import TestCase
+from django.db import connection
+
+from unittest import mock
+
+from websecurityapp.middleware import ComprobacionConexionesMiddleware
+
+class MiddlewareTestCase(TestCase):
+
+    # CONEXIONES
+
+    # Al comenzar una petición se cierran las conexiones persistentes que ya no son válidas, y se conservan las demás
+    def test_comprobacion_conexiones(self):
+        middleware = ComprobacionConexionesMiddleware(lambda request: 'respuesta')
+        connection.ensure_connection()
+        with mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 60}):
+            for usable in [True, False]:
+                with mock.patch.object(connection, 'is_usable', return_value = usable), \
+                        mock.patch.object(connection, 'close') as close:
+                    self.assertEqual(middleware(None), 'respuesta')
+                    self.assertEqual(close.called, not usable)
+        # Sin conexiones persistentes no se comprueba la conexión
+        with mock.patch.object(connection, 'is_usable') as is_usable:
+            middleware(None)
+            self.assertFalse(is_usable.called)
@@ -0,0 +1,309 @@
+from django.test import TestCase, RequestFactory
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Count
+from django.forms.models import model_to_dict
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from unittest import mock
+import html
+
+from websecurityapp.models.actividad_models import Actividad
+from websecurityapp.admin import ActividadAdmin, OfertaAdmin, SolicitudAdmin, UsuarioAdmin
+from websecurityapp.models.oferta_models import Oferta, Solicitud
+from websecurityapp.services.moderacion_services import veta_actividades, levanta_veto_actividades, veta_ofertas, \
+    levanta_veto_ofertas, cierra_ofertas, get_ofertas_mas_solicitadas
+from websecurityapp.services.oferta_services import get_ofertas_inconsistentes_actividades_vetadas
+
+class ModeracionTestCase(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        exec(open('populate_database.py').read())
+        cache.clear()
+
+    # Crea una petición del usuario dado
+    def peticion(self, username):
+        request = self.factory.post('/')
+        request.user = User.objects.get(username = username)
+        return request
+
+    # Método que simula un login
+    def login(self, username, password):
+        self.client.post('/login/', {'username': username, 'password': password})
+
+    # Número de solicitudes de las ofertas abiertas dadas
+    def solicitudes_pendientes(self, ofertas):
+        return Solicitud.objects.filter(oferta__in = ofertas, oferta__cerrada = False).count()
+
+
+
+    # VETO DE ACTIVIDADES
+
+    # Un administrador veta varias actividades a la vez. Se omiten las que no se pueden vetar, se marcan las ofertas que
+    # requieren las actividades vetadas y se informa de las ofertas y solicitudes afectadas
+    def test_veta_actividades(self):
+        vetables = list(Actividad.objects.filter(vetada = False, borrador = False, oferta__isnull = False).distinct()
+            .order_by('id')[:2])
+        no_vetables = list(Actividad.objects.filter(vetada = True).order_by('id')[:1]) + \
+            list(Actividad.objects.filter(borrador = True).order_by('id')[:1])
+        versiones = {actividad.id: actividad.version for actividad in vetables}
+        ids = [actividad.id for actividad in vetables + no_vetables] + [0]
+        informe = veta_actividades(self.peticion('usuario2'), ids + ids[:1], 'Testing')
+        ofertas = Oferta.objects.filter(actividades__in = vetables).distinct()
+        self.assertEqual(informe['moderados'], sorted(versiones))
+        self.assertEqual(informe['omitidos'], [actividad.id for actividad in no_vetables] + [0])
+        self.assertEqual(informe['ofertas_afectadas'], sorted(oferta.id for oferta in ofertas))
+        self.assertEqual(informe['solicitudes_pendientes'], self.solicitudes_pendientes(ofertas))
+        for actividad in Actividad.objects.filter(pk__in = versiones):
+            self.assertTrue(actividad.vetada)
+            self.assertEqual(actividad.motivo_veto, 'Testing')
+            self.assertEqual(actividad.version, versiones[actividad.id] + 1)
+        for actividad in no_vetables:
+            self.assertEqual(Actividad.objects.get(pk = actividad.id).motivo_veto, actividad.motivo_veto)
+        self.assertFalse(ofertas.filter(tiene_actividades_vetadas = False).exists())
+        self.assertFalse(get_ofertas_inconsistentes_actividades_vetadas().exists())
+
+    # Se levanta el veto sobre varias actividades a la vez y las ofertas que las requieren vuelven a ser consistentes
+    def test_levanta_veto_actividades(self):
+        vetadas = list(Actividad.objects.filter(vetada = True))
+        no_vetada = Actividad.objects.filter(vetada = False).first()
+        informe = levanta_veto_actividades(self.peticion('usuario2'), [actividad.id for actividad in vetadas] +
+            [no_vetada.id])
+        self.assertEqual(informe['moderados'], sorted(actividad.id for actividad in vetadas))
+        self.assertEqual(informe['omitidos'], [no_vetada.id])
+        self.assertFalse(Actividad.objects.filter(vetada = True).exists())
+        self.assertFalse(Actividad.objects.filter(motivo_veto__isnull = False).exists())
+        self.assertFalse(get_ofertas_inconsistentes_actividades_vetadas().exists())
+
+    # El número de consultas al vetar actividades no depende del número de actividades ni de ofertas afectadas
+    def test_veta_actividades_consultas(self):
+        ids = list(Actividad.objects.filter(vetada = False, borrador = False, oferta__isnull = False).distinct()
+            .order_by('id').values_list('id', flat = True))
+        consultas = []
+        for ids_veto in [ids[:1], ids[1:]]:
+            request = self.peticion('usuario2')
+            with CaptureQueriesContext(connection) as contexto:
+                veta_actividades(request, ids_veto, 'Testing')
+            consultas.append(len(contexto))
+        self.assertTrue(len(ids) > 2)
+        self.assertEqual(consultas[0], consultas[1])
+
+
+
+    # VETO DE OFERTAS
+
+    # Un administrador veta varias ofertas a la vez y se informa de sus solicitudes pendientes
+    def test_veta_ofertas(self):
+        vetables = list(Oferta.objects.filter(vetada = False, borrador = False, cerrada = False).order_by('id'))
+        no_vetables = list(Oferta.objects.exclude(pk__in = [oferta.id for oferta in vetables]).order_by('id'))
+        informe = veta_ofertas(self.peticion('usuario2'), [oferta.id for oferta in vetables + no_vetables], 'Testing')
+        self.assertEqual(informe['moderados'], [oferta.id for oferta in vetables])
+        self.assertEqual(informe['omitidos'], [oferta.id for oferta in no_vetables])
+        self.assertEqual(informe['ofertas_afectadas'], [oferta.id for oferta in vetables])
+        self.assertEqual(informe['solicitudes_pendientes'], self.solicitudes_pendientes(vetables))
+        for oferta in Oferta.objects.filter(pk__in = informe['moderados']):
+            self.assertTrue(oferta.vetada)
+            self.assertEqual(oferta.motivo_veto, 'Testing')
+        # Se levanta el veto sobre las mismas ofertas
+        informe = levanta_veto_ofertas(self.peticion('usuario2'), [oferta.id for oferta in vetables])
+        self.assertEqual(informe['moderados'], [oferta.id for oferta in vetables])
+        self.assertFalse(Oferta.objects.filter(pk__in = informe['moderados'], vetada = True).exists())
+        self.assertFalse(Oferta.objects.filter(pk__in = informe['moderados'], motivo_veto__isnull = False).exists())
+
+    # Un usuario que no es administrador trata de vetar varias ofertas, y no se modifica ninguna
+    def test_veta_ofertas_usuario_incorrecto(self):
+        ofertas = Oferta.objects.filter(vetada = False, borrador = False, cerrada = False)
+        ids = list(ofertas.values_list('id', flat = True))
+        with self.assertRaises(Exception):
+            veta_ofertas(self.peticion('usuario1'), ids, 'Testing')
+        self.assertFalse(Oferta.objects.filter(pk__in = ids, vetada = True).exists())
+
+    # No se puede vetar sin motivo de veto, con ids no válidos o con demasiados ids
+    def test_veta_datos_no_validos(self):
+        request = self.peticion('usuario2')
+        ids = list(Oferta.objects.filter(vetada = False, borrador = False, cerrada = False).values_list('id', flat = True))
+        for (ids_veto, motivo_veto) in [(ids, ''), (ids, ' '), (ids, 'a' * 1001), (['a'], 'Testing')]:
+            with self.assertRaises(ValidationError):
+                veta_ofertas(request, ids_veto, motivo_veto)
+        with mock.patch('websecurityapp.services.moderacion_services.numero_maximo_objetos_moderados', 1):
+            with self.assertRaises(ValidationError):
+                veta_ofertas(request, ids[:2], 'Testing')
+        self.assertFalse(Oferta.objects.filter(pk__in = ids, vetada = True).exists())
+
+    # Un administrador cierra varias ofertas a la vez y se informa de las solicitudes que quedan sin resolver
+    def test_cierra_ofertas(self):
+        cerrables = list(Oferta.objects.filter(vetada = False, borrador = False, cerrada = False).order_by('id'))
+        vetada = Oferta.objects.filter(vetada = True).first()
+        informe = cierra_ofertas(self.peticion('usuario2'), [oferta.id for oferta in cerrables] + [vetada.id])
+        self.assertEqual(informe['moderados'], [oferta.id for oferta in cerrables])
+        self.assertEqual(informe['omitidos'], [vetada.id])
+        self.assertEqual(informe['solicitudes_pendientes'], Solicitud.objects.filter(oferta__in = cerrables).count())
+        self.assertFalse(Oferta.objects.filter(pk__in = informe['moderados'], cerrada = False).exists())
+        self.assertFalse(Oferta.objects.get(pk = vetada.id).cerrada)
+
+
+
+    # COLA DE MODERACIÓN
+
+    # Un administrador accede a la cola de moderación, con las actividades y ofertas publicadas recientemente paginadas
+    # por cursor y las ofertas más solicitadas
+    def test_cola_moderacion(self):
+        self.login('usuario2', 'usuario2')
+        with mock.patch('websecurityapp.services.moderacion_services.dias_cola_moderacion', 100000):
+            response = self.client.get(reverse('moderacion_cola'))
+        self.assertEqual(response.status_code, 200)
+        page_obj_actividades = response.context['page_obj_actividades']
+        self.assertTrue(page_obj_actividades.por_cursor)
+        self.assertEqual([actividad.id for actividad in page_obj_actividades], list(Actividad.objects
+            .filter(borrador = False).order_by('id').values_list('id', flat = True)[:len(page_obj_actividades)]))
+        self.assertFalse(any(oferta.borrador or oferta.cerrada for oferta in response.context['page_obj_ofertas']))
+        # Las ofertas más solicitadas se ordenan por número de solicitudes
+        solicitudes = [oferta.n_solicitudes for oferta in response.context['ofertas_mas_solicitadas']]
+        self.assertTrue(solicitudes)
+        self.assertEqual(solicitudes, sorted(solicitudes, reverse = True))
+        self.assertEqual(solicitudes[0], max(Solicitud.objects.filter(oferta__cerrada = False, oferta__borrador = False)
+            .values_list('oferta').annotate(n = Count('id')).values_list('n', flat = True)))
+        # Sin objetos publicados recientemente, la cola solo muestra las ofertas más solicitadas
+        response = self.client.get(reverse('moderacion_cola'))
+        self.assertEqual(len(response.context['page_obj_actividades']), 0)
+        self.assertEqual(len(response.context['page_obj_ofertas']), 0)
+
+    # Las ofertas más solicitadas son las publicadas y abiertas con alguna solicitud, ordenadas por número de solicitudes
+    # y por id, hasta el número indicado
+    def test_ofertas_mas_solicitadas(self):
+        esperadas = list(Oferta.objects.filter(borrador = False, cerrada = False).annotate(n = Count('solicitudes'))
+            .filter(n__gt = 0).order_by('-n', 'id').values_list('id', 'n'))
+        self.assertTrue(len(esperadas) > 1)
+        ofertas = get_ofertas_mas_solicitadas()
+        self.assertEqual([(oferta.id, oferta.n_solicitudes) for oferta in ofertas], esperadas)
+        self.assertEqual([oferta.id for oferta in get_ofertas_mas_solicitadas(1)], [esperadas[0][0]])
+        # Al cerrar una oferta deja de aparecer
+        Oferta.objects.filter(pk = esperadas[0][0]).update(cerrada = True)
+        self.assertEqual([oferta.id for oferta in get_ofertas_mas_solicitadas()], [id for (id, n) in esperadas[1:]])
+
+    # Los dos listados paginados de la cola tienen elementos con ids distintos, y al cambiar de página en uno se conservan
+    # la página y el cursor del otro
+    def test_cola_moderacion_paginacion(self):
+        self.login('usuario2', 'usuario2')
+        with mock.patch('websecurityapp.services.moderacion_services.dias_cola_moderacion', 100000), \
+                mock.patch('websecurityapp.views.paginacion.numero_objetos_por_pagina', 1):
+            response = self.client.get(reverse('moderacion_cola'))
+            cursor = response.context['page_obj_ofertas'].cursor_siguiente
+            response = self.client.get(reverse('moderacion_cola'), {'page_ofertas': 2, 'page_ofertas_despues': cursor})
+        self.assertEqual(response.context['page_obj_ofertas'].number, 2)
+        contenido = response.content.decode()
+        for page_param in ['page_actividades', 'page_ofertas']:
+            for id_elemento in ['id_pagination_', 'input_page_range_', 'id_{}_siguiente'.format(page_param)]:
+                self.assertEqual(contenido.count('id="{}{}"'.format(id_elemento,
+                    page_param if id_elemento.endswith('_') else '')), 1)
+        self.assertNotIn('id="input_page_range"', contenido)
+        self.assertIn('href="?page_ofertas=2&page_ofertas_despues={}&page_actividades=2&page_actividades_despues='
+            .format(cursor), html.unescape(contenido))
+        self.assertIn('href="?page_ofertas=1"', contenido)
+
+    # Solo los administradores pueden acceder a la cola de moderación
+    def test_cola_moderacion_usuario_incorrecto(self):
+        response = self.client.get(reverse('moderacion_cola'))
+        self.assertRedirects(response, '/login/?next=/moderacion/')
+        self.login('usuario1', 'usuario1')
+        self.assertEqual(self.client.get(reverse('moderacion_cola')).status_code, 403)
+        oferta = Oferta.objects.filter(vetada = False, borrador = False, cerrada = False).first()
+        response = self.client.post(reverse('moderacion_cola'), {'entidad': 'ofertas', 'accion': 'cierra',
+            'ids': [oferta.id]})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Oferta.objects.get(pk = oferta.id).cerrada)
+
+    # Un administrador veta varias actividades desde la cola de moderación y se le muestra el informe
+    def test_cola_moderacion_veta_actividades(self):
+        actividades = list(Actividad.objects.filter(vetada = False, borrador = False).values_list('id', flat = True))
+        self.login('usuario2', 'usuario2')
+        response = self.client.post(reverse('moderacion_cola'), {'entidad': 'actividades', 'accion': 'veta',
+            'ids': actividades, 'motivo_veto': 'Testing'})
+        self.assertRedirects(response, reverse('moderacion_cola'))
+        mensajes = [str(mensaje) for mensaje in get_messages(response.wsgi_request)]
+        self.assertEqual(len(mensajes), 1)
+        self.assertTrue(mensajes[0].startswith('Se han moderado {} objetos'.format(len(actividades))))
+        self.assertFalse(Actividad.objects.filter(pk__in = actividades, vetada = False).exists())
+        self.assertFalse(get_ofertas_inconsistentes_actividades_vetadas().exists())
+
+    # Las acciones no válidas, sin objetos seleccionados o sin motivo de veto no modifican ningún objeto
+    def test_cola_moderacion_accion_no_valida(self):
+        ofertas = list(Oferta.objects.filter(vetada = False, borrador = False, cerrada = False)
+            .values_list('id', flat = True))
+        self.login('usuario2', 'usuario2')
+        for datos in [{'entidad': 'actividades', 'accion': 'cierra', 'ids': ofertas},
+                {'entidad': 'ofertas', 'accion': 'cierra'},
+                {'entidad': 'ofertas', 'accion': 'veta', 'ids': ofertas, 'motivo_veto': ''}]:
+            response = self.client.post(reverse('moderacion_cola'), datos)
+            self.assertRedirects(response, reverse('moderacion_cola'))
+            self.assertEqual([mensaje.level_tag for mensaje in get_messages(response.wsgi_request)], ['error'])
+        self.assertFalse(Oferta.objects.filter(pk__in = ofertas).exclude(vetada = False, cerrada = False).exists())
+
+
+
+    # ADMINISTRADOR DE DJANGO
+
+    # Los listados del administrador de Django obtienen los autores y usuarios de las filas en la misma consulta, por lo
+    # que el número de consultas no depende del número de filas de la página
+    def test_listados_administrador(self):
+        User.objects.create_superuser('admin', 'admin@admin.com', 'admin')
+        self.client.login(username = 'admin', password = 'admin')
+        for (modelo_admin, url) in [(UsuarioAdmin, 'usuario'), (ActividadAdmin, 'actividad'), (OfertaAdmin, 'oferta'),
+                (SolicitudAdmin, 'solicitud')]:
+            consultas = []
+            for filas in [1, 100]:
+                with mock.patch.object(modelo_admin, 'list_per_page', filas), \
+                        CaptureQueriesContext(connection) as contexto:
+                    response = self.client.get('/admin/websecurityapp/{}/'.format(url))
+                self.assertEqual(response.status_code, 200)
+                consultas.append(len(contexto))
+            self.assertEqual(consultas[0], consultas[1], url)
+
+    # Datos del formulario del administrador de Django para el objeto dado, con los cambios indicados
+    def datos_administrador(self, objeto, **cambios):
+        datos = model_to_dict(objeto, exclude = ['id', 'version', 'tiene_actividades_vetadas'])
+        datos.update(cambios)
+        return {campo: '' if valor is None else ','.join(str(o.pk) for o in valor) if isinstance(valor, list) else valor
+            for (campo, valor) in datos.items()}
+
+    # Al vetar una actividad desde el administrador de Django se marcan las ofertas que la requieren y se incrementan las
+    # versiones, y al levantar el veto se recalcula la marca y se elimina el motivo de veto
+    def test_veta_actividad_administrador(self):
+        User.objects.create_superuser('admin', 'admin@admin.com', 'admin')
+        self.client.login(username = 'admin', password = 'admin')
+        actividad = Actividad.objects.filter(vetada = False, borrador = False, oferta__isnull = False).first()
+        ofertas = Oferta.objects.filter(actividades = actividad)
+        url = '/admin/websecurityapp/actividad/{}/change/'.format(actividad.id)
+        for (cambios, vetada) in [({'vetada': True, 'motivo_veto': 'Testing'}, True), ({'vetada': False}, False)]:
+            versiones = dict(ofertas.values_list('id', 'version'))
+            version = Actividad.objects.get(pk = actividad.id).version
+            response = self.client.post(url, self.datos_administrador(Actividad.objects.get(pk = actividad.id),
+                **cambios))
+            self.assertRedirects(response, '/admin/websecurityapp/actividad/')
+            actividad_guardada = Actividad.objects.get(pk = actividad.id)
+            self.assertEqual(actividad_guardada.vetada, vetada)
+            self.assertEqual(actividad_guardada.version, version + 1)
+            for oferta in ofertas.all():
+                self.assertEqual(oferta.version, versiones[oferta.id] + 1)
+            self.assertFalse(get_ofertas_inconsistentes_actividades_vetadas().exists())
+        self.assertIsNone(actividad_guardada.motivo_veto)
+
+    # Al cambiar las actividades requeridas de una oferta desde el administrador de Django se recalcula si tiene
+    # actividades vetadas, y la marca y la versión no se pueden modificar a mano
+    def test_actividades_oferta_administrador(self):
+        User.objects.create_superuser('admin', 'admin@admin.com', 'admin')
+        self.client.login(username = 'admin', password = 'admin')
+        oferta = Oferta.objects.filter(tiene_actividades_vetadas = False).first()
+        vetada = Actividad.objects.filter(vetada = True).first()
+        response = self.client.post('/admin/websecurityapp/oferta/{}/change/'.format(oferta.id),
+            self.datos_administrador(oferta, actividades = list(oferta.actividades.all()) + [vetada], version = 0))
+        self.assertRedirects(response, '/admin/websecurityapp/oferta/')
+        oferta_guardada = Oferta.objects.get(pk = oferta.id)
+        self.assertTrue(oferta_guardada.tiene_actividades_vetadas)
+        self.assertTrue(oferta_guardada.version > oferta.version)
+        self.assertFalse(get_ofertas_inconsistentes_actividades_vetadas().exists())
@@ -1,17 +1,27 @@
 from django.test import TestCase, RequestFactory, Client
+from django.contrib.auth.models import User
 from django.urls import reverse
 from django.db.models import Q, OuterRef, Exists
 from django.core.exceptions import ObjectDoesNotExist
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
 
 from datetime import date
+from io import StringIO
+import json
+import os
 import re
+import tempfile
 
 from websecurityapp.models.actividad_models import Actividad
 from websecurityapp.models.oferta_models import Oferta, Solicitud
 from websecurityapp.models.perfil_models import Usuario
 from websecurityapp.models.oferta_models import Oferta
+from websecurityapp.services.oferta_services import get_ofertas_visibles, get_ofertas_inconsistentes_actividades_vetadas
 from websecurityapp.views.oferta_views import CreacionOfertaView
-from websecurityapp.views.utils import get_ofertas_solicitables_y_ofertas_retirables, es_oferta_solicitable_o_retirable
+from websecurityapp.views.utils import get_ofertas_solicitables_y_ofertas_retirables, es_oferta_solicitable_o_retirable, \
+    get_ids_elegibilidad_ofertas
 from websecurityapp.test_unit.utils import test_listado, numero_paginas, paginar_lista
 from websecurityserver.settings import numero_objetos_por_pagina
 
@@ -21,6 +31,7 @@ class OfertaTestCase(TestCase):
         self.factory = RequestFactory()
         self.client = Client()
         exec(open('populate_database.py').read())
+        cache.clear()
 
     # Método que simula un login
     def login(self, username, password):
@@ -168,6 +179,40 @@ class OfertaTestCase(TestCase):
         # El usuario se desloguea
         self.logout()
 
+    # Comprueba oferta a oferta si es solicitable o retirable por el usuario, recorriendo sus actividades requeridas
+    def elegibilidad_esperada(self, usuario, oferta):
+        es_solicitada = Solicitud.objects.filter(usuario=usuario, oferta=oferta).exists()
+        retirable = False
+        solicitable = False
+        if es_solicitada:
+            if not oferta.vetada and not oferta.cerrada:
+                retirable = True
+        elif not oferta.cerrada and not oferta.vetada and not oferta.borrador:
+            solicitable = True
+            actividades_realizadas = frozenset(usuario.actividades_realizadas.all())
+            for actividad_requerida in oferta.actividades.all():
+                if not actividad_requerida in actividades_realizadas or usuario == oferta.autor \
+                        or actividad_requerida.vetada:
+                    solicitable = False
+                    break
+        return [solicitable, retirable]
+
+    # Se calculan las ofertas solicitables, retirables y con actividades vetadas de todas las ofertas en una consulta
+    def test_elegibilidad_ofertas(self):
+        ofertas = Oferta.objects.all().order_by('id')
+        for usuario in Usuario.objects.all():
+            # Se calcula la elegibilidad de todas las ofertas para el usuario, comprobando el número de consultas
+            with self.assertNumQueries(1):
+                [ids_solicitables, ids_retirables, ids_actividades_vetadas] = get_ids_elegibilidad_ofertas(usuario,
+                    ofertas)
+            # Se comprueba que el resultado coincide con el de la comprobación oferta a oferta
+            for oferta in ofertas:
+                [es_solicitable, es_retirable] = self.elegibilidad_esperada(usuario, oferta)
+                self.assertEqual([es_solicitable, es_retirable], es_oferta_solicitable_o_retirable(usuario, oferta))
+                self.assertEqual(es_solicitable, oferta.id in ids_solicitables)
+                self.assertEqual(es_retirable, oferta.id in ids_retirables)
+                self.assertEqual(oferta.actividades.filter(vetada=True).exists(), oferta.id in ids_actividades_vetadas)
+
 
 
     # DETALLES
@@ -215,6 +260,33 @@ class OfertaTestCase(TestCase):
         # El usuario se desloguea
         self.logout()
 
+    # El número de consultas de los detalles de una oferta no depende del número de solicitantes ni de actividades
+    # requeridas
+    def test_detalles_oferta_consultas(self):
+        oferta = Oferta.objects.filter(borrador = False).exclude(solicitudes = None).first()
+        autor = oferta.autor
+        self.login(autor.django_user.username, autor.django_user.username)
+        url = '/oferta/detalles/{}/'.format(oferta.id)
+        # Sesión, usuario de Django, usuario, oferta, elegibilidad, y recuento y página de actividades y de solicitantes.
+        # El recuento de las actividades, paginadas por cursor, se guarda en la caché, por lo que se vacía antes
+        cache.clear()
+        with self.assertNumQueries(9):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # Se añaden solicitantes y actividades requeridas y se comprueba que el número de consultas no cambia
+        for i in range(2 * numero_objetos_por_pagina):
+            django_user = User.objects.create_user('solicitante{}'.format(i), 'solicitante{}@gmail.com'.format(i),
+                'solicitante{}'.format(i))
+            solicitante = Usuario.objects.create(django_user = django_user, vetado = False, es_admin = False)
+            Solicitud.objects.create(usuario = solicitante, oferta = oferta)
+        oferta.actividades.add(*Actividad.objects.filter(borrador = False, vetada = False))
+        cache.clear()
+        with self.assertNumQueries(9):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['page_obj_usuarios']), numero_objetos_por_pagina)
+        self.assertEqual(len(response.context['page_obj_actividades']), numero_objetos_por_pagina)
+        self.logout()
+
     # Un usuario accede a los detalles de una oferta que no existe
     def test_detalles_oferta_no_existe(self):
         # Se inicializan variables y se loguea el usuario
@@ -1190,6 +1262,18 @@ class OfertaTestCase(TestCase):
         # El usuario se desloguea
         self.logout()
 
+    # Al cerrar una oferta se incrementa su versión, por lo que el listado deja de mostrar su fila cacheada
+    def test_cierra_oferta_listado_cacheado(self):
+        usuario = self.login('usuario1', 'usuario1')
+        ofertas = list(Oferta.objects.filter(autor=usuario).order_by('id'))
+        oferta = next(oferta for oferta in ofertas if not oferta.cerrada and not oferta.borrador and not oferta.vetada)
+        url = '{}?page={}'.format(reverse('oferta_listado_propio'), ofertas.index(oferta) // numero_objetos_por_pagina + 1)
+        self.assertContains(self.client.get(url), 'id="button_cerrar_{}"'.format(oferta.id))
+        self.client.get('/oferta/cierre/{}/'.format(oferta.id))
+        self.assertEqual(Oferta.objects.get(pk=oferta.id).version, oferta.version + 1)
+        self.assertNotContains(self.client.get(url), 'id="button_cerrar_{}"'.format(oferta.id))
+        self.logout()
+
 
 
     # SOLICITUD
@@ -1212,7 +1296,7 @@ class OfertaTestCase(TestCase):
         for oferta_for in list(Oferta.objects.filter(borrador=False, vetada=False, cerrada=False)):
             ofertas_posibles.append(oferta_for)
         # Se agrupan las actividades realizadas por el usuario, para luego comprobar que se cumplen los requisitos
-        actividades_realizadas = Usuario.objects.get(pk=usuario.id).actividades_realizadas.all()
+        actividades_realizadas = frozenset(Usuario.objects.get(pk=usuario.id).actividades_realizadas.all())
         # Se comprueba que no se ha solicitado antes la oferta y que se han realizado las actividades necesarias
         oferta = None
         # Se evalua cada oferta marcada como posible para evaluar si se cumplen sus requisitos
@@ -1265,7 +1349,7 @@ class OfertaTestCase(TestCase):
         for oferta in list(Oferta.objects.filter(borrador=False, vetada=False, cerrada=False)):
             ofertas_posibles.append(oferta)
         # Se agrupan las actividades realizadas por el usuario, para luego comprobar que se cumplen los requisitos
-        actividades_realizadas = Usuario.objects.get(pk=usuario.id).actividades_realizadas.all()
+        actividades_realizadas = frozenset(Usuario.objects.get(pk=usuario.id).actividades_realizadas.all())
         # Se comprueba que no se ha solicitado antes la oferta y que se han realizado las actividades necesarias
         oferta = None
         # Se evalua cada oferta marcada como posible para evaluar si se cumplen sus requisitos
@@ -1317,7 +1401,7 @@ class OfertaTestCase(TestCase):
         for oferta in list(Oferta.objects.filter(borrador=True, vetada=False, cerrada=False)):
             ofertas_posibles.append(oferta)
         # Se agrupan las actividades realizadas por el usuario, para luego comprobar que se cumplen los requisitos
-        actividades_realizadas = Usuario.objects.get(pk=usuario.id).actividades_realizadas.all()
+        actividades_realizadas = frozenset(Usuario.objects.get(pk=usuario.id).actividades_realizadas.all())
         # Se comprueba que no se ha solicitado antes la oferta y que se han realizado las actividades necesarias
         oferta = None
         for oferta_posible in ofertas_posibles:
@@ -1369,7 +1453,7 @@ class OfertaTestCase(TestCase):
         for oferta in list(Oferta.objects.filter(borrador=False, vetada=False, cerrada=True)):
             ofertas_posibles.append(oferta)
         # Se agrupan las actividades realizadas por el usuario, para luego comprobar que se cumplen los requisitos
-        actividades_realizadas = Usuario.objects.get(pk=usuario.id).actividades_realizadas.all()
+        actividades_realizadas = frozenset(Usuario.objects.get(pk=usuario.id).actividades_realizadas.all())
         # Se comprueba que no se ha solicitado antes la oferta y que se han realizado las actividades necesarias
         oferta = None
         for oferta_posible in ofertas_posibles:
@@ -1418,7 +1502,7 @@ class OfertaTestCase(TestCase):
         for oferta in list(Oferta.objects.filter(borrador=False, vetada=True, cerrada=False)):
             ofertas_posibles.append(oferta)
         # Se obtienen las actividades realizadas por el usuario para comparar los requistos más tarde
-        actividades_realizadas = Usuario.objects.get(pk=usuario.id).actividades_realizadas.all()
+        actividades_realizadas = frozenset(Usuario.objects.get(pk=usuario.id).actividades_realizadas.all())
         # Se comprueba que no se ha solicitado antes la oferta y que se han realizado las actividades necesarias
         oferta = None
         for oferta_posible in ofertas_posibles:
@@ -1471,7 +1555,7 @@ class OfertaTestCase(TestCase):
         for oferta_for in list(Oferta.objects.filter(borrador=False, vetada=False, cerrada=False, autor=usuario)):
             ofertas_posibles.append(oferta_for)
         # Se agrupan las actividades realizadas por el usuario, para luego comprobar que se cumplen los requisitos
-        actividades_realizadas = Usuario.objects.get(pk=usuario.id).actividades_realizadas.all()
+        actividades_realizadas = frozenset(Usuario.objects.get(pk=usuario.id).actividades_realizadas.all())
         # Se comprueba que no se ha solicitado antes la oferta y que se han realizado las actividades necesarias
         oferta = None
         # Se evalua cada oferta marcada como posible para evaluar si se cumplen sus requisitos
@@ -1695,3 +1779,92 @@ class OfertaTestCase(TestCase):
         self.logout()
 
 
+
+    # ACTIVIDADES VETADAS
+
+    # Se comprueba y se recalcula desde cero si las ofertas tienen actividades requeridas vetadas
+    def test_actualiza_ofertas_actividades_vetadas(self):
+        # Tras cargar los datos, todas las ofertas son consistentes
+        call_command('actualiza_ofertas_actividades_vetadas', '--comprueba', stdout=StringIO())
+        # Se altera el valor almacenado en una oferta y se comprueba que se detecta la inconsistencia
+        oferta = Oferta.objects.filter(tiene_actividades_vetadas=False).first()
+        Oferta.objects.filter(pk=oferta.pk).update(tiene_actividades_vetadas=True)
+        with self.assertRaises(CommandError):
+            call_command('actualiza_ofertas_actividades_vetadas', '--comprueba', stdout=StringIO())
+        # Se recalculan los valores y se comprueba que vuelven a ser consistentes
+        call_command('actualiza_ofertas_actividades_vetadas', stdout=StringIO())
+        call_command('actualiza_ofertas_actividades_vetadas', '--comprueba', stdout=StringIO())
+        self.assertFalse(Oferta.objects.get(pk=oferta.pk).tiene_actividades_vetadas)
+
+
+
+    # EXPORTACIÓN
+
+    # Los usuarios exportan las mismas ofertas que pueden ver en el listado, con sus actividades requeridas
+    def test_exporta_ofertas(self):
+        for username in ['usuario1', 'usuario2', 'usuario3']:
+            usuario = self.login(username, username)
+            ofertas_esperadas = list(get_ofertas_visibles(usuario))
+            response = self.client.get('/oferta/exportacion/jsonl/')
+            self.assertEqual(response.status_code, 200)
+            filas = [json.loads(linea) for linea in b''.join(response.streaming_content).decode().splitlines()]
+            self.assertEqual([fila['id'] for fila in filas], [oferta.id for oferta in ofertas_esperadas])
+            for (fila, oferta) in zip(filas, ofertas_esperadas):
+                self.assertEqual(fila['identificador'], oferta.identificador)
+                self.assertEqual(fila['actividades'],
+                    [actividad.identificador for actividad in oferta.actividades.order_by('id')])
+            self.logout()
+
+    # Un usuario exporta sus solicitudes, desde la vista y desde el comando
+    def test_exporta_solicitudes(self):
+        usuario = self.login('usuario1', 'usuario1')
+        solicitudes_esperadas = list(Solicitud.objects.filter(usuario = usuario).order_by('id'))
+        self.assertTrue(solicitudes_esperadas)
+        response = self.client.get('/oferta/exportacion_solicitud/csv/')
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lineas[0], 'id,oferta.identificador,oferta.titulo,usuario,usuario.first_name,usuario.last_name')
+        self.assertEqual(len(lineas), len(solicitudes_esperadas) + 1)
+        self.logout()
+        # El comando exporta los mismos datos que la vista
+        salida = StringIO()
+        call_command('exporta_datos', 'solicitudes', '--usuario', 'usuario1', stdout = salida)
+        self.assertEqual(salida.getvalue().splitlines(), lineas)
+        with self.assertRaises(CommandError):
+            call_command('exporta_datos', 'solicitudes', '--usuario', 'inexistente', stdout = StringIO())
+
+
+
+    # IMPORTACIÓN
+
+    # Se importan ofertas desde un fichero JSONL con el comando, resolviendo las actividades por su identificador
+    def test_importa_ofertas(self):
+        usuario = Usuario.objects.get(django_user__username = 'usuario1')
+        validas = list(Actividad.objects.filter(borrador = False, vetada = False).order_by('id')[:2])
+        vetada = Actividad.objects.filter(vetada = True).first()
+        filas = [
+            {'titulo': 'Importada 1', 'descripcion': 'Descripción', 'actividades': [validas[0].identificador]},
+            {'titulo': 'Importada 2', 'descripcion': 'Descripción', 'borrador': False,
+                'actividades': [actividad.identificador for actividad in validas]},
+            {'titulo': 'Vetada', 'descripcion': 'Descripción', 'actividades': [vetada.identificador]},
+            {'titulo': 'Inexistente', 'descripcion': 'Descripción', 'actividades': ['ACT-inexistente']},
+            {'titulo': 'Sin actividades', 'descripcion': 'Descripción', 'actividades': []},
+        ]
+        lineas = [json.dumps(fila) for fila in filas] + ['{no es json']
+        with tempfile.NamedTemporaryFile('w', suffix = '.jsonl', delete = False) as fichero:
+            fichero.write('\n'.join(lineas))
+        try:
+            salida = StringIO()
+            call_command('importa_datos', 'ofertas', fichero.name, '--usuario', 'usuario1', '--bloque', 2,
+                stdout = salida)
+        finally:
+            os.remove(fichero.name)
+        # Solo se importan las dos primeras filas, y se informa del error de cada una de las demás
+        errores = [linea for linea in salida.getvalue().splitlines() if linea.startswith('Fila ')]
+        self.assertEqual([error.split(':')[0] for error in errores], ['Fila 3', 'Fila 4', 'Fila 5', 'Fila 6'])
+        self.assertIn(vetada.identificador, errores[0])
+        ofertas = list(Oferta.objects.filter(autor = usuario, titulo__startswith = 'Importada ').order_by('id'))
+        self.assertEqual(len(ofertas), 2)
+        # Las ofertas se importan en modo borrador aunque la fila indique lo contrario
+        self.assertTrue(all(oferta.borrador for oferta in ofertas))
+        self.assertEqual(list(ofertas[1].actividades.order_by('id')), validas)
+        self.assertFalse(get_ofertas_inconsistentes_actividades_vetadas().exists())
@@ -2,11 +2,13 @@ from django.test import TestCase, RequestFactory, Client
 from django.urls import reverse
 from django.db.models import Q
 from django.core.exceptions import ObjectDoesNotExist
+from django.core.cache import cache
 
 from datetime import date
 import re
 
 from websecurityapp.models.perfil_models import Usuario, Anexo
+from websecurityapp.services.perfil_services import get_usuario, edita_perfil
 from websecurityapp.test_unit.utils import test_listado
 
 class PerfilTestCase(TestCase):
@@ -15,6 +17,7 @@ class PerfilTestCase(TestCase):
         self.factory = RequestFactory()
         self.client = Client()
         exec(open('populate_database.py').read())
+        cache.clear()
 
     # Método que simula un login
     def login(self, username, password):
@@ -94,6 +97,23 @@ class PerfilTestCase(TestCase):
         # El usuario se desloguea
         self.logout()
 
+    # El usuario autenticado se obtiene una única vez por petición y se reutiliza en el resto de la petición
+    def test_usuario_peticion(self):
+        # El usuario se loguea y se inicializan las variables
+        username = 'usuario1'
+        password = 'usuario1'
+        usuario_esperado = self.login(username, password)
+        # Se accede al perfil del usuario
+        response = self.client.get(reverse('perfil_detalles'))
+        request = response.wsgi_request
+        # Se comprueba que el usuario de la petición es el usuario autenticado y que no se vuelve a consultar
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_usuario(request), usuario_esperado)
+            self.assertEqual(get_usuario(request).django_user.username, username)
+        # El usuario se desloguea
+        self.logout()
+
 
 
     # EDICIÓN
@@ -144,6 +164,18 @@ class PerfilTestCase(TestCase):
         # El usuario se vuelve a desloguear
         self.logout()
 
+    # Al editar el perfil se incrementa la versión del usuario, que queda guardada en el objeto como un número, por lo que
+    # al volver a guardarlo no se vuelve a incrementar
+    def test_editar_mi_perfil_version(self):
+        usuario = Usuario.objects.get(django_user__username = 'usuario1')
+        version = usuario.version
+        edita_perfil({'nombre_usuario': 'usuario1', 'contrasenna': 'usuario1', 'nombre': 'nombre',
+            'apellidos': 'apellidos', 'email': 'email@gmail.com', 'telefono': '123456789',
+            'empresa_u_equipo': 'la empresa 1'}, usuario)
+        self.assertEqual(usuario.version, version + 1)
+        usuario.save()
+        self.assertEqual(Usuario.objects.get(pk = usuario.pk).version, version + 1)
+
     # Un usuario edita su perfil sin estar autenticado
     def test_editar_mi_perfil_sin_autenticar(self):
         # Se inicializan las variables
@@ -0,0 +1,50 @@
+from django.test import TestCase, override_settings
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.template import engines
+from django.urls import reverse
+
+from copy import deepcopy
+
+from websecurityapp.services.dataset_services import genera_dataset
+from websecurityapp.services.plantillas_services import precompila_plantillas
+from websecurityserver.settings.base import cargadores_plantillas, cargadores_plantillas_cacheados
+
+# Configuración de las plantillas con los cargadores dados
+def configura_plantillas(cargadores):
+    plantillas = deepcopy(settings.TEMPLATES)
+    plantillas[0]['OPTIONS']['loaders'] = cargadores
+    return plantillas
+
+class PlantillasTestCase(TestCase):
+
+    # Solo se necesitan unos pocos usuarios, actividades y ofertas para que los listados tengan filas
+    def setUp(self):
+        genera_dataset(3, 10, 5, 0, prefijo = 'plantillas')
+
+
+
+    # PRECOMPILACIÓN
+
+    # Con el cargador con caché se compilan la página maestra, los bloques y los listados, y los listados se muestran
+    # igual que sin caché
+    @override_settings(TEMPLATES = configura_plantillas(cargadores_plantillas_cacheados))
+    def test_precompila_plantillas(self):
+        nombres = precompila_plantillas()
+        for nombre in ['master_page/master_page.html', 'blocks/pagination.html', 'actividad/listado_actividades.html',
+                'oferta/listado_ofertas.html']:
+            self.assertIn(nombre, nombres)
+        cargador = engines['django'].engine.template_loaders[0]
+        self.assertTrue(set(nombres) <= set(cargador.get_template_cache))
+        self.client.force_login(User.objects.get(username = 'plantillas_0'))
+        for url in [reverse('oferta_listado'), reverse('actividad_listado')]:
+            cache.clear()
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTemplateUsed(response, 'master_page/master_page.html')
+
+    # Sin el cargador con caché no se compila ninguna plantilla al arrancar
+    @override_settings(TEMPLATES = configura_plantillas(cargadores_plantillas))
+    def test_precompila_plantillas_sin_cache(self):
+        self.assertEqual(precompila_plantillas(), [])
@@ -1,13 +1,28 @@
-from django.test import TestCase, RequestFactory, Client
+from django.test import TestCase, TransactionTestCase, RequestFactory, Client
+from django.db import connection, transaction, IntegrityError
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.db.models import Q
 from django.core.exceptions import ObjectDoesNotExist
+from django.middleware.csrf import _get_new_csrf_token
+from django.core.management import call_command
+from django.utils import timezone
 
-from datetime import date
+from datetime import date, timedelta
+from io import StringIO
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from unittest import mock
+import json
 import re
+import threading
+import time
+import unittest
 
 from websecurityapp.models.perfil_models import Usuario
 from websecurityapp.models.actividad_models import Actividad, SesionActividad
+from websecurityapp.services.sesionactividad_services import añade_actividad_realizada, crea_sesionactividad, \
+    elimina_sesionactividad, elimina_sesionesactividad_expiradas, get_distribucion_edad_sesionesactividad
 
 
 class PerfilTestCase(TestCase):
@@ -177,3 +192,336 @@ class PerfilTestCase(TestCase):
 
     # Se elimina una sesion de una actividad que el usuario ya ha realizado previamente
 
+
+
+    # ALMACENES DE SESIONES
+
+    # Crea una petición del usuario con los datos dados
+    def peticion(self, usuario, datos = None):
+        request = self.factory.post('/')
+        request.user = usuario.django_user
+        request.data = datos or {}
+        return request
+
+    # Los tokens son aleatorios y comenzar de nuevo una actividad sustituye el token de la sesión abierta, sin añadir
+    # otra fila, por lo que el token anterior deja de ser válido
+    def test_crea_sesionactividad_token_aleatorio(self):
+        usuario = Usuario.objects.get(django_user__username = 'usuario2')
+        actividad = Actividad.objects.get(enlace = 'http://localhost:8000' + reverse('ejercicio_mock_1'))
+        numero_sesionactividad_antes = SesionActividad.objects.count()
+        token_1 = crea_sesionactividad(self.peticion(usuario), actividad)
+        token_2 = crea_sesionactividad(self.peticion(usuario), actividad)
+        self.assertNotEqual(token_1, token_2)
+        self.assertGreaterEqual(len(token_1), 40)
+        self.assertNotIn(usuario.django_user.username, token_1)
+        self.assertEqual(SesionActividad.objects.count(), numero_sesionactividad_antes)
+        self.assertEqual(SesionActividad.objects.get(usuario = usuario, actividad = actividad).token, token_2)
+        with self.assertRaises(SesionActividad.DoesNotExist):
+            elimina_sesionactividad(self.peticion(usuario, {'token': token_1}), actividad)
+        elimina_sesionactividad(self.peticion(usuario, {'token': token_2}), actividad)
+        self.assertFalse(SesionActividad.objects.filter(usuario = usuario, actividad = actividad).exists())
+
+    # No puede haber dos sesiones del mismo usuario en la misma actividad
+    def test_sesionactividad_unica(self):
+        sesionactividad = SesionActividad.objects.first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            SesionActividad.objects.create(usuario = sesionactividad.usuario, actividad = sesionactividad.actividad,
+                token = 'OTRO')
+
+    # Un usuario no puede terminar con su token la sesión de otro usuario
+    def test_elimina_sesionactividad_otro_usuario(self):
+        sesionactividad = SesionActividad.objects.get(usuario__django_user__username = 'usuario2')
+        usuario = Usuario.objects.get(django_user__username = 'usuario3')
+        with self.assertRaises(SesionActividad.DoesNotExist):
+            elimina_sesionactividad(self.peticion(usuario, {'token': sesionactividad.token}),
+                sesionactividad.actividad)
+        self.assertTrue(SesionActividad.objects.filter(pk = sesionactividad.pk).exists())
+
+    # Con el almacén en la caché, las sesiones se comienzan y terminan desde la API sin escribir en la tabla de sesiones
+    @mock.patch('websecurityapp.services.sesionactividad_services.almacen_sesionesactividad', 'cache')
+    def test_sesionactividad_cache(self):
+        usuario = self.login('usuario3', 'usuario3')
+        enlace = 'http://localhost:8000' + reverse('ejercicio_mock_2')
+        actividad = Actividad.objects.filter(enlace = enlace).exclude(autor = usuario).first()
+        numero_sesionactividad_antes = SesionActividad.objects.count()
+        response = self.client.get(reverse('sesionactividad_comienzo', kwargs = {'identificador': actividad.identificador}))
+        self.assertEquals(response.status_code, 200)
+        token = response.json()['token']
+        url_final = reverse('sesionactividad_final', kwargs = {'identificador': actividad.identificador})
+        response = self.client.post(url_final, {'token': token[::-1]}, content_type = 'application/json')
+        self.assertEquals(response.status_code, 500)
+        response = self.client.post(url_final, {'token': token}, content_type = 'application/json')
+        self.assertEquals(response.status_code, 201)
+        self.assertTrue(usuario.actividades_realizadas.filter(pk = actividad.pk).exists())
+        # El token no se puede usar de nuevo
+        response = self.client.post(url_final, {'token': token}, content_type = 'application/json')
+        self.assertEquals(response.status_code, 500)
+        self.assertEqual(SesionActividad.objects.count(), numero_sesionactividad_antes)
+        self.logout()
+
+    # Las sesiones guardadas en la caché expiran pasado su tiempo de vida
+    @mock.patch('websecurityapp.services.sesionactividad_services.almacen_sesionesactividad', 'cache')
+    @mock.patch('websecurityapp.services.sesionactividad_services.tiempo_sesionactividad', 60)
+    def test_sesionactividad_cache_expira(self):
+        usuario = Usuario.objects.get(django_user__username = 'usuario3')
+        actividad = Actividad.objects.filter(borrador = False).exclude(autor = usuario).first()
+        token = crea_sesionactividad(self.peticion(usuario), actividad)
+        with mock.patch('time.time', return_value = time.time() + 61):
+            with self.assertRaises(SesionActividad.DoesNotExist):
+                elimina_sesionactividad(self.peticion(usuario, {'token': token}), actividad)
+
+
+
+    # TERMINACIÓN DE VARIAS SESIONES
+
+    # Termina a la vez las sesiones dadas y devuelve la respuesta
+    def termina_varias(self, sesiones):
+        return self.client.post(reverse('sesionactividad_final_varias'), {'sesiones': sesiones},
+            content_type = 'application/json')
+
+    # Se terminan a la vez sesiones de varios usuarios y se devuelve el estado de cada una
+    def test_termina_sesionesactividad(self):
+        self.login('usuario3', 'usuario3')
+        sesionesactividad = list(SesionActividad.objects.select_related('actividad').order_by('id'))
+        sesiones = [{'identificador': sesionactividad.actividad.identificador, 'token': sesionactividad.token}
+            for sesionactividad in sesionesactividad]
+        otra_actividad = sesionesactividad[1].actividad.identificador
+        response = self.termina_varias(sesiones + [
+            {'identificador': otra_actividad, 'token': sesionesactividad[0].token},
+            {'identificador': 'INEXISTENTE', 'token': 'TOKEN'},
+            {'identificador': otra_actividad},
+            sesiones[0],
+        ])
+        self.assertEquals(response.status_code, 200)
+        self.assertEqual([resultado['status'] for resultado in response.json()['resultados']],
+            ['realizada'] * len(sesiones) + ['sesion_no_encontrada', 'actividad_no_encontrada', 'datos_no_validos',
+            'sesion_no_encontrada'])
+        self.assertEqual(response.json()['realizadas'], len(sesiones))
+        self.assertFalse(SesionActividad.objects.exists())
+        # Cada actividad queda realizada por el usuario de su sesión, no por el que hace la petición
+        for sesionactividad in sesionesactividad:
+            self.assertTrue(sesionactividad.usuario.actividades_realizadas.filter(pk = sesionactividad.actividad.pk)
+                .exists())
+        self.logout()
+
+    # El número de consultas no depende del número de sesiones terminadas
+    def test_termina_sesionesactividad_consultas(self):
+        usuario = self.login('usuario3', 'usuario3')
+        actividades = list(Actividad.objects.filter(borrador = False).order_by('id')[:6])
+        consultas = []
+        for actividades_peticion in [actividades[:1], actividades[1:]]:
+            sesiones = [{'identificador': actividad.identificador,
+                'token': crea_sesionactividad(self.peticion(usuario), actividad)} for actividad in actividades_peticion]
+            with CaptureQueriesContext(connection) as contexto:
+                response = self.termina_varias(sesiones)
+            self.assertEqual(response.json()['realizadas'], len(sesiones))
+            consultas.append(len(contexto.captured_queries))
+        self.assertEqual(consultas[0], consultas[1])
+        self.assertTrue(set(actividades) <= set(usuario.actividades_realizadas.all()))
+        self.logout()
+
+    # Un usuario no autenticado no puede terminar sesiones, ni se pueden enviar datos que no sean una lista de sesiones
+    def test_termina_sesionesactividad_no_valido(self):
+        sesionactividad = SesionActividad.objects.first()
+        sesiones = [{'identificador': sesionactividad.actividad.identificador, 'token': sesionactividad.token}]
+        self.assertEquals(self.termina_varias(sesiones).status_code, 500)
+        self.login('usuario3', 'usuario3')
+        self.assertEquals(self.termina_varias({'identificador': 'ACT-1'}).status_code, 500)
+        with mock.patch('websecurityapp.services.sesionactividad_services.numero_maximo_sesiones_terminadas', 0):
+            self.assertEquals(self.termina_varias(sesiones).status_code, 500)
+        self.assertTrue(SesionActividad.objects.filter(pk = sesionactividad.pk).exists())
+        self.logout()
+
+    # Con el almacén en la caché, también se terminan a la vez sesiones de varios usuarios
+    @mock.patch('websecurityapp.services.sesionactividad_services.almacen_sesionesactividad', 'cache')
+    def test_termina_sesionesactividad_cache(self):
+        actividad = Actividad.objects.filter(borrador = False).order_by('id').first()
+        usuarios = list(Usuario.objects.exclude(actividades_realizadas = actividad).order_by('id')[:2])
+        sesiones = [{'identificador': actividad.identificador,
+            'token': crea_sesionactividad(self.peticion(usuario), actividad)} for usuario in usuarios]
+        self.login('usuario3', 'usuario3')
+        response = self.termina_varias(sesiones + sesiones[:1])
+        self.assertEqual([resultado['status'] for resultado in response.json()['resultados']],
+            ['realizada'] * len(sesiones) + ['sesion_no_encontrada'])
+        for usuario in usuarios:
+            self.assertTrue(usuario.actividades_realizadas.filter(pk = actividad.pk).exists())
+        self.logout()
+
+
+
+    # EXPIRACIÓN DE SESIONES
+
+    # Hace que las sesiones dadas se hayan comenzado hace el número de segundos dado
+    def envejece(self, sesionesactividad, segundos):
+        SesionActividad.objects.filter(pk__in = [sesionactividad.pk for sesionactividad in sesionesactividad]) \
+            .update(fecha_creacion = timezone.now() - timedelta(seconds = segundos))
+
+    # No se puede terminar una sesión expirada
+    def test_elimina_sesionactividad_expirada(self):
+        sesionactividad = SesionActividad.objects.get(usuario__django_user__username = 'usuario2')
+        self.envejece([sesionactividad], 2 * 3600)
+        with self.assertRaises(SesionActividad.DoesNotExist):
+            elimina_sesionactividad(self.peticion(sesionactividad.usuario, {'token': sesionactividad.token}),
+                sesionactividad.actividad)
+
+    # Se eliminan en lotes solo las sesiones expiradas, con una consulta de borrado por lote
+    def test_elimina_sesionesactividad_expiradas(self):
+        sesionesactividad = list(SesionActividad.objects.order_by('id'))
+        self.envejece(sesionesactividad[:2], 2 * 3600)
+        self.envejece(sesionesactividad[2:], 600)
+        with CaptureQueriesContext(connection) as contexto:
+            eliminadas = elimina_sesionesactividad_expiradas(tiempo = 3600, tamaño_lote = 1)
+        self.assertEqual(eliminadas, 2)
+        self.assertEqual(len([consulta for consulta in contexto.captured_queries
+            if consulta['sql'].startswith('DELETE')]), 2)
+        self.assertEqual(list(SesionActividad.objects.order_by('id')), sesionesactividad[2:])
+        # Las sesiones que quedan están en el tramo de edad de 5 a 15 minutos
+        distribucion = get_distribucion_edad_sesionesactividad()
+        self.assertEqual([numero for (inicio, final, numero) in distribucion], [0, len(sesionesactividad) - 2, 0, 0, 0, 0])
+        self.assertEqual(distribucion[1][:2], (300, 900))
+        self.assertEqual(distribucion[-1][:2], (24 * 3600, None))
+
+    # El comando elimina las sesiones expiradas e informa de las eliminadas y de la edad de las que quedan
+    def test_comando_elimina_sesiones_expiradas(self):
+        sesionesactividad = list(SesionActividad.objects.order_by('id'))
+        self.envejece(sesionesactividad[:1], 3 * 24 * 3600)
+        salida = StringIO()
+        call_command('elimina_sesiones_expiradas', '--tiempo', 24 * 3600, '--lote', 10, stdout = salida)
+        self.assertIn('Se han eliminado 1 sesiones expiradas (comenzadas hace más de 1 d)', salida.getvalue())
+        self.assertIn('Quedan {} sesiones'.format(len(sesionesactividad) - 1), salida.getvalue())
+        self.assertIn('más de 1 d', salida.getvalue())
+        self.assertEqual(SesionActividad.objects.count(), len(sesionesactividad) - 1)
+
+
+
+    # ACTIVIDADES REALIZADAS
+
+    # Se registra una actividad realizada con una única inserción en la tabla intermedia, sin consultar el resto de
+    # actividades realizadas, y registrarla de nuevo no duplica la fila
+    def test_añade_actividad_realizada(self):
+        usuario = Usuario.objects.get(django_user__username = 'usuario3')
+        actividad = Actividad.objects.filter(borrador = False).exclude(pk__in = usuario.actividades_realizadas.all()) \
+            .first()
+        request = self.factory.get('/')
+        request.user = usuario.django_user
+        request._usuario = usuario
+        for i in range(2):
+            with CaptureQueriesContext(connection) as contexto:
+                añade_actividad_realizada(request, actividad)
+            # Las consultas de los savepoints son las de la transacción del servicio
+            consultas = [consulta['sql'] for consulta in contexto.captured_queries if 'SAVEPOINT' not in consulta['sql']]
+            self.assertEqual(len(consultas), 1)
+            self.assertTrue(consultas[0].startswith('INSERT'))
+        self.assertEqual(Usuario.actividades_realizadas.through.objects.filter(usuario = usuario,
+            actividad = actividad).count(), 1)
+
+
+
+class ActividadRealizadaConcurrenciaTestCase(TransactionTestCase):
+
+    def setUp(self):
+        exec(open('populate_database.py').read())
+
+    # Varias peticiones registran a la vez actividades realizadas por el mismo usuario, repitiendo algunas de ellas. No
+    # se produce ningún error, cada actividad queda registrada una única vez y se conservan las que ya estaban
+    @unittest.skipIf(connection.vendor == 'sqlite', 'La base de datos de pruebas de SQLite en memoria bloquea las '
+        'escrituras concurrentes')
+    def test_añade_actividad_realizada_concurrente(self):
+        usuario = Usuario.objects.get(django_user__username = 'usuario3')
+        realizadas_antes = set(usuario.actividades_realizadas.all())
+        actividades = list(Actividad.objects.filter(borrador = False).order_by('id')[:5])
+        n_hilos = 20
+        barrera = threading.Barrier(n_hilos)
+        errores = []
+
+        def completa(actividad):
+            request = RequestFactory().get('/')
+            request.user = usuario.django_user
+            try:
+                # Todos los hilos registran su actividad a la vez
+                barrera.wait()
+                añade_actividad_realizada(request, actividad)
+            except Exception as e:
+                errores.append(e)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target = completa, args = (actividades[i % len(actividades)],))
+            for i in range(n_hilos)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(errores, [])
+        filas = Usuario.actividades_realizadas.through.objects.filter(usuario = usuario)
+        self.assertEqual(filas.count(), filas.values('actividad').distinct().count())
+        self.assertEqual(set(usuario.actividades_realizadas.all()), realizadas_antes | set(actividades))
+
+
+
+class SesionActividadAsgiTestCase(TransactionTestCase):
+
+    def setUp(self):
+        exec(open('populate_database.py').read())
+        self.client = Client()
+
+    # Hace una petición a la aplicación ASGI con la sesión del cliente de pruebas y devuelve el código, el cuerpo y las
+    # cabeceras de la respuesta
+    def peticion_asgi(self, metodo, ruta, datos = None, csrf = True):
+        from websecurityserver.asgi import application
+        cuerpo = json.dumps(datos).encode() if datos is not None else b''
+        cookies = {nombre: cookie.value for (nombre, cookie) in self.client.cookies.items()}
+        cabeceras = [(b'host', b'testserver'), (b'content-type', b'application/json'),
+            (b'content-length', str(len(cuerpo)).encode())]
+        if csrf:
+            token_csrf = _get_new_csrf_token()
+            cookies['csrftoken'] = token_csrf
+            cabeceras.append((b'x-csrftoken', token_csrf.encode()))
+        cabeceras.append((b'cookie', '; '.join('{}={}'.format(nombre, valor) for (nombre, valor) in cookies.items())
+            .encode()))
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': metodo, 'path': ruta,
+            'raw_path': ruta.encode(), 'root_path': '', 'scheme': 'http', 'query_string': b'', 'headers': cabeceras,
+            'client': ('127.0.0.1', 10000), 'server': ('testserver', 80)}
+
+        async def comunica():
+            comunicador = ApplicationCommunicator(application, scope)
+            await comunicador.send_input({'type': 'http.request', 'body': cuerpo})
+            inicio = await comunicador.receive_output(10)
+            contenido = await comunicador.receive_output(10)
+            await comunicador.wait()
+            return (inicio['status'], contenido['body'], dict(inicio['headers']))
+
+        return async_to_sync(comunica)()
+
+    # Las vistas asíncronas comienzan y terminan una sesión como las síncronas
+    def test_sesionactividad_asgi(self):
+        self.client.login(username = 'usuario3', password = 'usuario3')
+        usuario = Usuario.objects.get(django_user__username = 'usuario3')
+        actividad = Actividad.objects.filter(borrador = False).exclude(autor = usuario) \
+            .exclude(pk__in = usuario.actividades_realizadas.all()).first()
+        (codigo, cuerpo, cabeceras) = self.peticion_asgi('GET', reverse('sesionactividad_comienzo',
+            kwargs = {'identificador': actividad.identificador}))
+        self.assertEqual(codigo, 200)
+        # La respuesta pasa por todas las middlewares, como en la aplicación de Django
+        self.assertEqual(cabeceras[b'X-Frame-Options'], b'DENY')
+        self.assertEqual(cabeceras[b'X-Content-Type-Options'], b'nosniff')
+        token = json.loads(cuerpo.decode())['token']
+        self.assertTrue(SesionActividad.objects.filter(usuario = usuario, actividad = actividad, token = token).exists())
+        url_final = reverse('sesionactividad_final', kwargs = {'identificador': actividad.identificador})
+        # Como en la vista síncrona, se comprueba el token CSRF de los usuarios autenticados
+        (codigo, cuerpo, cabeceras) = self.peticion_asgi('POST', url_final, {'token': token}, csrf = False)
+        self.assertEqual(codigo, 403)
+        (codigo, cuerpo, cabeceras) = self.peticion_asgi('POST', url_final, {'token': token})
+        self.assertEqual(codigo, 201)
+        self.assertFalse(SesionActividad.objects.filter(usuario = usuario, actividad = actividad).exists())
+        self.assertTrue(usuario.actividades_realizadas.filter(pk = actividad.pk).exists())
+
+    # Sin autenticar no se puede comenzar una sesión, y el resto de urls se atienden con la aplicación de Django
+    def test_sesionactividad_asgi_sin_autenticar(self):
+        actividad = Actividad.objects.filter(borrador = False).first()
+        (codigo, cuerpo, cabeceras) = self.peticion_asgi('GET', reverse('sesionactividad_comienzo',
+            kwargs = {'identificador': actividad.identificador}))
+        self.assertEqual(codigo, 500)
+        (codigo, cuerpo, cabeceras) = self.peticion_asgi('GET', '/login/')
+        self.assertEqual(codigo, 200)
+        self.assertIn(b'<form', cuerpo)
@@ -1,6 +1,7 @@
 from django.core.paginator import Page
 from django.db.models.query import QuerySet
 
+from websecurityapp.views.paginacion import PaginaCursor
 from websecurityserver.settings import numero_objetos_por_pagina
 
 # Comprueba los elementos del listado, pasando las páginas del listado
@@ -24,8 +25,10 @@ def comprueba_dato(test_case, dato_esperado, dato_recibido, **kwargs):
     # Usa un assert distinto en función del dato que recibe
     if isinstance(dato_esperado, QuerySet):
         test_case.assertListEqual(list(dato_recibido), list(dato_esperado))
+    elif isinstance(dato_esperado, (set, frozenset)):
+        test_case.assertSetEqual(set(dato_recibido), set(dato_esperado))
     elif isinstance(dato_esperado, list):
-        if isinstance(dato_recibido, Page):
+        if isinstance(dato_recibido, (Page, PaginaCursor)):
             test_case.assertListEqual(dato_recibido.object_list, dato_esperado)
         else:
             test_case.assertListEqual(dato_recibido, dato_esperado)
@@ -1,4 +1,3 @@
-from django.core.paginator import Paginator
 from django.shortcuts import render
 from django.http import HttpResponse, QueryDict, HttpResponseRedirect
 from django.views import View
@@ -12,10 +11,11 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from websecurityapp.exceptions import UnallowedUserException
 from websecurityapp.forms.actividad_forms import ActividadCreacionForm, ActividadEdicionForm, ActividadVetoForm
 from websecurityapp.models.actividad_models import Actividad
-from websecurityapp.models.perfil_models import Usuario
 from websecurityapp.services.actividad_services import crea_actividad, edita_actividad, elimina_actividad, veta_actividad, \
-        levanta_veto_actividad, actividad_formulario, listado_actividades, listado_actividades_propias
-from websecurityserver.settings import numero_objetos_por_pagina
+        levanta_veto_actividad, actividad_formulario, listado_actividades, listado_actividades_propias, \
+        get_ids_actividades_realizadas, marca_actividades_realizadas
+from websecurityapp.services.perfil_services import get_usuario
+from websecurityapp.views.paginacion import get_pagina
 
 
 class ListadoActividadesView(LoginRequiredMixin, View):
@@ -25,20 +25,19 @@ class ListadoActividadesView(LoginRequiredMixin, View):
         context = {}
         # Se consulta que usuario esta autenticado en este momento
         try:
-            usuario = Usuario.objects.get(django_user_id = request.user.id)
+            usuario = get_usuario(request)
         except ObjectDoesNotExist:
             usuario = None
         # Se obtiene el listado de actividades y se pagina
         actividades = listado_actividades(request)
-        paginator = Paginator(actividades, numero_objetos_por_pagina)
-        page_number = request.GET.get('page')
-        page_obj_actividades = paginator.get_page(page_number)
+        page_obj_actividades = get_pagina(request, actividades, 'page')
         # Se añaden al contexto las actividades y el usuario y se muestra el listado
         context.update({
             'page_obj_actividades': page_obj_actividades,
             'usuario': usuario,
-            # Se incluyen las actividades realizadas por el usuario, para poder marcarlas al mostrar el listado
-            'actividades_realizadas': usuario.actividades_realizadas.all(),
+            # Se marcan las actividades de la página realizadas por el usuario, para poder resaltarlas al mostrar el
+            # listado, y se incluyen sus ids
+            'ids_actividades_realizadas': marca_actividades_realizadas(usuario, page_obj_actividades),
             'titulo_pagina': 'Listado de actividades',
         })
         return render(request, self.template_name, context)
@@ -50,14 +49,12 @@ class ListadoActividadesPropiasView(LoginRequiredMixin, View):
         context = {}
         # Se consulta que usuario esta autenticado en este momento
         try:
-            usuario = Usuario.objects.get(django_user_id = request.user.id)
+            usuario = get_usuario(request)
         except ObjectDoesNotExist:
             usuario = None
         # Se obtiene el listado de actividades propias y se pagina
         actividades = listado_actividades_propias(request)
-        paginator = Paginator(actividades, numero_objetos_por_pagina)
-        page_number = request.GET.get('page')
-        page_obj_actvidades = paginator.get_page(page_number)
+        page_obj_actvidades = get_pagina(request, actividades, 'page')
         # Se añaden al contexto las actividades y el usuario y se muestra el listado
         context.update({
             'page_obj_actividades': page_obj_actvidades,
@@ -93,7 +90,7 @@ class CreacionActividadesView(LoginRequiredMixin, View):
             form.clean()
             form_data = form.cleaned_data
             # Se inserta el campo autor en el diccionario que representa el formulario
-            autor = Usuario.objects.get(django_user_id = request.user.id)
+            autor = get_usuario(request)
             form_data.update({'autor': autor})
             # Se intenta crear la actividad
             try:
@@ -274,7 +271,7 @@ class DetallesActividadesView(LoginRequiredMixin, View):
         context = {}
         # Se obtiene el usuario autenticado
         try:
-            usuario = Usuario.objects.get(django_user_id = request.user.id)
+            usuario = get_usuario(request)
         except ObjectDoesNotExist as e:
             usuario = None
         # Se busca la actividad
@@ -289,9 +286,7 @@ class DetallesActividadesView(LoginRequiredMixin, View):
             messages.error(request, 'No se tienen los permisos necesarios para acceder a la actividad')
             return HttpResponseRedirect(reverse('actividad_listado'))
         # Se mira si el usuario ha realizado la actividad, para indicarselo en la vista
-        actividad_realizada = False
-        if actividad in usuario.actividades_realizadas.all():
-            actividad_realizada = True
+        actividad_realizada = actividad.id in get_ids_actividades_realizadas(usuario, [actividad])
         # Se añaden al contexto la actividad y el usuario
         context.update({
             'actividad': actividad,
@@ -314,7 +309,7 @@ class VetoActividadesView(LoginRequiredMixin, View):
         except ObjectDoesNotExist as e:
             return actividad_no_hallada(request)
         # Si el usuario no es un administrador, entonces se le redirige a los detalles de la actividad
-        usuario = Usuario.objects.get(django_user=self.request.user)
+        usuario = get_usuario(self.request)
         if not usuario.es_admin:
             messages.error(request, 'No se poseen los permisos necesarios para vetar la actividad')
             return HttpResponseRedirect(reverse('actividad_detalles', kwargs = {'actividad_id': actividad_id}))
@@ -348,7 +343,7 @@ class VetoActividadesView(LoginRequiredMixin, View):
         except ObjectDoesNotExist as e:
             return actividad_no_hallada(request)
         # Si el usuario no es un administrador, entonces se le redirige a los detalles de la actividad
-        usuario = Usuario.objects.get(django_user=self.request.user)
+        usuario = get_usuario(self.request)
         if not usuario.es_admin:
             messages.error(request, 'No se poseen los permisos necesarios para vetar la actividad')
             return HttpResponseRedirect(reverse('actividad_detalles', kwargs={'actividad_id': actividad_id}))
@@ -414,7 +409,7 @@ class LevantamientoVetoActividadesView(LoginRequiredMixin, View):
     def test_func(self):
         if not self.request.user.is_authenticated:
             return False
-        usuario = Usuario.objects.get(django_user = self.request.user)
+        usuario = get_usuario(self.request)
         return usuario.es_admin
 
     def get(self, request, actividad_id):
@@ -426,7 +421,7 @@ class LevantamientoVetoActividadesView(LoginRequiredMixin, View):
         except ObjectDoesNotExist as e:
             return actividad_no_hallada(request)
         # Si el usuario no es un administrador, entonces se le redirige a los detalles de la actividad
-        usuario = Usuario.objects.get(django_user=self.request.user)
+        usuario = get_usuario(self.request)
         if not usuario.es_admin:
             messages.error(request, 'No se poseen los permisos necesarios para levantar el veto sobre la actividad')
             return HttpResponseRedirect(reverse('actividad_detalles', kwargs={'actividad_id': actividad_id}))
@@ -456,8 +451,4 @@ class LevantamientoVetoActividadesView(LoginRequiredMixin, View):
 
 def actividad_no_hallada(request):
     messages.error(request, 'No se ha encontrado la actividad')
-    try:
-        usuario = Usuario.objects.get(django_user_id = request.user.id)
-    except ObjectDoesNotExist:
-        usuario = None
     return HttpResponseRedirect(reverse('actividad_listado'))
\ No newline at end of file
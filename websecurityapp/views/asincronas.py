@@ -0,0 +1,67 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import RequestAborted
+from django.core.handlers.base import BaseHandler
+from django.db import close_old_connections
+from django.urls import resolve, Resolver404, set_script_prefix
+
+# Urls de las sesiones de actividad, que son las que más peticiones concurrentes reciben de los ejercicios. Al desplegar
+# con ASGI se atienden en paralelo en los hilos del pool, con sus vistas síncronas y todas las middlewares
+urls_asincronas = [
+    'sesionactividad_comienzo',
+    'sesionactividad_final',
+    'sesionactividad_final_varias',
+]
+
+
+# Manejador de Django que atiende cada petición en un hilo del pool, pasando por todas las middlewares de
+# settings.MIDDLEWARE igual que la aplicación de Django. Esta versión de Django no admite vistas asíncronas ni consultas
+# asíncronas, por lo que la vista se sigue ejecutando en un hilo, pero el servidor no ocupa ningún hilo mientras recibe
+# la petición o envía la respuesta. La aplicación ASGI de Django ejecuta todas las vistas síncronas en un único hilo
+# compartido, mientras que este manejador las ejecuta en paralelo. Al empezar y al terminar cada petición se cierran las
+# conexiones del hilo, como en la aplicación de Django
+class ManejadorHilos(BaseHandler):
+
+    def __init__(self):
+        super().__init__()
+        self.load_middleware()
+        self.atiende = sync_to_async(self.atiende_en_hilo, thread_sensitive = False)
+
+    def atiende_en_hilo(self, request):
+        close_old_connections()
+        try:
+            return self.get_response(request)
+        finally:
+            close_old_connections()
+
+
+# Aplicación ASGI que atiende en paralelo con un ManejadorHilos las urls con los nombres dados, y las demás peticiones con
+# la aplicación ASGI de Django
+class EnrutadorAsgi:
+
+    def __init__(self, aplicacion, nombres_urls):
+        self.aplicacion = aplicacion
+        self.nombres_urls = set(nombres_urls)
+        self.manejador = ManejadorHilos()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            try:
+                ruta = resolve(scope['path'][len(scope.get('root_path', '')):])
+            except Resolver404:
+                ruta = None
+            if ruta is not None and ruta.url_name in self.nombres_urls:
+                await self.atiende(scope, receive, send)
+                return
+        await self.aplicacion(scope, receive, send)
+
+    # Atiende una petición con el manejador, leyendo la petición y enviando la respuesta como la aplicación de Django
+    async def atiende(self, scope, receive, send):
+        set_script_prefix(self.aplicacion.get_script_prefix(scope))
+        try:
+            body_file = await self.aplicacion.read_body(receive)
+        except RequestAborted:
+            return
+        (request, response) = self.aplicacion.create_request(scope, body_file)
+        if request is not None:
+            response = await self.manejador.atiende(request)
+        await self.aplicacion.send_response(response, send)
@@ -0,0 +1,20 @@
+from django.http import JsonResponse
+from django.views import View
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+
+from websecurityapp.services.cache_services import get_metricas_fragmentos
+from websecurityapp.services.perfil_services import get_usuario
+
+
+class MetricasCacheView(LoginRequiredMixin, UserPassesTestMixin, View):
+
+    # Solo los administradores pueden consultar las métricas
+    def test_func(self):
+        if not self.request.user.is_authenticated:
+            return False
+        usuario = get_usuario(self.request)
+        return usuario.es_admin
+
+    # Devuelve los aciertos, los fallos y la tasa de aciertos de la caché de fragmentos de plantilla de este proceso
+    def get(self, request):
+        return JsonResponse(get_metricas_fragmentos())
@@ -0,0 +1,23 @@
+from django.http import Http404, StreamingHttpResponse
+from django.views import View
+from django.contrib.auth.mixins import LoginRequiredMixin
+
+from websecurityapp.services.exportacion_services import exportaciones, formatos_exportacion, formatea_exportacion
+from websecurityapp.services.perfil_services import get_usuario
+
+
+class ExportacionView(LoginRequiredMixin, View):
+    # Entidad que se exporta, que se indica al registrar la vista en las urls
+    entidad = None
+
+    def get(self, request, formato):
+        if formato not in formatos_exportacion:
+            raise Http404('Formato de exportación no válido')
+        usuario = get_usuario(request)
+        # Las filas se obtienen de la base de datos por bloques a medida que se envía la respuesta, por lo que la memoria
+        # usada no depende del número de filas exportadas
+        nombres, filas = exportaciones[self.entidad](usuario)
+        response = StreamingHttpResponse(formatea_exportacion(formato, nombres, filas),
+            content_type=formatos_exportacion[formato])
+        response['Content-Disposition'] = 'attachment; filename="{}.{}"'.format(self.entidad, formato)
+        return response
@@ -0,0 +1,24 @@
+from django.http import Http404, JsonResponse
+from django.views import View
+from django.contrib.auth.mixins import LoginRequiredMixin
+
+from websecurityapp.services.importacion_services import importaciones, formatos_importacion, lee_filas_fichero_subido
+from websecurityapp.services.perfil_services import get_usuario
+
+
+class ImportacionView(LoginRequiredMixin, View):
+    # Entidad que se importa, que se indica al registrar la vista en las urls
+    entidad = None
+
+    def post(self, request, formato):
+        if formato not in formatos_importacion:
+            raise Http404('Formato de importación no válido')
+        if 'fichero' not in request.FILES:
+            return JsonResponse({'error': 'Se debe adjuntar el fichero a importar'}, status=400)
+        usuario = get_usuario(request)
+        # Se importan las filas válidas y se devuelve el error de cada fila no válida
+        resultado = importaciones[self.entidad](usuario, lee_filas_fichero_subido(request.FILES['fichero'], formato))
+        return JsonResponse({
+            'importados': resultado['importados'],
+            'errores': [{'fila': numero, 'error': mensaje} for (numero, mensaje) in resultado['errores']],
+        })
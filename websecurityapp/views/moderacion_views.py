@@ -0,0 +1,73 @@
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.exceptions import ValidationError
+from django.http import HttpResponseRedirect
+from django.shortcuts import render
+from django.urls import reverse
+from django.views import View
+
+from websecurityapp.services.moderacion_services import veta_actividades, levanta_veto_actividades, veta_ofertas, \
+    levanta_veto_ofertas, cierra_ofertas, get_actividades_pendientes, get_ofertas_pendientes, \
+    get_ofertas_mas_solicitadas
+from websecurityapp.services.perfil_services import get_usuario
+from websecurityapp.views.paginacion import get_pagina
+
+# Acciones de moderación disponibles para cada entidad. Las acciones de veto reciben además el motivo de veto
+acciones_moderacion = {
+    'actividades': {
+        'veta': lambda request, ids, motivo_veto: veta_actividades(request, ids, motivo_veto),
+        'levanta_veto': lambda request, ids, motivo_veto: levanta_veto_actividades(request, ids),
+    },
+    'ofertas': {
+        'veta': lambda request, ids, motivo_veto: veta_ofertas(request, ids, motivo_veto),
+        'levanta_veto': lambda request, ids, motivo_veto: levanta_veto_ofertas(request, ids),
+        'cierra': lambda request, ids, motivo_veto: cierra_ofertas(request, ids),
+    },
+}
+
+
+class ColaModeracionView(LoginRequiredMixin, UserPassesTestMixin, View):
+    template_name = 'moderacion/cola_moderacion.html'
+
+    # Solo los administradores pueden acceder a la cola de moderación
+    def test_func(self):
+        if not self.request.user.is_authenticated:
+            return False
+        usuario = get_usuario(self.request)
+        return usuario.es_admin
+
+    def get(self, request):
+        context = {}
+        usuario = get_usuario(request)
+        # Las actividades y ofertas publicadas recientemente se paginan por cursor, cada listado con su parámetro
+        page_obj_actividades = get_pagina(request, get_actividades_pendientes(), 'page_actividades')
+        page_obj_ofertas = get_pagina(request, get_ofertas_pendientes(), 'page_ofertas')
+        context.update({
+            'usuario': usuario,
+            'page_obj_actividades': page_obj_actividades,
+            'page_obj_ofertas': page_obj_ofertas,
+            'ofertas_mas_solicitadas': get_ofertas_mas_solicitadas(),
+            'titulo_pagina': 'Cola de moderación',
+        })
+        return render(request, self.template_name, context)
+
+    # Aplica la acción indicada sobre todos los objetos seleccionados a la vez, y muestra el informe de la acción
+    def post(self, request):
+        acciones = acciones_moderacion.get(request.POST.get('entidad'), {})
+        accion = acciones.get(request.POST.get('accion'))
+        if accion is None:
+            messages.error(request, 'La acción de moderación no es válida')
+            return HttpResponseRedirect(reverse('moderacion_cola'))
+        ids = request.POST.getlist('ids')
+        if not ids:
+            messages.error(request, 'No se ha seleccionado ningún objeto')
+            return HttpResponseRedirect(reverse('moderacion_cola'))
+        try:
+            informe = accion(request, ids, request.POST.get('motivo_veto'))
+        except ValidationError as e:
+            messages.error(request, ' '.join(e.messages))
+            return HttpResponseRedirect(reverse('moderacion_cola'))
+        messages.success(request, 'Se han moderado {} objetos y se han omitido {}. Ofertas afectadas: {}. Solicitudes '
+            'pendientes afectadas: {}'.format(len(informe['moderados']), len(informe['omitidos']),
+            len(informe['ofertas_afectadas']), informe['solicitudes_pendientes']))
+        return HttpResponseRedirect(reverse('moderacion_cola'))
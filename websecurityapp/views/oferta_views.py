@@ -1,4 +1,3 @@
-from django.core.paginator import Paginator
 from django.shortcuts import render
 from django.http import HttpResponse, QueryDict, HttpResponseRedirect
 from django.views import View
@@ -16,9 +15,11 @@ from websecurityapp.models.perfil_models import Usuario
 from websecurityapp.services.oferta_services import crea_oferta, edita_oferta, elimina_oferta, veta_oferta, \
     levanta_veto_oferta, oferta_formulario, lista_ofertas, cierra_oferta, solicita_oferta, retira_solicitud_oferta, \
     lista_ofertas_propias, lista_solicitudes_propias
-from websecurityapp.views.utils import get_ofertas_solicitables_y_ofertas_retirables, es_oferta_solicitable_o_retirable, \
-    get_ofertas_con_actividades_vetadas
-from websecurityserver.settings import numero_objetos_por_pagina
+from websecurityapp.services.actividad_services import get_ids_actividades_realizadas
+from websecurityapp.services.perfil_services import get_usuario
+from websecurityapp.views.utils import get_ids_elegibilidad_ofertas, filtra_ofertas_por_ids, \
+    es_oferta_solicitable_o_retirable, get_ofertas_con_actividades_vetadas
+from websecurityapp.views.paginacion import get_pagina
 
 
 
@@ -29,19 +30,19 @@ class ListadoOfertaView(LoginRequiredMixin, View):
         context = {}
         # Se consulta que usuario esta autenticado en este momento
         try:
-            usuario = Usuario.objects.get(django_user_id = request.user.id)
+            usuario = get_usuario(request)
         except ObjectDoesNotExist:
             usuario = None
         # Se obtiene el listado de ofertas y se pagina
         ofertas = lista_ofertas(request)
-        paginator = Paginator(ofertas, numero_objetos_por_pagina)
-        page_number = request.GET.get('page')
-        page_obj_ofertas = paginator.get_page(page_number)
-        # De la página que se está mostrando, se obtienen las ofertas que se el usuario puede solicitar y las que el 
-        # usuario puede retirar
-        [ofertas_solicitables, ofertas_retirables] = get_ofertas_solicitables_y_ofertas_retirables(usuario, page_obj_ofertas)
-        # Se obtienen las ofertas de la página que tienen actividades vetadas, para poder marcarlas
-        ofertas_actividades_vetadas = get_ofertas_con_actividades_vetadas(page_obj_ofertas)
+        page_obj_ofertas = get_pagina(request, ofertas, 'page')
+        # De la página que se está mostrando, se obtienen en una sola consulta las ofertas que se el usuario puede
+        # solicitar, las que el usuario puede retirar y las que tienen actividades vetadas, para poder marcarlas
+        [ids_solicitables, ids_retirables, ids_actividades_vetadas] = get_ids_elegibilidad_ofertas(usuario,
+            page_obj_ofertas)
+        ofertas_solicitables = filtra_ofertas_por_ids(page_obj_ofertas, ids_solicitables)
+        ofertas_retirables = filtra_ofertas_por_ids(page_obj_ofertas, ids_retirables)
+        ofertas_actividades_vetadas = filtra_ofertas_por_ids(page_obj_ofertas, ids_actividades_vetadas)
         # Se añaden al contexto las ofertas y el usuario y se muestra el listado
         context.update({
             'page_obj_ofertas': page_obj_ofertas,
@@ -60,14 +61,12 @@ class ListadoOfertaPropiaView(LoginRequiredMixin, View):
         context = {}
         # Se consulta que usuario esta autenticado en este momento
         try:
-            usuario = Usuario.objects.get(django_user_id = request.user.id)
+            usuario = get_usuario(request)
         except ObjectDoesNotExist:
             usuario = None
         # Se obtiene el listado de ofertas propias y se pagina
         ofertas = lista_ofertas_propias(request)
-        paginator = Paginator(ofertas, numero_objetos_por_pagina)
-        page_number = request.GET.get('page')
-        page_obj_ofertas = paginator.get_page(page_number)
+        page_obj_ofertas = get_pagina(request, ofertas, 'page')
         # Se obtienen las ofertas de la página que tienen actividades vetadas, para poder marcarlas
         ofertas_actividades_vetadas = get_ofertas_con_actividades_vetadas(page_obj_ofertas)
         # Se añaden al contexto las ofertas y el usuario y se muestra el listado
@@ -106,7 +105,7 @@ class CreacionOfertaView(LoginRequiredMixin, View):
             form.clean()
             form_data = form.cleaned_data
             # Se inserta el campo autor en el diccionario que representa el formulario
-            autor = Usuario.objects.get(django_user_id = request.user.id)
+            autor = get_usuario(request)
             form_data.update({'autor': autor})
             # Se intenta crear la oferta
             try:
@@ -263,12 +262,12 @@ class DetallesOfertaView(LoginRequiredMixin, View):
         context = {}
         # Se obtiene el usuario autenticado
         try:
-            usuario = Usuario.objects.get(django_user_id = request.user.id)
+            usuario = get_usuario(request)
         except ObjectDoesNotExist as e:
             usuario = None
-        # Se busca la oferta
+        # Se busca la oferta, junto con su autor
         try:
-            oferta = Oferta.objects.get(pk=oferta_id)
+            oferta = Oferta.objects.select_related('autor__django_user').get(pk=oferta_id)
         # En caso de que no se encuentre la oferta, se redirige al usuario al listado de oferta
         except ObjectDoesNotExist as e:
             return oferta_no_hallada(request)
@@ -278,21 +277,19 @@ class DetallesOfertaView(LoginRequiredMixin, View):
             messages.error(request, 'No se tienen los permisos necesarios para acceder a la oferta')
             return HttpResponseRedirect(reverse('oferta_listado'))
         # Se mira si se puede solicitar o retirar la oferta, para saber si poner los botones de solicitud o retirada
-        # de solicitud
+        # de solicitud. Se calcula en una única consulta
         [solicitable, retirable] = es_oferta_solicitable_o_retirable(usuario, oferta)
-        solicitantes = []
+        # Se obtienen los solicitantes de la oferta, solo visibles para su autor, en el orden en que la solicitaron, y se
+        # paginan en la base de datos, obteniendo solo los de la página junto con sus usuarios de Django
         if usuario == oferta.autor:
-            for solicitud in list(Solicitud.objects.filter(oferta=oferta)):
-                solicitantes.append(solicitud.usuario)
-        # Se obtienen los solicitantes de la oferta y se paginan
-        paginator_solicitantes = Paginator(solicitantes, numero_objetos_por_pagina)
-        page_number_solicitantes = request.GET.get('page_solicitantes')
-        page_obj_solicitantes = paginator_solicitantes.get_page(page_number_solicitantes)
-        # Se obtienen las actividades requeridas en la oferta y se paginan
-        actividades = oferta.actividades.all()
-        paginator_actividades = Paginator(actividades, numero_objetos_por_pagina)
-        page_number_actividades = request.GET.get('page_actividades')
-        page_obj_actividades = paginator_actividades.get_page(page_number_actividades)
+            solicitantes = Usuario.objects.filter(solicitudes__oferta=oferta).select_related('django_user') \
+                .order_by('solicitudes__id')
+        else:
+            solicitantes = Usuario.objects.none()
+        page_obj_solicitantes = get_pagina(request, solicitantes, 'page_solicitantes')
+        # Se obtienen las actividades requeridas en la oferta, junto con sus autores, y se paginan
+        actividades = oferta.actividades.select_related('autor__django_user').order_by('id')
+        page_obj_actividades = get_pagina(request, actividades, 'page_actividades')
         # Se añaden al contexto la oferta y el usuario, además de las variables y listas obtenidas anteriormente
         context.update({
             'oferta': oferta,
@@ -441,13 +438,11 @@ class ListadoSolicitudPropiaView(LoginRequiredMixin, View):
         context = {}
         # Se consulta cuál usuario esta autenticado en este momento
         try:
-            usuario = Usuario.objects.get(django_user_id=request.user.id)
+            usuario = get_usuario(request)
         except ObjectDoesNotExist:
             usuario = None
         ofertas = lista_solicitudes_propias(request)
-        paginator = Paginator(ofertas, numero_objetos_por_pagina)
-        page_number = request.GET.get('page')
-        page_obj_ofertas = paginator.get_page(page_number)
+        page_obj_ofertas = get_pagina(request, ofertas, 'page')
         # Se averigua cuáles ofertas de la página son retirables
         ofertas_retirables = []
         for oferta in page_obj_ofertas:
@@ -516,10 +511,6 @@ class RetiroSolicitudOfertaView(LoginRequiredMixin, View):
 
 def oferta_no_hallada(request):
     messages.error(request, 'No se ha encontrado la oferta')
-    try:
-        usuario = Usuario.objects.get(django_user_id = request.user.id)
-    except ObjectDoesNotExist:
-        usuario = None
     return HttpResponseRedirect(reverse('oferta_listado'))
 
 def comprueba_editar_oferta(request, oferta_id):
@@ -585,7 +576,7 @@ def comprueba_vetar_oferta(request, oferta_id):
     except ObjectDoesNotExist as e:
         return oferta_no_hallada(request)
     # Si el usuario no es un administrador, entonces se le redirige a los detalles de la oferta
-    usuario = Usuario.objects.get(django_user__id=request.user.id)
+    usuario = get_usuario(request)
     if not usuario.es_admin:
         messages.error(request, 'No se poseen los permisos necesarios para vetar la oferta')
         return HttpResponseRedirect(reverse('oferta_detalles', kwargs={'oferta_id': oferta_id}))
@@ -611,7 +602,7 @@ def comprueba_levantar_veto_oferta(request, oferta_id):
     except ObjectDoesNotExist as e:
         return oferta_no_hallada(request)
     # Si el usuario no es un administrador, entonces se le redirige a los detalles de la oferta
-    usuario = Usuario.objects.get(django_user__id=request.user.id)
+    usuario = get_usuario(request)
     if not usuario.es_admin:
         messages.error(request, 'No se poseen los permisos necesarios para levantar el veto sobre la oferta')
         return HttpResponseRedirect(reverse('oferta_detalles', kwargs={'oferta_id': oferta_id}))
@@ -670,7 +661,7 @@ def comprueba_solicitar_oferta(request, oferta_id):
         messages.error(request, 'No se puede solicitar una oferta que está cerrada')
         return HttpResponseRedirect(reverse('oferta_detalles', kwargs={'oferta_id': oferta_id}))
     # Comprueba que el usuario no sea el autor de la oferta
-    usuario = Usuario.objects.get(django_user__id=request.user.id)
+    usuario = get_usuario(request)
     if usuario == oferta.autor:
         messages.error(request, 'No se puede solicitar una oferta de la que se es autor')
         return HttpResponseRedirect(reverse('oferta_detalles', kwargs={'oferta_id': oferta_id}))
@@ -685,7 +676,7 @@ def comprueba_solicitar_oferta(request, oferta_id):
         return HttpResponseRedirect(reverse('oferta_detalles', kwargs={'oferta_id': oferta_id}))
     # Comprueba que ninguna de las actividades marcadas como requisitos para solicitar la oferta ha sido vetada
     actividades_requeridas = oferta.actividades.all()
-    actividades_realizadas = usuario.actividades_realizadas.all()
+    ids_actividades_realizadas = get_ids_actividades_realizadas(usuario, actividades_requeridas)
     for actividad_requerida in actividades_requeridas:
         if actividad_requerida.vetada:
             messages.error(request, 'No se puede solicitar una oferta que tiene entre sus requisitos actividades vetadas')
@@ -693,7 +684,7 @@ def comprueba_solicitar_oferta(request, oferta_id):
     # Comprueba que el usuario cumple con los requisitos
     cumple_requisitos = True
     for actividad_requerida in actividades_requeridas:
-        if not actividad_requerida in actividades_realizadas:
+        if not actividad_requerida.id in ids_actividades_realizadas:
             cumple_requisitos = False
     if not cumple_requisitos:
         messages.error(request, 'No se puede solicitar una oferta cuyos actividades requeridas no se han resuelto')
@@ -720,7 +711,7 @@ def comprueba_retirar_solicitud_oferta(request, oferta_id):
         messages.error(request, 'No se puede retirar la solicitud de una oferta que está cerrada')
         return HttpResponseRedirect(reverse('oferta_detalles', kwargs={'oferta_id': oferta_id}))
     # Si el usuario no ha solicitado la oferta, entonces no puede retirar la solicitud
-    usuario = Usuario.objects.get(django_user__id=request.user.id)
+    usuario = get_usuario(request)
     try:
         solicitud = Solicitud.objects.get(usuario=usuario, oferta=oferta)
         return solicitud
@@ -0,0 +1,141 @@
+import collections.abc
+import hashlib
+import math
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+
+from websecurityserver.settings import numero_objetos_por_pagina
+
+# Tiempo en segundos durante el que se reutiliza el número total de objetos de un listado paginado por cursor
+tiempo_cache_total_paginacion = 60
+
+
+# Página de un listado paginado por cursor. Ofrece la misma interfaz que las páginas de Django que se usa en las
+# plantillas, además de los ids que sirven de cursor para acceder a las páginas anterior y siguiente
+class PaginaCursor(collections.abc.Sequence):
+    por_cursor = True
+
+    def __init__(self, object_list, number, paginator, hay_anterior, hay_siguiente):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self.hay_anterior = hay_anterior
+        self.hay_siguiente = hay_siguiente
+        self.cursor_anterior = object_list[0].id if object_list else None
+        self.cursor_siguiente = object_list[-1].id if object_list else None
+
+    def __repr__(self):
+        return '<Page %s of %s>' % (self.number, self.paginator.num_pages)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.hay_siguiente
+
+    def has_previous(self):
+        return self.hay_anterior and self.number > 1
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+# Paginador que, en lugar de saltar las filas de las páginas anteriores con OFFSET, busca a partir del id del último
+# objeto de la página anterior (o del primero de la página siguiente), por lo que el coste de acceder a una página no
+# depende de su posición en el listado. El listado debe estar ordenado por id. El número total de objetos solo se usa
+# para mostrar el número de páginas, por lo que se guarda en la caché durante un tiempo en lugar de contarse siempre
+class PaginadorCursor:
+
+    def __init__(self, object_list, per_page, tiempo_cache_total=tiempo_cache_total_paginacion):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.tiempo_cache_total = tiempo_cache_total
+
+    @cached_property
+    def count(self):
+        clave = 'paginacion_total_' + hashlib.md5(str(self.object_list.query).encode()).hexdigest()
+        return cache.get_or_set(clave, self.object_list.count, self.tiempo_cache_total)
+
+    @cached_property
+    def num_pages(self):
+        return max(1, math.ceil(self.count / self.per_page))
+
+    # Obtiene la primera página del listado, sin contar ni saltar filas
+    def get_primera_page(self):
+        objetos = list(self.object_list.order_by('id')[:self.per_page + 1])
+        return PaginaCursor(objetos[:self.per_page], 1, self, False, len(objetos) > self.per_page)
+
+    # Obtiene la página con los objetos posteriores al id dado
+    def get_page_despues(self, number, despues):
+        objetos = list(self.object_list.filter(id__gt=despues).order_by('id')[:self.per_page + 1])
+        return PaginaCursor(objetos[:self.per_page], number, self, True, len(objetos) > self.per_page)
+
+    # Obtiene la página con los objetos anteriores al id dado
+    def get_page_antes(self, number, antes):
+        objetos = list(self.object_list.filter(id__lt=antes).order_by('-id')[:self.per_page + 1])
+        hay_anterior = len(objetos) > self.per_page
+        objetos = objetos[:self.per_page]
+        objetos.reverse()
+        return PaginaCursor(objetos, number, self, hay_anterior, True)
+
+    # Obtiene la última página del listado, cuyos objetos se buscan desde el final
+    def get_ultima_page(self):
+        n_objetos = self.count - (self.num_pages - 1) * self.per_page
+        objetos = list(self.object_list.order_by('-id')[:max(n_objetos, 0)])
+        objetos.reverse()
+        return PaginaCursor(objetos, self.num_pages, self, self.num_pages > 1, False)
+
+
+# Indica si un listado se puede paginar por cursor, es decir, si es un queryset ordenado únicamente por id
+def es_paginable_por_cursor(object_list):
+    return isinstance(object_list, QuerySet) and not object_list.query.is_sliced \
+        and tuple(object_list.query.order_by) == ('id',)
+
+# Convierte a entero un número de página recibido en la petición, devolviendo el valor por defecto si no es válido
+def _numero_pagina(valor, por_defecto):
+    try:
+        return max(1, int(valor))
+    except (TypeError, ValueError):
+        return por_defecto
+
+# Obtiene la página de un listado indicada en los parámetros de la petición. Si el listado se puede paginar por cursor y
+# se recibe un cursor (<page_param>_despues, <page_param>_antes o <page_param>_ultima), se busca la página a partir del
+# cursor, y la primera página, que es la más visitada, se obtiene también con el paginador por cursor. En otro caso se
+# usa el paginador de Django con el número de página, como al saltar a una página concreta. Las
+# páginas paginables por cursor incluyen los cursores, para que los enlaces de la paginación los usen. Si no se indica el
+# número de objetos por página, se usa el de la configuración
+def get_pagina(request, object_list, page_param='page', per_page=None):
+    if per_page is None:
+        per_page = numero_objetos_por_pagina
+    page_number = request.GET.get(page_param)
+    if es_paginable_por_cursor(object_list):
+        paginator = PaginadorCursor(object_list, per_page)
+        despues = request.GET.get(page_param + '_despues')
+        antes = request.GET.get(page_param + '_antes')
+        if request.GET.get(page_param + '_ultima'):
+            return paginator.get_ultima_page()
+        if despues and despues.isdigit():
+            return paginator.get_page_despues(_numero_pagina(page_number, 2), int(despues))
+        if antes and antes.isdigit():
+            return paginator.get_page_antes(_numero_pagina(page_number, 1), int(antes))
+        if _numero_pagina(page_number, 1) == 1:
+            return paginator.get_primera_page()
+    page_obj = Paginator(object_list, per_page).get_page(page_number)
+    page_obj.object_list = list(page_obj.object_list)
+    page_obj.por_cursor = es_paginable_por_cursor(object_list)
+    if page_obj.por_cursor and page_obj.object_list:
+        page_obj.cursor_anterior = page_obj.object_list[0].id
+        page_obj.cursor_siguiente = page_obj.object_list[-1].id
+    return page_obj
@@ -1,4 +1,3 @@
-from django.core.paginator import Paginator
 from django.shortcuts import render
 from django.http import HttpResponse, QueryDict, HttpResponseRedirect
 from django.views import View
@@ -11,8 +10,11 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from websecurityapp.exceptions import UnallowedUserException
 from websecurityapp.forms.perfil_forms import UsuarioForm,  AnexoForm
 from websecurityapp.models.perfil_models import Usuario, Anexo
-from websecurityapp.services.perfil_services import registra_usuario, usuario_formulario, edita_perfil, anexo_formulario, crea_anexo, edita_anexo, elimina_anexo
-from websecurityserver.settings import numero_objetos_por_pagina
+from websecurityapp.services.perfil_services import registra_usuario, usuario_formulario, edita_perfil, anexo_formulario, crea_anexo, edita_anexo, elimina_anexo, \
+    get_usuario
+from websecurityapp.services.actividad_services import plan_listado_actividades
+from websecurityapp.services.util_services import aplica_plan_carga
+from websecurityapp.views.paginacion import get_pagina
 
 
 class RegistroUsuarioView(View):
@@ -45,14 +47,13 @@ class DetallesPerfilView(LoginRequiredMixin, View):
     def get(self, request):
         context = {}
         # Se busca el usuario
-        usuario = Usuario.objects.get(django_user_id = request.user.id)
+        usuario = get_usuario(request)
         # Si se encuentra el usuario, se buscan sus anexos y se le muestra su perfil
         anexos = Anexo.objects.filter(usuario_id = usuario.id).order_by('id')
         # Se obtienen las actividades_realizadas por el usuario y se paginan
-        actividades_realizadas = usuario.actividades_realizadas.all().order_by('id')
-        paginator = Paginator(actividades_realizadas, numero_objetos_por_pagina)
-        page_number = request.GET.get('page')
-        page_obj_actividades_realizadas = paginator.get_page(page_number)
+        actividades_realizadas = aplica_plan_carga(usuario.actividades_realizadas.all().order_by('id'),
+            plan_listado_actividades)
+        page_obj_actividades_realizadas = get_pagina(request, actividades_realizadas, 'page')
         # Se añade al usuario, sus anexos y las actividades al contexto
         context.update({
             'usuario': usuario,
@@ -68,7 +69,7 @@ class DetallesPerfilAjenoView(LoginRequiredMixin, View):
     def get(self, request, usuario_id):
         context = {}
         # Se busca el usuario
-        usuario = Usuario.objects.get(django_user_id = request.user.id)
+        usuario = get_usuario(request)
         try:
             usuario_perfil = Usuario.objects.get(pk=usuario_id)
         # Si no se enecuentra el usuario cuyo perfil se quiere ver, se redirige a la pagina principal
@@ -78,10 +79,9 @@ class DetallesPerfilAjenoView(LoginRequiredMixin, View):
         # Si se encuentra el usuario, se buscan sus anexos y se le muestra su perfil
         anexos = Anexo.objects.filter(usuario_id = usuario_id).order_by('id')
         # Se obtienen las actividades_realizadas por el usuario que no estan vetadas y se paginan
-        actividades_realizadas = usuario_perfil.actividades_realizadas.filter(vetada=False).order_by('id')
-        paginator = Paginator(actividades_realizadas, numero_objetos_por_pagina)
-        page_number = request.GET.get('page')
-        page_obj_actividades_realizadas = paginator.get_page(page_number)
+        actividades_realizadas = aplica_plan_carga(usuario_perfil.actividades_realizadas.filter(vetada=False)
+            .order_by('id'), plan_listado_actividades)
+        page_obj_actividades_realizadas = get_pagina(request, actividades_realizadas, 'page')
         # Se añaden al usuario registraado, el usuario cuyo perfil se visita, sus anexos y las actividades resueltas por
         # dicho usuario al contexto
         context.update({
@@ -98,7 +98,7 @@ class EdicionPerfilView(LoginRequiredMixin, View):
     def get(self, request):
         context = {}
         # Se busca el usuario
-        usuario = Usuario.objects.get(django_user_id = request.user.id)
+        usuario = get_usuario(request)
         # Si se encuentra el usuario, se crea el formulario en base a sus datos
         form = usuario_formulario(usuario)
         # Se dan los datos necesarios para crear el formulario y darle estilo
@@ -119,7 +119,7 @@ class EdicionPerfilView(LoginRequiredMixin, View):
             form.clean()
             form_data = form.cleaned_data
             # Se busca el usuario
-            usuario = Usuario.objects.get(django_user_id = request.user.id)
+            usuario = get_usuario(request)
             # Se trata de edita el usuario
             try:
                 edita_perfil(form_data, usuario)
@@ -157,7 +157,7 @@ class CreacionAnexoView(LoginRequiredMixin, View):
     def get(self, request):
         context = {}
         # Se busca al usuario
-        usuario = Usuario.objects.get(django_user_id = request.user.id)
+        usuario = get_usuario(request)
         # Se crea el formulario de creación del anexo
         form = AnexoForm()
         # Se dan los datos necesarios para crear el formulario y darle estilo
@@ -177,7 +177,7 @@ class CreacionAnexoView(LoginRequiredMixin, View):
             form.clean()
             form_data = form.cleaned_data
             # Se trata de crear el usuario
-            usuario = Usuario.objects.get(django_user_id = request.user.id)
+            usuario = get_usuario(request)
             try:
                 crea_anexo(form_data, usuario)
             # El usuario no está permitido, por lo que se le redirige a los detalles del perfil
@@ -216,7 +216,7 @@ class EdicionAnexoView(LoginRequiredMixin, View):
 
     def get(self, request, anexo_id):
         context = {}
-        usuario = Usuario.objects.get(django_user_id = request.user.id)
+        usuario = get_usuario(request)
         # Trata de encontrar el anexo que se quiere editar
         try:
             anexo = Anexo.objects.get(pk=anexo_id)
@@ -242,7 +242,7 @@ class EdicionAnexoView(LoginRequiredMixin, View):
         context = {}
         form = AnexoForm(request.POST)
         try:
-            usuario = Usuario.objects.get(django_user_id = request.user.id)
+            usuario = get_usuario(request)
         except ObjectDoesNotExist as e:
             messages.error(request, 'Se debe estar autenticado para acceder a la edicion de anexos')
             return HttpResponseRedirect(reverse('perfil_detalles'))
@@ -297,7 +297,7 @@ class EliminacionAnexoView(LoginRequiredMixin, View):
 
     def get(self, request, anexo_id):
         context = {}
-        usuario = Usuario.objects.get(django_user_id = request.user.id)
+        usuario = get_usuario(request)
         # Se trata de hallar el anexo y eliminarlo
         try:
             anexo = Anexo.objects.get(pk=anexo_id)
@@ -5,7 +5,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.http import HttpResponse, JsonResponse
 from rest_framework.parsers import JSONParser
-from websecurityapp.serializers.sesionactividad_serializer import SesionActividadSerializer
+from websecurityapp.serializers.sesionactividad_serializer import SesionActividadSerializer, \
+    SesionActividadTerminadaSerializer
 from websecurityapp.models.actividad_models import SesionActividad, Actividad
 from websecurityapp.models.perfil_models import Usuario
 from websecurityapp.services import sesionactividad_services
@@ -17,14 +18,13 @@ class SesionActividadComienzo(APIView):
         # Se trata de crear al sesion
         actividad = Actividad.objects.get(identificador = identificador)
         try:
-            sesionactividad = sesionactividad_services.crea_sesionactividad(request, actividad)
+            token = sesionactividad_services.crea_sesionactividad(request, actividad)
         # Manda un mensaje de error si no ha logrrado crear la sesión
         except Usuario.DoesNotExist as e:
             json_response = JsonResponse({'status': 'Se debe iniciar sesión para acceder a la actividad'}, status=500, safe=False)
             return json_response
         # Manda el token
-        serializer = SesionActividadSerializer(sesionactividad)
-        data = serializer.data
+        data = {'token': token}
         # Se incluye un mensaje de éxito
         data['status'] = 'Se ha comenzado la actividad correctamente'
         json_response = JsonResponse(data, safe=False)
@@ -56,4 +56,39 @@ class SesionActividadFinal(APIView):
             json_response = JsonResponse({'status': 'Se ha producido un error en la conexión con el servidor'}, status=500)
         return json_response
 
+# Termina a la vez las sesiones de varias actividades, que pueden ser de distintos usuarios, por ejemplo al acabar una
+# ronda de ejercicios. Recibe la lista de sesiones como {'sesiones': [{'identificador': ..., 'token': ...}, ...]} y
+# devuelve el estado de cada sesión en el mismo orden
+class SesionActividadFinalVarias(APIView):
+    parser_classes = [JSONParser]
 
+    def post(self, request, format=None):
+        # Si el usuario no está autenticado se manda un mensaje de error
+        if request.user.id == None:
+            json_response = JsonResponse({'status': 'El usuario debe estar autenticado'}, status=500)
+            return json_response
+        sesiones = request.data.get('sesiones') if isinstance(request.data, dict) else None
+        if not isinstance(sesiones, list) or len(sesiones) > sesionactividad_services.numero_maximo_sesiones_terminadas:
+            json_response = JsonResponse({'status': 'Se debe enviar una lista de como mucho {} sesiones'.format(
+                sesionactividad_services.numero_maximo_sesiones_terminadas)}, status=500)
+            return json_response
+        # Se valida cada sesión por separado, para devolver el estado de cada una aunque alguna no sea válida
+        serializadores = [SesionActividadTerminadaSerializer(data=sesion) for sesion in sesiones]
+        pares = [(serializer.validated_data['identificador'], serializer.validated_data['token'])
+            for serializer in serializadores if serializer.is_valid()]
+        try:
+            estados = iter(sesionactividad_services.termina_sesionesactividad(request, pares))
+        # Si se ha producido algún error, se manda un mensaje de error
+        except Exception as e:
+            json_response = JsonResponse({'status': 'Se ha producido un error en la conexión con el servidor'}, status=500)
+            return json_response
+        resultados = []
+        for serializer in serializadores:
+            if serializer.errors:
+                resultados.append({'identificador': serializer.initial_data.get('identificador')
+                    if isinstance(serializer.initial_data, dict) else None, 'status': 'datos_no_validos'})
+            else:
+                resultados.append({'identificador': serializer.validated_data['identificador'], 'status': next(estados)})
+        json_response = JsonResponse({'resultados': resultados, 'realizadas': len([resultado for resultado in resultados
+            if resultado['status'] == 'realizada'])})
+        return json_response
@@ -1,78 +1,77 @@
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.query import QuerySet
+
 from websecurityapp.models.oferta_models import Solicitud, Oferta
+from websecurityapp.models.perfil_models import Usuario
+
+# Dada una consulta sobre la tabla intermedia de las actividades requeridas por las ofertas, devuelve una subconsulta
+# que cuenta el número de filas de dicha consulta por cada oferta
+def _cuenta_actividades_requeridas(requeridas):
+    return Coalesce(Subquery(
+        requeridas.order_by().values('oferta').annotate(n=Count('actividad')).values('n'),
+        output_field=IntegerField()
+    ), Value(0))
+
+# Dados un usuario y un conjunto de ofertas (una lista, una página o un queryset completo), devuelve los conjuntos de ids
+# de las ofertas solicitables, de las ofertas retirables y de las ofertas con alguna actividad requerida vetada.
+# Todo el cálculo se realiza en una única consulta, independientemente del número de ofertas y de actividades requeridas
+def get_ids_elegibilidad_ofertas(usuario, ofertas):
+    # Si se recibe un queryset sin paginar se usa como subconsulta, en otro caso se obtienen los ids de las ofertas
+    if isinstance(ofertas, QuerySet) and not ofertas.query.is_sliced:
+        ids_ofertas = ofertas.values('pk')
+    else:
+        ids_ofertas = [oferta.id for oferta in ofertas]
+    # Se cuentan por cada oferta las actividades requeridas, las requeridas que ha realizado el usuario y las requeridas
+    # que están vetadas
+    requeridas = Oferta.actividades.through.objects.filter(oferta=OuterRef('pk'))
+    realizadas = Usuario.actividades_realizadas.through.objects.filter(usuario=usuario).values('actividad')
+    filas = Oferta.objects.filter(pk__in=ids_ofertas).annotate(
+        n_requeridas=_cuenta_actividades_requeridas(requeridas),
+        n_realizadas=_cuenta_actividades_requeridas(requeridas.filter(actividad__in=realizadas)),
+        n_vetadas=_cuenta_actividades_requeridas(requeridas.filter(actividad__vetada=True)),
+        solicitada=Exists(Solicitud.objects.filter(usuario=usuario, oferta=OuterRef('pk'))),
+    ).values_list('id', 'autor_id', 'borrador', 'cerrada', 'vetada', 'n_requeridas', 'n_realizadas', 'n_vetadas',
+        'solicitada')
+    ids_solicitables = set()
+    ids_retirables = set()
+    ids_actividades_vetadas = set()
+    for (id, autor_id, borrador, cerrada, vetada, n_requeridas, n_realizadas, n_vetadas, solicitada) in filas:
+        if n_vetadas > 0:
+            ids_actividades_vetadas.add(id)
+        # Se puede retirar la solicitud de las ofertas solicitadas que no están cerradas ni vetadas
+        if not cerrada and not vetada and solicitada:
+            ids_retirables.add(id)
+        # Una oferta no solicitada es solicitable si el usuario ha realizado todas sus actividades requeridas, ninguna
+        # de ellas está vetada y el usuario no es el autor de la oferta. La comprobación del autor solo se aplica cuando
+        # la oferta tiene actividades requeridas
+        elif not borrador and not cerrada and not vetada and not solicitada:
+            faltan_actividades = n_requeridas - n_realizadas
+            if n_requeridas == 0 or (faltan_actividades == 0 and n_vetadas == 0 and usuario.id != autor_id):
+                ids_solicitables.add(id)
+    return [ids_solicitables, ids_retirables, ids_actividades_vetadas]
+
+# Dada una lista de ofertas y un conjunto de ids, devuelve las ofertas de la lista cuyo id está en el conjunto,
+# manteniendo el orden de la lista
+def filtra_ofertas_por_ids(ofertas, ids):
+    return [oferta for oferta in ofertas if oferta.id in ids]
 
 # Dados un usuario y una lista de ofertas, devuelve por separado las ofertas solicitables y la ofertas retirables
 # por el usuario
 def get_ofertas_solicitables_y_ofertas_retirables(usuario, ofertas):
-    ofertas_solicitables = []
-    ofertas_solicitadas = []
-    ofertas_retirables = []
-    # Obtiene las ofertas solicitadas por el usuario
-    solicitudes_usuario = list(Solicitud.objects.filter(usuario=usuario).only('oferta').distinct())
-    for solicitud in solicitudes_usuario:
-        ofertas_solicitadas.append(solicitud.oferta)
-    # Por cada oferta de la lista de ofertas
-    for oferta in ofertas:
-        # Obtiene las ofertas retirables
-        if not oferta.cerrada and not oferta.vetada and oferta in ofertas_solicitadas:
-            ofertas_retirables.append(oferta)
-        # Filtra parcialmente las ofertas para retirar parte de las que no son solicitables
-        elif not oferta.borrador and not oferta.cerrada and not oferta.vetada and not oferta in ofertas_solicitadas:
-            es_solicitable = True
-            # Si uno de los requisitos de la oferta no ha sido resuelto por el usuario, o el usuario es el autor de la
-            # oferta, entonces la oferta no es solicitable
-            for actividad_requerida in oferta.actividades.all():
-                if not actividad_requerida in usuario.actividades_realizadas.all() or usuario == oferta.autor:
-                    es_solicitable = False
-                    break
-                # Si la actividad está vetada, entonces la oferta no es solicitable
-                elif actividad_requerida.vetada:
-                    es_solicitable = False
-                    break
-            # Si la oferta es solicitable, entonces es añadida al listado de ofertas solicitables
-            if es_solicitable:
-                ofertas_solicitables.append(oferta)
-    return [ofertas_solicitables, ofertas_retirables]
+    ofertas = list(ofertas)
+    [ids_solicitables, ids_retirables, ids_actividades_vetadas] = get_ids_elegibilidad_ofertas(usuario, ofertas)
+    return [filtra_ofertas_por_ids(ofertas, ids_solicitables), filtra_ofertas_por_ids(ofertas, ids_retirables)]
 
-# Indica si un oferta es retirable o solicitable
+# Indica si un oferta es retirable o solicitable, con la misma consulta única que se usa para los listados
 def es_oferta_solicitable_o_retirable(usuario, oferta):
-    es_solicitada = Solicitud.objects.filter(usuario=usuario, oferta=oferta).exists()
-    retirable = False
-    solicitable = False
-    # Si la oferta ha sido solicitada, comprueba si se puede retirar la solicitud
-    if es_solicitada:
-        if not oferta.vetada and not oferta.cerrada:
-            retirable = True
-    # Si la oferta no ha sido solicitada, comprueba si se puede solicitar
-    else:
-        if not oferta.cerrada and not oferta.vetada and not oferta.borrador:
-            solicitable = True
-            for actividad_requerida in oferta.actividades.all():
-                # Si uno de los requisitos de la oferta no ha sido resuelto por el usuario, o el usuario es el autor
-                # de la oferta, entonces la oferta no es solicitable
-                if not actividad_requerida in usuario.actividades_realizadas.all() or usuario == oferta.autor:
-                    solicitable = False
-                    break
-                # Si uno de los requisitos está vetado, entonces la actividad no es solicitable
-                elif actividad_requerida.vetada:
-                    solicitable = False
-                    break
-    return [solicitable, retirable]
+    [ids_solicitables, ids_retirables, ids_actividades_vetadas] = get_ids_elegibilidad_ofertas(usuario, [oferta])
+    return [oferta.id in ids_solicitables, oferta.id in ids_retirables]
 
 # Filtra una lista de ofertas para obtener aquellas ofertas que tienen requisitos vetados
 def get_ofertas_con_actividades_vetadas(ofertas):
-    res = []
-    for oferta in ofertas:
-        for actividad in oferta.actividades.all():
-            if actividad.vetada:
-                res.append(oferta)
-                break
-    return res
+    return [oferta for oferta in ofertas if oferta.tiene_actividades_vetadas]
 
 # Indica si la oferta dada tiene algún requisito vetado
 def tiene_actividad_vetada(oferta):
-    res = False
-    for actividad in oferta.actividades.all():
-        if actividad.vetada:
-            res = True
-            break
-    return res
\ No newline at end of file
+    return oferta.actividades.filter(vetada=True).exists()
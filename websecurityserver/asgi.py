@@ -0,0 +1,22 @@
+"""
+ASGI config for websecurityserver project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "websecurityserver.settings")
+
+django_application = get_asgi_application()
+
+# Las urls de las sesiones de actividad se atienden en paralelo en los hilos del pool, y el resto con la aplicación de
+# Django
+from websecurityapp.views.asincronas import EnrutadorAsgi, urls_asincronas
+
+application = EnrutadorAsgi(django_application, urls_asincronas)
@@ -0,0 +1,30 @@
+"""
+Configuración de cada entorno: desarrollo (dev), producción (prod) y benchmarks (bench).
+
+El entorno se elige con la variable de entorno DJANGO_ENTORNO, o con DJANGO_SETTINGS_MODULE apuntando directamente a su
+módulo, por ejemplo websecurityserver.settings.prod. Por defecto se usa el de desarrollo, también si DJANGO_SETTINGS_MODULE
+apunta a otro módulo del paquete, como la configuración común (base), que no es un entorno. Este paquete expone la
+configuración del entorno elegido, por lo que la aplicación puede importar de websecurityserver.settings sus valores
+propios, que Django no incluye en django.conf.settings por estar en minúsculas.
+"""
+
+import os
+
+# Entornos disponibles
+entornos = ['dev', 'prod', 'bench']
+
+# Entorno del módulo indicado en DJANGO_SETTINGS_MODULE, si es el módulo de uno de los entornos
+modulo_configuracion = os.environ.get('DJANGO_SETTINGS_MODULE', '')
+entorno_modulo = modulo_configuracion[len(__name__) + 1:] if modulo_configuracion.startswith(__name__ + '.') else None
+
+entorno_configuracion = os.environ.get('DJANGO_ENTORNO') or (entorno_modulo if entorno_modulo in entornos else 'dev')
+
+if entorno_configuracion == 'prod':
+    from websecurityserver.settings.prod import *
+elif entorno_configuracion == 'bench':
+    from websecurityserver.settings.bench import *
+elif entorno_configuracion == 'dev':
+    from websecurityserver.settings.dev import *
+else:
+    raise ValueError('Entorno de configuración no válido: {}. Debe ser uno de {}'.format(entorno_configuracion,
+        ', '.join(entornos)))
@@ -0,0 +1,239 @@
+"""
+Django settings for websecurityserver project.
+
+Generated by 'django-admin startproject' using Django 2.0.
+
+Configuración común a todos los entornos. Los entornos de desarrollo (dev), producción (prod) y benchmarks (bench) parten
+de esta configuración, y los valores que cambian entre despliegues se leen de variables de entorno.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.0/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.0/ref/settings/
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Lee una variable de entorno, o devuelve el valor por defecto si no está definida o está vacía
+def entorno(nombre, defecto = None):
+    return os.environ.get(nombre) or defecto
+
+def entorno_entero(nombre, defecto):
+    valor = entorno(nombre)
+    return int(valor) if valor is not None else defecto
+
+def entorno_booleano(nombre, defecto):
+    valor = entorno(nombre)
+    return valor.lower() in ['1', 'true', 'si', 'sí'] if valor is not None else defecto
+
+def entorno_lista(nombre, defecto):
+    valor = entorno(nombre)
+    return valor.split(',') if valor is not None else defecto
+
+# Lee un número de segundos de una variable de entorno. Si la variable está definida pero vacía, el tiempo es ilimitado
+def entorno_segundos(nombre, defecto):
+    if os.environ.get(nombre) == '':
+        return None
+    return entorno_entero(nombre, defecto)
+
+# Lee una variable de entorno que se debe indicar siempre, sin valor por defecto
+def entorno_obligatorio(nombre):
+    valor = entorno(nombre)
+    if valor is None:
+        raise ImproperlyConfigured('Se debe indicar la variable de entorno {}'.format(nombre))
+    return valor
+
+# Clave secreta y hosts de desarrollo, que se usan si no se indican otros salvo en producción
+clave_secreta_desarrollo = '8yhv&ee5fvw@=t8g-ika9g&!=g-1+*mfyo4!y9ajonozbb6^p='
+hosts_desarrollo = ['localhost', '127.0.0.1', '[::1]']
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/2.0/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = entorno('SECRET_KEY', clave_secreta_desarrollo)
+
+# SECURITY WARNING: don't run with debug turned on in production!
+ALLOWED_HOSTS = entorno_lista('ALLOWED_HOSTS', hosts_desarrollo)
+
+DEBUG = entorno_booleano('DEBUG', False)
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'rest_framework',
+    'websecurityapp.apps.Prueba1Config',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+# Cargadores de las plantillas, primero de los directorios de DIRS y después de los de las aplicaciones. Las plantillas
+# están en el directorio templates de la aplicación, por lo que DIRS está vacío y no se busca en otros directorios
+cargadores_plantillas = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+# Cargadores que guardan en memoria las plantillas compiladas la primera vez que se cargan, en lugar de leerlas y
+# compilarlas en cada renderizado. Con estos cargadores, las plantillas de los listados se compilan al arrancar. Los
+# cambios en las plantillas no se ven hasta reiniciar el servidor
+cargadores_plantillas_cacheados = [('django.template.loaders.cached.Loader', cargadores_plantillas)]
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+            'loaders': cargadores_plantillas_cacheados if entorno_booleano('PLANTILLAS_CACHEADAS', False)
+                else cargadores_plantillas,
+        },
+    },
+]
+
+ROOT_URLCONF = 'websecurityserver.urls'
+
+WSGI_APPLICATION = 'websecurityserver.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/2.0/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'NAME': entorno('DB_NAME', 'websecurityapp'),
+        'USER': entorno('DB_USER', 'root'),
+        'PASSWORD': entorno('DB_PASSWORD', 'root'),
+        'HOST': entorno('DB_HOST', 'localhost'),
+        'PORT': entorno('DB_PORT', ''),
+        # Segundos durante los que se reutiliza la conexión de cada hilo entre peticiones. Con 0 se abre una conexión
+        # nueva en cada petición, y vacío no se cierra nunca
+        'CONN_MAX_AGE': entorno_segundos('DB_CONN_MAX_AGE', 0),
+        'TEST': {
+            'NAME': 'testwebsecurityapp',
+            'USER': 'root',
+            'PASSWORD': 'root',
+        },
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+# Backends de caché que se pueden elegir con CACHE_BACKEND. La caché en memoria es propia de cada proceso, y la de
+# ficheros se comparte entre los procesos de una misma máquina. Con varios procesos o máquinas se debe usar una caché
+# compartida: memcached (requiere python-memcached) o Redis (requiere django-redis)
+backends_cache = {
+    'memoria': 'django.core.cache.backends.locmem.LocMemCache',
+    'archivo': 'django.core.cache.backends.filebased.FileBasedCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+
+# Configura la caché por defecto con el backend y la ubicación de las variables de entorno CACHE_BACKEND y
+# CACHE_LOCATION, o con los dados si no están definidas
+def configura_cache(backend, ubicacion = ''):
+    return {
+        'default': {
+            'BACKEND': backends_cache[entorno('CACHE_BACKEND', backend)],
+            'LOCATION': entorno('CACHE_LOCATION', ubicacion),
+            'KEY_PREFIX': entorno('CACHE_KEY_PREFIX', 'websecurityapp'),
+        },
+    }
+
+CACHES = configura_cache('memoria')
+
+# Password validation
+# https://docs.djangoproject.com/en/2.0/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.0/topics/i18n/
+
+LANGUAGE_CODE = 'es'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.0/howto/static-files/
+
+STATIC_URL = '/static/'
+
+STATICFILES_DIRS = [
+    "../websecurityapp/static",
+]
+
+LOGIN_URL = '/login/'
+LOGOUT_REDIRECT_URL = ''
+
+# Número de objetos de cada página de los listados
+numero_objetos_por_pagina = entorno_entero('NUMERO_OBJETOS_POR_PAGINA', 3)
+
+# Tiempo en segundos durante el que se guardan en la caché los fragmentos de los listados. Los fragmentos se invalidan al
+# cambiar la versión de sus objetos, por lo que este tiempo solo limita cuánto se conservan los fragmentos antiguos y
+# cuánto se siguen usando tras desplegar cambios en las plantillas si no se vacía la caché
+tiempo_cache_fragmentos = entorno_entero('TIEMPO_CACHE_FRAGMENTOS', 3600)
+
+# Número de días durante los que las actividades y ofertas publicadas aparecen en la cola de moderación
+dias_cola_moderacion = entorno_entero('DIAS_COLA_MODERACION', 30)
+
+# Almacén de los tokens de las sesiones de actividad. Con 'base_datos' cada sesión es una fila de la tabla de sesiones,
+# que se elimina al terminar la actividad. Con 'cache' las sesiones se guardan en la caché indicada y expiran solas
+# pasado su tiempo de vida, sin escribir en la base de datos. Si hay varios procesos, la caché debe ser compartida entre
+# ellos (Redis o Memcached), ya que la caché en memoria de Django es propia de cada proceso
+almacen_sesionesactividad = entorno('ALMACEN_SESIONESACTIVIDAD', 'base_datos')
+cache_sesionesactividad = entorno('CACHE_SESIONESACTIVIDAD', 'default')
+# Tiempo de vida en segundos de las sesiones de actividad. Pasado este tiempo no se puede terminar la sesión: las
+# sesiones guardadas en la caché expiran solas, y las guardadas en la base de datos se eliminan con el comando
+# elimina_sesiones_expiradas
+tiempo_sesionactividad = entorno_entero('TIEMPO_SESIONACTIVIDAD', 3600)
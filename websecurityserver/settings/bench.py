@@ -0,0 +1,19 @@
+"""
+Django settings for websecurityserver project for benchmarks.
+
+Configuración de producción con la caché en memoria de cada proceso, salvo que se indique otra, para medir el
+rendimiento sin depender de servicios externos. Como en producción, DEBUG está desactivado, ya que con DEBUG Django
+guarda en memoria todas las consultas realizadas. Los benchmarks se ejecutan en local, por lo que si no se indican la
+clave secreta y los hosts se usan los de desarrollo, también en los servidores que arrancan.
+"""
+
+import os
+
+from websecurityserver.settings.base import clave_secreta_desarrollo, hosts_desarrollo
+
+os.environ.setdefault('SECRET_KEY', clave_secreta_desarrollo)
+os.environ.setdefault('ALLOWED_HOSTS', ','.join(hosts_desarrollo))
+
+from websecurityserver.settings.prod import *
+
+CACHES = configura_cache('memoria')
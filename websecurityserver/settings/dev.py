@@ -0,0 +1,11 @@
+"""
+Django settings for websecurityserver project in development.
+
+Las plantillas se leen en cada renderizado, para ver sus cambios sin reiniciar el servidor, salvo que se indique
+PLANTILLAS_CACHEADAS=true para probar el cargador con caché de producción, y la caché es la de memoria
+de cada proceso, salvo que se indique otra con CACHE_BACKEND, por ejemplo 'archivo' para compartirla entre procesos.
+"""
+
+from websecurityserver.settings.base import *
+
+DEBUG = entorno_booleano('DEBUG', True)
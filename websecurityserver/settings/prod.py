@@ -0,0 +1,41 @@
+"""
+Django settings for websecurityserver project in production.
+
+Se parte de la configuración común y se cambian los valores del despliegue, que se leen de variables de entorno: la
+clave secreta (SECRET_KEY), los hosts (ALLOWED_HOSTS), la base de datos (DB_*) y la caché (CACHE_BACKEND y
+CACHE_LOCATION). La clave secreta y los hosts son obligatorios, para no desplegar con los valores de desarrollo.
+
+Uso:
+    DJANGO_ENTORNO=prod SECRET_KEY=... ALLOWED_HOSTS=ejemplo.com CACHE_LOCATION=127.0.0.1:11211 \
+        gunicorn websecurityserver.wsgi
+"""
+
+from websecurityserver.settings.base import *
+
+DEBUG = False
+
+SECRET_KEY = entorno_obligatorio('SECRET_KEY')
+
+ALLOWED_HOSTS = entorno_obligatorio('ALLOWED_HOSTS').split(',')
+
+# Las plantillas compiladas se guardan en memoria
+TEMPLATES[0]['OPTIONS']['loaders'] = cargadores_plantillas_cacheados
+
+# La caché se comparte entre todos los procesos del despliegue. Por defecto se usa memcached
+CACHES = configura_cache('memcached', '127.0.0.1:11211')
+
+
+# Database
+
+# Esta versión de Django no tiene un pool de conexiones propio: con un servidor de hilos, las conexiones persistentes de
+# sus hilos hacen de pool, con como mucho una conexión por hilo. Con DB_CONN_MAX_AGE vacío no se cierran nunca
+DATABASES['default']['CONN_MAX_AGE'] = entorno_segundos('DB_CONN_MAX_AGE', 60)
+
+# Con un pool externo como pgbouncer en modo transacción, cada transacción puede usar una conexión distinta del
+# servidor, por lo que no se pueden usar cursores en el servidor, que Django usa al recorrer consultas con iterator()
+if entorno_booleano('DB_PGBOUNCER', False):
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Comprobación de las conexiones persistentes al comenzar cada petición, activa salvo que se indique lo contrario
+if DATABASES['default']['CONN_MAX_AGE'] != 0 and entorno_booleano('DB_COMPRUEBA_CONEXIONES', True):
+    MIDDLEWARE = ['websecurityapp.middleware.ComprobacionConexionesMiddleware'] + MIDDLEWARE
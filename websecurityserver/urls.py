@@ -23,7 +23,12 @@ from websecurityapp.views.oferta_views import ListadoOfertaView, CreacionOfertaV
     RetiroSolicitudOfertaView, ListadoOfertaPropiaView, ListadoSolicitudPropiaView
 from websecurityapp.views.perfil_views import RegistroUsuarioView, DetallesPerfilView, EdicionPerfilView, CreacionAnexoView, \
     EdicionAnexoView, EliminacionAnexoView, DetallesPerfilAjenoView
-from websecurityapp.views.sesionactividad_views import SesionActividadComienzo, SesionActividadFinal
+from websecurityapp.views.cache_views import MetricasCacheView
+from websecurityapp.views.exportacion_views import ExportacionView
+from websecurityapp.views.importacion_views import ImportacionView
+from websecurityapp.views.moderacion_views import ColaModeracionView
+from websecurityapp.views.sesionactividad_views import SesionActividadComienzo, SesionActividadFinal, \
+    SesionActividadFinalVarias
 from websecurityapp.views.views import EjercicioMock1View, EjercicioMock2View, EjercicioMock3View
 from websecurityapp.views.views import HomeView
 from django.contrib.auth import views as auth_views
@@ -34,6 +39,7 @@ urlpatterns = [
     path('ejercicio/mock/3/', EjercicioMock3View.as_view(), name = 'ejercicio_mock_3'),
     path('sesionactividad/comienzo/<str:identificador>/', SesionActividadComienzo.as_view(), name='sesionactividad_comienzo'),
     path('sesionactividad/final/<str:identificador>/', SesionActividadFinal.as_view(), name = 'sesionactividad_final'),
+    path('sesionactividad/final/', SesionActividadFinalVarias.as_view(), name = 'sesionactividad_final_varias'),
     path('admin/', admin.site.urls),
     path('usuario/registro/', RegistroUsuarioView.as_view()),
     path('login/', auth_views.LoginView.as_view(template_name='perfil/login.html', redirect_authenticated_user=True), name = 'login'),
@@ -44,6 +50,8 @@ urlpatterns = [
     path('actividad/creacion/', CreacionActividadesView.as_view(), name='actividad_creacion'),
     path('actividad/edicion/<int:actividad_id>/', EdicionActividadesView.as_view(), name='actividad_edicion'),
     path('actividad/eliminacion/<int:actividad_id>/', EliminacionActividadesView.as_view(), name='actividad_eliminacion'),
+    path('actividad/exportacion/<str:formato>/', ExportacionView.as_view(entidad = 'actividades'), name='actividad_exportacion'),
+    path('actividad/importacion/<str:formato>/', ImportacionView.as_view(entidad = 'actividades'), name='actividad_importacion'),
     path('actividad/detalles/<int:actividad_id>/', DetallesActividadesView.as_view(), name = 'actividad_detalles'),
     path('actividad/veto/<int:actividad_id>/', VetoActividadesView.as_view(), name='actividad_veto'),
     path('actividad/levantamiento_veto/<int:actividad_id>/', LevantamientoVetoActividadesView.as_view(), name='actividad_levantamiento_veto'),
@@ -60,9 +68,14 @@ urlpatterns = [
     path('oferta/levantamiento_veto/<int:oferta_id>/', LevantamientoVetoOfertaView.as_view(), name='oferta_levantamiento_veto'),
     path('oferta/cierre/<int:oferta_id>/', CierreOfertaView.as_view(), name='oferta_cierre'),
     path('oferta/listado_solicitud_propio/', ListadoSolicitudPropiaView.as_view(), name='oferta_listado_solicitud_propio'),
+    path('oferta/exportacion/<str:formato>/', ExportacionView.as_view(entidad = 'ofertas'), name='oferta_exportacion'),
+    path('oferta/exportacion_solicitud/<str:formato>/', ExportacionView.as_view(entidad = 'solicitudes'), name='oferta_exportacion_solicitud'),
+    path('oferta/importacion/<str:formato>/', ImportacionView.as_view(entidad = 'ofertas'), name='oferta_importacion'),
     path('oferta/solicitud/<int:oferta_id>/', SolicitudOfertaView.as_view(), name='oferta_solicitud'),
     path('oferta/retiro_solicitud/<int:oferta_id>/', RetiroSolicitudOfertaView.as_view(), name='oferta_retiro_solicitud'),
     path('anexo/creacion_edicion/', CreacionAnexoView.as_view(), name = 'anexo_creacion'),
     path('anexo/creacion_edicion/<int:anexo_id>/', EdicionAnexoView.as_view(), name = 'anexo_edicion'),
     path('anexo/eliminacion/<int:anexo_id>/', EliminacionAnexoView.as_view(), name = 'anexo_eliminacion'),
+    path('cache/metricas/', MetricasCacheView.as_view(), name = 'cache_metricas'),
+    path('moderacion/', ColaModeracionView.as_view(), name = 'moderacion_cola'),
 ]